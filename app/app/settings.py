@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'drf_spectacular',
@@ -52,6 +53,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',  # First so it times the rest of the stack
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,6 +61,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.HashingBusyMiddleware',
 ]
 
 ROOT_URLCONF = 'app.urls'
@@ -114,6 +117,17 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# The first hasher hashes new passwords, logging in rehashes passwords stored with the others
+PASSWORD_HASHERS = [
+    'core.hashers.LimitedScryptPasswordHasher',
+    'core.hashers.LimitedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+# Hashes run at once across all uWSGI workers, further logins get a 429 at once. Below the
+# worker count so the other workers keep serving during a login storm
+PASSWORD_HASHING_SLOTS = int(os.environ.get('PASSWORD_HASHING_SLOTS', 2))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
@@ -138,6 +152,9 @@ MEDIA_URL = '/static/media/'
 STATIC_ROOT = '/vol/web/static'
 MEDIA_ROOT = '/vol/web/media/'
 
+# Collected files get content hashed names, which the proxy caches as immutable
+STATICFILES_STORAGE = 'core.storage.ManifestStaticFilesStorage'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -147,8 +164,65 @@ AUTH_USER_MODEL = 'core.User'  # Setting configuration to use User class we defi
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'EXCEPTION_HANDLER': 'core.exceptions.exception_handler',
+    # JSON unless a client asks for MessagePack, which is smaller and faster to parse
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'core.renderers.MessagePackRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+        'core.parsers.MessagePackParser',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.AnonTokenBucketThrottle',  # per IP
+        'core.throttling.UserTokenBucketThrottle',  # per user
+    ],
+    'DEFAULT_THROTTLE_RATES': {  # burst size / refill period
+        'anon': os.environ.get('THROTTLE_ANON_RATE', '60/min'),
+        'user': os.environ.get('THROTTLE_USER_RATE', '600/min'),
+    },
+    # Nginx passes the client address as REMOTE_ADDR, so ignore spoofable X-Forwarded-For
+    'NUM_PROXIES': 0,
 }
 
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
+# Requests slower than this are logged with their most expensive SQL statements
+SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 500))
+
+# How long a readiness probe of the database is reused before querying again
+READINESS_CACHE_SECONDS = float(os.environ.get('READINESS_CACHE_SECONDS', 5))
+
+# Rows deleted per transaction when purging a deleted user's data
+PURGE_BATCH_SIZE = int(os.environ.get('PURGE_BATCH_SIZE', 1000))
+
+# Background jobs, see core/jobs.py. Jobs running after the visibility timeout are assumed
+# lost with their worker and run again, failed jobs are retried after a doubling delay
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 1))
+JOB_VISIBILITY_TIMEOUT = int(os.environ.get('JOB_VISIBILITY_TIMEOUT', 600))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+JOB_RETRY_DELAY = int(os.environ.get('JOB_RETRY_DELAY', 10))
+
+# Schema written by `manage.py build_schema` at image build time, generated on demand if unset
+SCHEMA_FILE = os.environ.get('SCHEMA_FILE', '')
+
+# Bearer token Prometheus sends to /api/metrics/, which is disabled while it is empty
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
 # Allow image uploads to work in the browser interface
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
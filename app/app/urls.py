@@ -13,20 +13,20 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView,
-)
+from drf_spectacular.views import SpectacularSwaggerView
 from django.contrib import admin
 from django.urls import path, include  # include allows urls from different apps
 from django.conf.urls.static import static
 from django.conf import settings
 
 from core import views as core_views
+from core.schema import CachedSpectacularAPIView
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/health-check/', core_views.health_check, name='health-check'),
-    path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),  # generate schema for API
+    path('api/health-check/ready/', core_views.readiness_check, name='readiness-check'),
+    path('api/metrics/', core_views.metrics, name='metrics'),
+    path('api/schema/', CachedSpectacularAPIView.as_view(), name='api-schema'),  # schema for API
     path('api/docs',
          SpectacularSwaggerView.as_view(url_name='api-schema'),
          name='api-docs',
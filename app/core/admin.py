@@ -3,14 +3,53 @@ Django admin customizaiton
 """
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from core import models
+from core.purge import request_deletion
 
 
-class UserAdmin(BaseUserAdmin):
+ESTIMATE_COUNT_ABOVE = 10000  # rows from which unfiltered changelists show an estimated count
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator counting unfiltered tables from the planner's statistics.
+
+    COUNT(*) reads the whole table, which takes seconds with millions of rows. Filtered lists,
+    e.g. searches, are still counted exactly since their filters are indexed.
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                    [query.model._meta.db_table],
+                )
+                estimate = cursor.fetchone()[0]
+            if estimate > ESTIMATE_COUNT_ABOVE:
+                return estimate
+
+        return super().count
+
+
+class LargeTableAdminMixin:
+    """Admin options for tables too large to count or list in full."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False  # would count the whole table again when searching
+    ordering = ['-id']
+
+
+class UserAdmin(LargeTableAdminMixin, BaseUserAdmin):
     """Define the admin pages for users."""
     ordering = ['id']
     list_display = ['email', 'name']
+    # Prefix searches, matched by the upper case pattern indexes of core.models
+    search_fields = ['^email', '^name']
     # Look at 127.0.0.1:8000/admin and select 'Users' and click on an admin to understand this
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
@@ -42,8 +81,72 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
 
+    def get_deleted_objects(self, objs, request):
+        """Confirm the users only, listing every game they own would load them all.
+
+        The delete still needs permission to delete each kind of object the users own, checked
+        per model with one EXISTS query for the models the staff user may not delete.
+        """
+        perms_needed = set()
+        for relation in self.model._meta.related_objects:
+            model = relation.related_model
+            model_admin = self.admin_site._registry.get(model)
+            if model_admin is None or model_admin.has_delete_permission(request):
+                continue
+            if model._base_manager.filter(**{f'{relation.field.name}__in': objs}).exists():
+                perms_needed.add(model._meta.verbose_name)
+
+        return [str(obj) for obj in objs], {_('users'): len(objs)}, perms_needed, []
+
+    def delete_model(self, request, obj):
+        """Disable the user and purge their data in the background."""
+        request_deletion(obj)
+
+    def delete_queryset(self, request, queryset):
+        """Disable the users and purge their data in the background."""
+        for user in queryset:
+            request_deletion(user)
+
+
+class VideogameAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    """Define the admin pages for video games."""
+    list_display = ['title', 'user', 'genre', 'price', 'rating']
+    list_select_related = ['user', 'genre']
+    search_fields = ['^title']
+    # Select boxes would list every user, genre, tag and console in the system
+    raw_id_fields = ['user', 'genre']
+    autocomplete_fields = ['tags', 'consoles']
+
+
+class TagAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    """Define the admin pages for tags."""
+    list_display = ['name', 'user']
+    list_select_related = ['user']
+    search_fields = ['^name']
+    raw_id_fields = ['user']
+
+
+class ConsoleAdmin(TagAdmin):
+    """Define the admin pages for consoles."""
+
+
+class GenreAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    """Define the admin pages for genres."""
+    list_display = ['name', 'user']
+    list_select_related = ['user']
+    raw_id_fields = ['user']
+
+
+class JobAdmin(admin.ModelAdmin):
+    """Define the admin pages for queued jobs."""
+    list_display = ['name', 'state', 'priority', 'attempts', 'run_at']
+    list_filter = ['state']
+    ordering = ['-priority', 'run_at', 'id']
+
 
 admin.site.register(models.User, UserAdmin)  # UserAdmin overrides the default modelmanager
-admin.site.register(models.Videogame)
-admin.site.register(models.Tag)
-admin.site.register(models.Console)
+admin.site.register(models.Videogame, VideogameAdmin)
+admin.site.register(models.Tag, TagAdmin)
+admin.site.register(models.Console, ConsoleAdmin)
+admin.site.register(models.Genre, GenreAdmin)
+admin.site.register(models.Job, JobAdmin)
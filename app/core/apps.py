@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Map the shared throttle and password hashing memory before uWSGI forks its workers
+        from core import hashers, throttling  # noqa: F401
+        # Keep the video game id arrays in sync with their tags and consoles
+        from core import signals  # noqa: F401
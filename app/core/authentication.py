@@ -0,0 +1,14 @@
+"""
+Authentication classes for the APIs
+"""
+from rest_framework import authentication
+
+from core.instrumentation import phase
+
+
+class TokenAuthentication(authentication.TokenAuthentication):
+    """Token authentication that reports its duration in Server-Timing."""
+
+    def authenticate(self, request):
+        with phase('auth'):
+            return super().authenticate(request)
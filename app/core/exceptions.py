@@ -0,0 +1,20 @@
+"""
+Exception handling for the API
+"""
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.views import exception_handler as drf_exception_handler
+
+from core.hashers import HashingBusy
+
+
+HASHING_RETRY_AFTER = 1  # seconds a client waits for a password hashing slot to free up
+HASHING_BUSY_DETAIL = _('Too many logins in progress, please retry shortly.')
+
+
+def exception_handler(exc, context):
+    """DRF's exception handler, answering 429 when every password hashing slot is taken."""
+    if isinstance(exc, HashingBusy):
+        exc = exceptions.Throttled(wait=HASHING_RETRY_AFTER, detail=str(HASHING_BUSY_DETAIL))
+
+    return drf_exception_handler(exc, context)
@@ -0,0 +1,101 @@
+"""
+Password hashers limited to a number of hashes at once across uWSGI workers
+"""
+import mmap
+import multiprocessing
+import os
+import struct
+import threading
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+# pid of the process holding the slot, 0 when free
+SLOT = struct.Struct('q')
+
+
+class HashingBusy(Exception):
+    """Raised when every hashing slot is taken."""
+
+
+def _alive(pid):
+    """Return whether process pid still runs."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # runs, as another user
+
+    return True
+
+
+class HashingLimiter:
+    """Slots for the hashes running at once, in memory shared by every uWSGI worker.
+
+    The memory is mapped when this module is imported, which happens in the uWSGI master
+    before it forks (see CoreConfig.ready), so the limit holds across all workers. A hash
+    finding every slot taken fails at once with HashingBusy instead of pinning its worker
+    while it waits, so a login storm leaves the other workers to serve everything else. A
+    slot held by a worker that died mid-hash, e.g. killed by uWSGI, is taken back.
+    """
+
+    def __init__(self, slots):
+        self._memory = mmap.mmap(-1, slots * SLOT.size)  # MAP_SHARED, inherited by fork
+        self._lock = multiprocessing.Lock()
+        self._local = threading.local()
+
+    def _acquire(self):
+        """Claim a free slot for this process and return its offset."""
+        with self._lock:
+            for offset in range(0, len(self._memory), SLOT.size):
+                owner, = SLOT.unpack_from(self._memory, offset)
+                if owner == 0 or not _alive(owner):
+                    SLOT.pack_into(self._memory, offset, os.getpid())
+                    return offset
+
+        raise HashingBusy('Too many passwords are being hashed.')
+
+    def _release(self, offset):
+        with self._lock:
+            SLOT.pack_into(self._memory, offset, 0)
+
+    def run(self, fn, *args, **kwargs):
+        """Return fn(*args, **kwargs) computed in a free slot."""
+        if getattr(self._local, 'holding', False):
+            # verify() calls encode(), which already holds this thread's slot
+            return fn(*args, **kwargs)
+
+        offset = self._acquire()
+        self._local.holding = True
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._local.holding = False
+            self._release(offset)
+
+
+limiter = HashingLimiter(settings.PASSWORD_HASHING_SLOTS)
+
+
+class LimitedHasherMixin:
+    """Compute the hashes of a Django hasher in one of the limiter's slots."""
+    limiter = limiter
+
+    def encode(self, password, salt, *args, **kwargs):
+        return self.limiter.run(super().encode, password, salt, *args, **kwargs)
+
+    def verify(self, password, encoded):
+        return self.limiter.run(super().verify, password, encoded)
+
+    def harden_runtime(self, password, encoded):
+        return self.limiter.run(super().harden_runtime, password, encoded)
+
+
+class LimitedScryptPasswordHasher(LimitedHasherMixin, hashers.ScryptPasswordHasher):
+    """Memory-hard scrypt, faster per hash than PBKDF2 and costlier to brute force."""
+
+
+class LimitedPBKDF2PasswordHasher(LimitedHasherMixin, hashers.PBKDF2PasswordHasher):
+    """PBKDF2 for hashes created before scrypt, upgraded on the next login."""
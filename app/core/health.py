@@ -0,0 +1,78 @@
+"""
+Readiness probing and pre-fork warm up
+"""
+import gc
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connection, connections
+from django.urls import get_resolver
+
+from core import metrics
+from core.schema import get_schema
+
+
+logger = logging.getLogger(__name__)
+
+startup_seconds = None  # time taken by warm_up, None until the app is loaded
+
+_probe_lock = threading.Lock()
+_probe = {'checked': None, 'ok': False}
+
+
+def _check_database():
+    """Return whether a trivial query succeeds."""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except DatabaseError:
+        return False
+
+    return True
+
+
+def database_ready():
+    """Return whether the database is reachable, probing at most every few seconds.
+
+    Probes are cached for READINESS_CACHE_SECONDS so frequent readiness checks from the
+    load balancer do not add a query each.
+    """
+    now = time.monotonic()
+    with _probe_lock:
+        checked = _probe['checked']
+        hit = checked is not None and now - checked < settings.READINESS_CACHE_SECONDS
+        if not hit:
+            _probe['ok'] = _check_database()
+            _probe['checked'] = now
+        ok = _probe['ok']
+
+    metrics.record_cache('readiness', hit)
+    return ok
+
+
+def reset_probe():
+    """Forget the cached probe result."""
+    with _probe_lock:
+        _probe['checked'] = None
+
+
+def warm_up(started):
+    """Load everything a request needs before uWSGI forks its workers.
+
+    Workers then share the imported modules and the schema copy-on-write instead of each
+    paying for them on their first request.
+    """
+    global startup_seconds
+
+    get_resolver().url_patterns  # imports every URLconf, view and serializer
+    get_schema()
+
+    # A connection opened while loading must not be shared by forked workers
+    connections.close_all()
+    # Keep the garbage collector from touching, and so copying, the pages loaded so far
+    gc.freeze()
+
+    startup_seconds = time.monotonic() - started
+    logger.info('App loaded in %.2fs', startup_seconds)
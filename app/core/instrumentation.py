@@ -0,0 +1,116 @@
+"""
+Per-request timing of auth, SQL, view and render phases
+"""
+import contextvars
+from contextlib import contextmanager
+from time import perf_counter
+
+
+# Only the most expensive distinct statements are needed for slow request logs
+MAX_TRACKED_STATEMENTS = 50
+
+_current_timer = contextvars.ContextVar('request_timer', default=None)
+
+
+class RequestTimer:
+    """Collect phase durations and SQL statistics for one request."""
+
+    def __init__(self):
+        self.start = perf_counter()
+        self.end = None
+        self.view_start = None
+        self.view_end = None
+        self.phases = {}  # phase name: seconds
+        self.query_count = 0
+        self.query_time = 0.0
+        self.statements = {}  # sql: [count, seconds]
+
+    def __call__(self, execute, sql, params, many, context):
+        """Database execute wrapper timing every statement on the connection."""
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record_query(sql, perf_counter() - start)
+
+    def record_query(self, sql, seconds):
+        """Add a statement to the totals."""
+        self.query_count += 1
+        self.query_time += seconds
+        stats = self.statements.get(sql)
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += seconds
+        elif len(self.statements) < MAX_TRACKED_STATEMENTS:
+            self.statements[sql] = [1, seconds]
+
+    def add(self, name, seconds):
+        """Add time spent in a named phase."""
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def finish(self):
+        """Stop the clock and split the view into its phases."""
+        self.end = perf_counter()
+        if self.view_start is not None:
+            view_end = self.view_end or self.end
+            # SQL and auth, each without the other, run inside the view, what is left is view
+            # code and serialization
+            view = view_end - self.view_start - self.query_time - self.phases.get('auth', 0.0)
+            self.add('view', max(view, 0.0))
+            if self.view_end is not None:
+                self.add('render', self.end - self.view_end)
+
+    @property
+    def total_ms(self):
+        return (self.end - self.start) * 1000
+
+    def top_statements(self, limit=5):
+        """Return (seconds, count, sql) for the most expensive statements."""
+        return sorted(
+            ((seconds, count, sql) for sql, (count, seconds) in self.statements.items()),
+            reverse=True,
+        )[:limit]
+
+    def server_timing(self):
+        """Format the timings as a Server-Timing header value."""
+        metrics = [
+            f'{name};dur={seconds * 1000:.2f}' for name, seconds in self.phases.items()
+        ]
+        metrics.append(
+            f'db;dur={self.query_time * 1000:.2f};desc="{self.query_count} queries"'
+        )
+        metrics.append(f'total;dur={self.total_ms:.2f}')
+
+        return ', '.join(metrics)
+
+
+def current_timer():
+    """Return the timer of the request being handled, if any."""
+    return _current_timer.get()
+
+
+@contextmanager
+def phase(name):
+    """Time the wrapped block as a phase of the current request, less the SQL it runs."""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+
+    start, query_time = perf_counter(), timer.query_time
+    try:
+        yield
+    finally:
+        # The phase's SQL is counted in db only, so the view subtracts it once
+        timer.add(name, perf_counter() - start - (timer.query_time - query_time))
+
+
+@contextmanager
+def track_request():
+    """Make a new timer current for the wrapped block."""
+    timer = RequestTimer()
+    token = _current_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _current_timer.reset(token)
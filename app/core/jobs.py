@@ -0,0 +1,112 @@
+"""
+Background jobs queued in Postgres and run by `manage.py run_worker`
+
+A job is a function marked with @job, queued with its keyword arguments:
+
+    enqueue(purge_user, user_id=user.id)
+
+Jobs are enqueued in the caller's transaction, so they only run if it commits. A job may
+run more than once, after a failure or when a worker dies, so jobs must be safe to repeat.
+"""
+import logging
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.models import Job
+
+
+logger = logging.getLogger(__name__)
+
+
+def job(fn):
+    """Mark fn as a function that may be queued, workers run nothing else."""
+    fn.is_job = True
+    return fn
+
+
+def enqueue(fn, *, priority=0, delay=0, max_attempts=None, **kwargs):
+    """Queue fn(**kwargs) to run on a worker and return the job.
+
+    kwargs are stored as JSON. Jobs of higher priority run first, none starts before delay
+    seconds have passed.
+    """
+    if not getattr(fn, 'is_job', False):
+        raise ValueError(f'{fn.__qualname__} is not decorated with @job.')
+
+    return Job.objects.create(
+        name=f'{fn.__module__}.{fn.__qualname__}',
+        kwargs=kwargs,
+        priority=priority,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+@contextmanager
+def heartbeat(job):
+    """Keep a running job hidden from other workers however long it runs.
+
+    A thread pushes the job's visibility timeout forward every third of it, on a connection
+    of its own. Once the worker dies the heartbeat stops with it and the job is claimed again.
+    """
+    timeout = settings.JOB_VISIBILITY_TIMEOUT
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(timeout / 3):
+                if not job.heartbeat(timeout):
+                    logger.warning('Job %s was claimed again by another worker', job)
+                    return
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f'job-{job.id}-heartbeat', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def execute(job_id):
+    """Run a claimed job, delete it once done, and return whether it succeeded.
+
+    The job is only deleted or queued again while this run still holds its claim.
+    """
+    job = Job.objects.get(id=job_id)
+    start = time.monotonic()
+    try:
+        with heartbeat(job):
+            fn = import_string(job.name)
+            if not getattr(fn, 'is_job', False):
+                raise ValueError(f'{job.name} is not decorated with @job.')
+            fn(**job.kwargs)
+    except Exception:
+        logger.exception('Job %s failed on attempt %s', job, job.attempts)
+        if not job.retry_or_fail(traceback.format_exc(), settings.JOB_RETRY_DELAY):
+            logger.warning('Job %s was claimed again, leaving it to the other worker', job)
+        return False
+
+    if not job.complete():
+        logger.warning('Job %s was claimed again, leaving it to the other worker', job)
+    logger.info('Job %s done in %.2fs', job, time.monotonic() - start)
+    return True
+
+
+def run_job(job_id):
+    """Run a job on a pool thread or process, whose connections outlive the job."""
+    close_old_connections()
+    try:
+        return execute(job_id)
+    finally:
+        close_old_connections()
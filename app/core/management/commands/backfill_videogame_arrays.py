@@ -0,0 +1,40 @@
+"""
+Django command to rebuild the tag and console id arrays of every video game
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+
+from core.models import Videogame
+
+
+class Command(BaseCommand):
+    """Django command to copy the through tables into the video game id arrays"""
+    help = 'Rewrite tag_ids and console_ids of all video games in batches of ids.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Video game ids updated per statement, each batch commits on its own.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        bounds = Videogame.objects.aggregate(first=Min('id'), last=Max('id'))
+        if bounds['first'] is None:
+            self.stdout.write('No video games to backfill.')
+            return
+
+        batch_size = options['batch_size']
+        updated = 0
+        start = time.perf_counter()
+        # Short batches keep row locks brief on a live table
+        for low in range(bounds['first'], bounds['last'] + 1, batch_size):
+            updated += Videogame.objects.filter(
+                id__gte=low, id__lt=low + batch_size,
+            ).sync_link_arrays()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Backfilled {updated} video games in {time.perf_counter() - start:.1f}s'
+        ))
@@ -0,0 +1,85 @@
+"""
+Django command to compare MessagePack with JSON for video game lists
+"""
+import io
+import json
+import statistics
+import time
+from decimal import Decimal
+
+import msgpack
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import MessagePackParser
+from core.renderers import MessagePackRenderer, pack_decimal
+
+
+def sample_games(count, decimal):
+    """Return count games shaped like a list response, decimals made by decimal()."""
+    return [
+        {
+            'id': i,
+            'title': f'Video game {i}',
+            'price': decimal(Decimal(i % 8000) / 100 + Decimal('0.99')),
+            'rating': decimal(Decimal(i % 1000) / 100),
+            'players': i % 4 + 1,
+            'genre': 'Platformer',
+            'consoles': [{'id': i % 7, 'name': 'SNES'}],
+            'link': f'https://example.com/games/{i}',
+            'tags': [{'id': i % 11, 'name': 'Retro'}, {'id': i % 13 + 20, 'name': 'Co-op'}],
+        }
+        for i in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    """Django command to time rendering and parsing a list of games in each format"""
+    help = 'Benchmark MessagePack against JSON rendering and parsing of video game lists.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--games', type=int, default=5000, help='Games in the list.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per format.')
+
+    def _time(self, fn, repeat):
+        """Return the result of fn and its median duration in milliseconds."""
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = fn()
+            durations.append((time.perf_counter() - start) * 1000)
+
+        return result, statistics.median(durations)
+
+    def _benchmark(self, name, renderer, parser, data, repeat):
+        body, render_ms = self._time(lambda: renderer.render(data), repeat)
+        _, parse_ms = self._time(lambda: parser.parse(io.BytesIO(body)), repeat)
+        self.stdout.write(
+            f'{name}: {len(body) / 1024:.0f} KiB, '
+            f'render {render_ms:.1f}ms, parse {parse_ms:.1f}ms'
+        )
+
+    def _field_sizes(self, json_games, msgpack_games):
+        """Write the mean encoded size in bytes of each decimal field in both formats."""
+        for field in ['price', 'rating']:
+            sizes = [
+                statistics.mean(len(encode(game[field])) for game in games)
+                for encode, games in [
+                    (lambda value: json.dumps(value).encode(), json_games),
+                    (msgpack.packb, msgpack_games),
+                ]
+            ]
+            self.stdout.write(f'{field}: json {sizes[0]:.2f} B, msgpack {sizes[1]:.2f} B')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        count, repeat = options['games'], options['repeat']
+        # Each format as sent: decimals are strings in JSON and extensions in MessagePack
+        json_games = sample_games(count, str)
+        msgpack_games = sample_games(count, pack_decimal)
+        self._benchmark('json', JSONRenderer(), JSONParser(), json_games, repeat)
+        self._benchmark(
+            'msgpack', MessagePackRenderer(), MessagePackParser(), msgpack_games, repeat,
+        )
+        self._field_sizes(json_games, msgpack_games)
@@ -0,0 +1,82 @@
+"""
+Django command to measure the throughput of the token endpoint
+"""
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from rest_framework.test import APIRequestFactory
+
+from user.views import CreateTokenView
+
+
+DEFAULT_HASHERS = [
+    'core.hashers.LimitedPBKDF2PasswordHasher',
+    'core.hashers.LimitedScryptPasswordHasher',
+]
+PASSWORD = 'benchmark-pass-123'
+
+
+class Command(BaseCommand):
+    """Django command to log in concurrently and report requests per second"""
+    help = 'Benchmark POST /api/user/token/ with each password hasher.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100, help='Logins per hasher.')
+        parser.add_argument(
+            '--concurrency', type=int, default=8, help='Logins in flight at once.',
+        )
+        parser.add_argument(
+            '--hasher', action='append', dest='hashers',
+            help=f'Hasher to benchmark, may be repeated. Defaults to {DEFAULT_HASHERS}.',
+        )
+
+    def _login(self, view, email):
+        """Request a token and return (status code, seconds taken)."""
+        request = APIRequestFactory().post(
+            '/api/user/token/', {'email': email, 'password': PASSWORD}, format='json',
+        )
+        start = time.perf_counter()
+        try:
+            response = view(request)
+        finally:
+            connection.close()  # as at the end of a real request
+
+        return response.status_code, time.perf_counter() - start
+
+    def _benchmark(self, hasher, requests, concurrency):
+        """Log in `requests` times with passwords stored by hasher."""
+        email = f'benchmark-{uuid.uuid4().hex}@example.com'
+        view = CreateTokenView.as_view(throttle_classes=())
+        # Only list the benchmarked hasher so logging in does not upgrade the hash
+        with override_settings(PASSWORD_HASHERS=[hasher]):
+            user = get_user_model().objects.create_user(email, PASSWORD)
+            try:
+                start = time.perf_counter()
+                with ThreadPoolExecutor(concurrency) as executor:
+                    results = list(executor.map(
+                        lambda _: self._login(view, email), range(requests),
+                    ))
+                elapsed = time.perf_counter() - start
+            finally:
+                user.delete()
+
+        statuses = [status for status, _ in results]
+        latencies = sorted(seconds * 1000 for _, seconds in results)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(
+            f'{hasher.rsplit(".", 1)[-1]}: {requests / elapsed:.1f} req/s, '
+            f'p50 {statistics.median(latencies):.0f}ms, p95 {p95:.0f}ms, '
+            f'{statuses.count(200)} ok, {statuses.count(429)} throttled'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        for hasher in options['hashers'] or DEFAULT_HASHERS:
+            self._benchmark(hasher, options['requests'], options['concurrency'])
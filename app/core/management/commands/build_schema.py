@@ -0,0 +1,32 @@
+"""
+Django command to generate the OpenAPI schema ahead of serving it
+"""
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.schema import generate_schema
+
+
+class Command(BaseCommand):
+    """Django command to write the OpenAPI schema served by /api/schema/"""
+    help = 'Generate the OpenAPI schema once so workers load it instead of introspecting views.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file', default=settings.SCHEMA_FILE,
+            help='Where to write the schema, defaults to the SCHEMA_FILE setting.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        path = options['file']
+        if not path:
+            raise CommandError('Pass --file or set SCHEMA_FILE.')
+
+        schema = generate_schema()
+        with open(path, 'w') as schema_file:
+            json.dump(schema, schema_file)
+
+        self.stdout.write(self.style.SUCCESS(f'Schema written to {path}'))
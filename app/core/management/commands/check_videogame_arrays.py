@@ -0,0 +1,41 @@
+"""
+Django command to find video games whose id arrays disagree with their links
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import LINK_ARRAYS, Videogame
+
+
+SAMPLE_SIZE = 10  # ids of mismatched games shown per field
+
+
+class Command(BaseCommand):
+    """Django command to compare tag_ids and console_ids with the through tables"""
+    help = 'Report video games whose tag_ids or console_ids are out of sync, optionally fix them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix', action='store_true', help='Rewrite the arrays of mismatched games.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        mismatched = 0
+        for field, column in LINK_ARRAYS.items():
+            stale = Videogame.objects.out_of_sync(field)
+            count = stale.count()
+            if not count:
+                continue
+
+            mismatched += count
+            sample = list(stale.order_by('id').values_list('id', flat=True)[:SAMPLE_SIZE])
+            self.stdout.write(f'{count} video games with stale {column}, e.g. ids {sample}')
+            if options['fix']:
+                Videogame.objects.filter(id__in=stale.values('id')).sync_link_arrays([field])
+
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS('All video game id arrays are in sync.'))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Fixed {mismatched} id arrays.'))
+        else:
+            raise CommandError(f'{mismatched} id arrays are out of sync, rerun with --fix.')
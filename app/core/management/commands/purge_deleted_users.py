@@ -0,0 +1,29 @@
+"""
+Django command to purge the data of deleted users without waiting for the job queue
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.purge import purge_user
+
+
+class Command(BaseCommand):
+    """Django command to purge users whose deletion was requested"""
+    help = 'Delete the data of deleted users in batches now, e.g. while no worker runs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, help='Rows per transaction, defaults to PURGE_BATCH_SIZE.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        user_ids = get_user_model().objects.filter(
+            deletion_requested_at__isnull=False,
+        ).values_list('id', flat=True)
+
+        for user_id in user_ids:
+            counts = purge_user(user_id, options['batch_size'])
+            self.stdout.write(f'Purged user {user_id}: {counts}')
+
+        self.stdout.write(self.style.SUCCESS(f'Purged {len(user_ids)} users'))
@@ -0,0 +1,89 @@
+"""
+Django command to run queued jobs
+"""
+import logging
+import multiprocessing
+import signal
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.jobs import run_job
+from core.models import Job
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Django command to claim jobs from the queue and run them on a pool"""
+    help = 'Run queued jobs until stopped, on a pool of threads or processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pool', choices=['thread', 'process'], default='thread',
+            help='Threads suit jobs waiting on the database or files, processes CPU bound jobs.',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.JOB_WORKERS, help='Jobs run at once.',
+        )
+        parser.add_argument(
+            '--once', action='store_true', help='Exit once no job is due instead of waiting.',
+        )
+
+    def _executor(self, pool, concurrency):
+        if pool == 'thread':
+            return ThreadPoolExecutor(concurrency, thread_name_prefix='job')
+        # Spawned rather than forked, a forked child would share the database connection
+        return ProcessPoolExecutor(
+            concurrency, mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        )
+
+    def _stop(self, signum, frame):
+        self.stdout.write('Stopping once the running jobs finish')
+        self.stopping = True
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        concurrency = options['concurrency']
+        self.stopping = False
+        if not options['once']:
+            signal.signal(signal.SIGTERM, self._stop)
+            signal.signal(signal.SIGINT, self._stop)
+
+        running, ok, failed = set(), 0, 0
+        with self._executor(options['pool'], concurrency) as executor:
+            while not self.stopping or running:
+                free = concurrency - len(running)
+                if free and not self.stopping:
+                    close_old_connections()  # reconnect if the database restarted
+                    for job_id in Job.objects.claim(free, settings.JOB_VISIBILITY_TIMEOUT):
+                        running.add(executor.submit(run_job, job_id))
+
+                if not running and options['once']:
+                    break
+                # Until a job finishes, or it is time to look for new jobs
+                done, running = wait(
+                    running, timeout=settings.JOB_POLL_INTERVAL, return_when=FIRST_COMPLETED,
+                )
+                for future in done:
+                    try:
+                        succeeded = future.result()
+                    except Exception:  # e.g. the job was deleted while it ran
+                        logger.exception('Job could not be run')
+                        succeeded = False
+                    if succeeded:
+                        ok += 1
+                    else:
+                        failed += 1
+
+        self.stdout.write(f'Ran {ok + failed} jobs, {failed} failed')
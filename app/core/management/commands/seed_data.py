@@ -0,0 +1,276 @@
+"""
+Django command to generate synthetic users and video games for load testing
+"""
+import io
+import multiprocessing
+import random
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+
+from core.models import (
+    Genre,
+    Videogame,
+    Tag,
+    Console,
+)
+
+
+TAG_NAMES = [
+    'RPG', 'FPS', 'Indie', 'Co-op', 'Multiplayer', 'Open World', 'Retro', 'Horror',
+    'Strategy', 'Puzzle', 'Roguelike', 'Sandbox', 'Story Rich', 'Family', 'Speedrun',
+    'Couch Co-op', 'Backlog', 'Favorite', 'Completed', 'Collector',
+]
+CONSOLE_NAMES = [
+    'PC', 'Switch', 'PS5', 'PS4', 'Xbox Series X', 'Xbox One', 'Wii U', 'Gamecube',
+    'SNES', 'Genesis', 'N64', 'PS2',
+]
+GENRES = [  # (genre, weight)
+    ('Action', 20), ('RPG', 15), ('Adventure', 12), ('Shooter', 12), ('Platformer', 8),
+    ('Strategy', 8), ('Sports', 7), ('Puzzle', 6), ('Racing', 6), ('Fighting', 4),
+    ('Simulation', 4), ('Horror', 3),
+]
+TITLE_WORDS = [
+    'Legend', 'Shadow', 'Star', 'Dragon', 'Super', 'Final', 'Dark', 'Crystal', 'Mega',
+    'Quest', 'Souls', 'Kart', 'Wars', 'Fantasy', 'Hunter', 'Galaxy', 'Knight', 'Racer',
+]
+PRICES = [  # (price, weight)
+    (Decimal('0.00'), 5), (Decimal('9.99'), 10), (Decimal('19.99'), 15),
+    (Decimal('29.99'), 15), (Decimal('39.99'), 10), (Decimal('59.99'), 30),
+    (Decimal('69.99'), 15),
+]
+PLAYERS = [(1, 50), (2, 25), (4, 20), (8, 5)]  # (players, weight)
+IMAGE_RATIO = 0.3  # share of games with an uploaded cover image
+
+
+def _weighted(rng, choices):
+    """Pick a value from (value, weight) pairs."""
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights)[0]
+
+
+def _user_rng(seed, index):
+    """Return the random generator for one user, independent of worker split."""
+    return random.Random(f'{seed}-{index}')
+
+
+def _email(seed, index):
+    return f'seed{seed}.user{index}@example.com'
+
+
+def _build_library(rng, mean_games, max_games):
+    """Generate tag names, console names and games for one user."""
+    tags = rng.sample(TAG_NAMES, rng.randint(3, 12))
+    consoles = rng.sample(CONSOLE_NAMES, rng.randint(1, 6))
+    # Library sizes are long tailed, most users own a few games and some own thousands
+    count = min(int(rng.lognormvariate(0, 1) * mean_games), max_games)
+    # Earlier tags and consoles in the user's list are used more, like real favorites
+    tag_weights = [1 / (rank + 1) for rank in range(len(tags))]
+    console_weights = [1 / (rank + 1) for rank in range(len(consoles))]
+
+    games = []
+    for _ in range(count):
+        title = ' '.join(rng.sample(TITLE_WORDS, rng.randint(1, 3)))
+        if rng.random() < 0.2:
+            title = f'{title} {rng.randint(2, 7)}'
+        image = None
+        if rng.random() < IMAGE_RATIO:
+            image = f'uploads/videogame/{uuid.UUID(int=rng.getrandbits(128))}.jpg'
+        games.append({
+            'title': title,
+            'price': _weighted(rng, PRICES),
+            'rating': Decimal(min(max(rng.gauss(7, 1.5), 0), 10)).quantize(Decimal('0.01')),
+            'players': _weighted(rng, PLAYERS),
+            'genre': _weighted(rng, GENRES),
+            'image': image,
+            'tags': set(rng.choices(tags, weights=tag_weights, k=rng.randint(0, 3))),
+            'consoles': set(rng.choices(consoles, weights=console_weights, k=rng.randint(1, 2))),
+        })
+
+    return tags, consoles, games
+
+
+def _copy_value(value):
+    """Format a value for COPY text format."""
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+
+
+def _array(ids):
+    """Format ids as a sorted Postgres array literal."""
+    return '{' + ','.join(str(value) for value in sorted(ids)) + '}'
+
+
+def _copy_rows(cursor, model, columns, rows):
+    """Stream rows into the table of model with COPY, much faster than INSERT."""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(_copy_value(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    cursor.copy_expert(
+        f'COPY {model._meta.db_table} ({", ".join(columns)}) FROM STDIN',
+        buffer,
+    )
+
+
+def _allocate_ids(cursor, model, count):
+    """Reserve count primary keys from the sequence of model in one query."""
+    cursor.execute(
+        'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+        [model._meta.db_table, 'id', count],
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _seed_users(indexes, seed, password_hash, mean_games, max_games, batch_size):
+    """Create a chunk of users with their libraries and return the row counts."""
+    libraries = [
+        _build_library(_user_rng(seed, index), mean_games, max_games) for index in indexes
+    ]
+    User = get_user_model()
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        users = [
+            User(email=_email(seed, index), name=f'Seed User {index}', password=password_hash)
+            for index in indexes
+        ]
+        User.objects.bulk_create(users, batch_size=batch_size)
+
+        tag_objs, console_objs = [], []
+        for user, (tags, consoles, _) in zip(users, libraries):
+            tag_objs.extend(Tag(user=user, name=name) for name in tags)
+            console_objs.extend(Console(user=user, name=name) for name in consoles)
+        genre_objs = [
+            Genre(user=user, name=name) for user, (_, _, user_games) in zip(users, libraries)
+            for name in sorted({game['genre'] for game in user_games})
+        ]
+        Tag.objects.bulk_create(tag_objs, batch_size=batch_size)
+        Console.objects.bulk_create(console_objs, batch_size=batch_size)
+        Genre.objects.bulk_create(genre_objs, batch_size=batch_size)
+        tag_ids = {(tag.user_id, tag.name): tag.id for tag in tag_objs}
+        console_ids = {(console.user_id, console.name): console.id for console in console_objs}
+        genre_ids = {(genre.user_id, genre.name): genre.id for genre in genre_objs}
+
+        # Games and their m2m rows are the bulk of the data, skip model instances entirely
+        games = [
+            (user.id, game) for user, (_, _, user_games) in zip(users, libraries)
+            for game in user_games
+        ]
+        game_ids = _allocate_ids(cursor, Videogame, len(games))
+        _copy_rows(
+            cursor,
+            Videogame,
+            ['id', 'user_id', 'title', 'price', 'rating', 'players', 'genre_id',
+             'description', 'link', 'image', 'tag_ids', 'console_ids'],
+            (
+                (game_id, user_id, game['title'], game['price'], game['rating'],
+                 game['players'], genre_ids[user_id, game['genre']], '', '', game['image'],
+                 _array(tag_ids[user_id, name] for name in game['tags']),
+                 _array(console_ids[user_id, name] for name in game['consoles']))
+                for game_id, (user_id, game) in zip(game_ids, games)
+            ),
+        )
+        tag_rows = [
+            (game_id, tag_ids[user_id, name])
+            for game_id, (user_id, game) in zip(game_ids, games) for name in game['tags']
+        ]
+        console_rows = [
+            (game_id, console_ids[user_id, name])
+            for game_id, (user_id, game) in zip(game_ids, games) for name in game['consoles']
+        ]
+        _copy_rows(cursor, Videogame.tags.through, ['videogame_id', 'tag_id'], tag_rows)
+        _copy_rows(
+            cursor, Videogame.consoles.through, ['videogame_id', 'console_id'], console_rows,
+        )
+
+    return {
+        'users': len(users),
+        'videogames': len(games),
+        'tags': len(tag_objs),
+        'consoles': len(console_objs),
+    }
+
+
+def _seed_users_in_worker(args):
+    """Pool entrypoint, each worker process opens its own database connection."""
+    try:
+        return _seed_users(*args)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    """Django command to seed the database with synthetic data"""
+    help = 'Create users with realistic libraries of games, tags, consoles and images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help='Number of users to create.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for reproducible data.')
+        parser.add_argument(
+            '--games-mean', type=int, default=50,
+            help='Typical number of games per user, sizes are log-normally distributed.',
+        )
+        parser.add_argument(
+            '--max-games', type=int, default=5000, help='Upper bound on games per user.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Number of processes inserting in parallel.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=100,
+            help='Users inserted per transaction.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Rows per INSERT for users, tags and consoles, games are streamed with COPY.',
+        )
+        parser.add_argument(
+            '--password', default='password123', help='Password shared by all seeded users.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        seed = options['seed']
+        if get_user_model().objects.filter(email=_email(seed, 0)).exists():
+            raise CommandError(f'Data for seed {seed} already exists, use another --seed.')
+
+        # Hashing once instead of per user, a full password hash per row would dominate seeding
+        password_hash = make_password(options['password'])
+        indexes = range(options['users'])
+        chunk_size = options['chunk_size']
+        tasks = [
+            (
+                indexes[start:start + chunk_size],
+                seed,
+                password_hash,
+                options['games_mean'],
+                options['max_games'],
+                options['batch_size'],
+            )
+            for start in range(0, len(indexes), chunk_size)
+        ]
+
+        self.stdout.write(f'Seeding {len(indexes)} users with seed {seed}...')
+        start = time.perf_counter()
+        if options['workers'] > 1:
+            # Forked workers must not share the parent's database connection
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(options['workers']) as pool:
+                results = pool.map(_seed_users_in_worker, tasks)
+        else:
+            results = [_seed_users(*task) for task in tasks]
+        elapsed = time.perf_counter() - start
+
+        summary = ', '.join(
+            f'{sum(result[name] for result in results)} {name}'
+            for name in ['users', 'videogames', 'tags', 'consoles']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Created {summary} in {elapsed:.1f}s'))
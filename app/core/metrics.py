@@ -0,0 +1,89 @@
+"""
+Prometheus metrics for the app
+
+uWSGI runs several prefork workers, each with its own copy of these metrics. When
+PROMETHEUS_MULTIPROC_DIR is set (see scripts/run.sh) every worker writes its samples to
+memory mapped files in that directory, and the metrics view sums them across workers.
+"""
+import os
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    REGISTRY,
+    CONTENT_TYPE_LATEST,
+    generate_latest,
+    multiprocess,
+)
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+UPLOAD_SIZE_BUCKETS = (10e3, 50e3, 100e3, 250e3, 500e3, 1e6, 2.5e6, 5e6, 10e6)
+
+REQUESTS = Counter(
+    'http_requests_total',
+    'HTTP requests by route, method and status code.',
+    ['route', 'method', 'status'],
+)
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'HTTP request latency by route and method.',
+    ['route', 'method'],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    'db_queries_per_request',
+    'Number of SQL statements executed per request by route.',
+    ['route'],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+DB_DURATION = Histogram(
+    'db_duration_seconds',
+    'Time spent executing SQL per request by route.',
+    ['route'],
+    buckets=LATENCY_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total',
+    'Cache lookups by cache and result, hit ratio is hits over all lookups.',
+    ['cache', 'result'],
+)
+IMAGE_UPLOAD_BYTES = Histogram(
+    'videogame_image_upload_bytes',
+    'Size of uploaded videogame images.',
+    buckets=UPLOAD_SIZE_BUCKETS,
+)
+
+
+def route_name(request):
+    """Return a low cardinality route label such as 'videogame:tag-list'."""
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unmatched'
+
+
+def observe_request(request, response, timer):
+    """Record a finished request and its SQL statistics."""
+    route = route_name(request)
+    REQUESTS.labels(route, request.method, response.status_code).inc()
+    REQUEST_LATENCY.labels(route, request.method).observe(timer.total_ms / 1000)
+    DB_QUERIES.labels(route).observe(timer.query_count)
+    DB_DURATION.labels(route).observe(timer.query_time)
+
+
+def record_cache(cache, hit, count=1):
+    """Count count lookups against a named cache."""
+    if count:
+        CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc(count)
+
+
+def render_latest():
+    """Return the exposition text and content type for all workers."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
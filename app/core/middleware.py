@@ -0,0 +1,84 @@
+"""
+Middleware for the app
+"""
+import logging
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse
+
+from core import metrics
+from core.exceptions import HASHING_BUSY_DETAIL, HASHING_RETRY_AFTER
+from core.hashers import HashingBusy
+from core.instrumentation import (
+    current_timer,
+    track_request,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class ServerTimingMiddleware:
+    """Time each request, report the phases in a Server-Timing header and record metrics."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with track_request() as timer:
+            with connection.execute_wrapper(timer):
+                response = self.get_response(request)
+
+        timer.finish()
+        response['Server-Timing'] = timer.server_timing()
+        metrics.observe_request(request, response, timer)
+
+        if timer.total_ms >= settings.SLOW_REQUEST_MS:
+            statements = '\n'.join(
+                f'  {seconds * 1000:.2f}ms {count}x {sql}'
+                for seconds, count, sql in timer.top_statements()
+            )
+            logger.warning(
+                'Slow request %s %s took %.2fms (%d queries, %.2fms SQL)\n%s',
+                request.method,
+                request.path,
+                timer.total_ms,
+                timer.query_count,
+                timer.query_time * 1000,
+                statements,
+            )
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Mark where URL resolution and middleware end and the view begins."""
+        current_timer().view_start = perf_counter()
+
+    def process_template_response(self, request, response):
+        """Mark where the view ends, DRF responses are rendered after this hook."""
+        current_timer().view_end = perf_counter()
+        return response
+
+
+class HashingBusyMiddleware:
+    """Answer 429 when every password hashing slot is taken, in views outside DRF.
+
+    DRF views go through core.exceptions.exception_handler instead, this covers the admin
+    login and password change forms.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, HashingBusy):
+            return None
+
+        response = HttpResponse(HASHING_BUSY_DETAIL, status=429, content_type='text/plain')
+        response['Retry-After'] = str(HASHING_RETRY_AFTER)
+        return response
@@ -0,0 +1,48 @@
+# Generated by Django 4.0.10 on 2026-10-19 05:11
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_videogame_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videogame',
+            name='console_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.AddField(
+            model_name='videogame',
+            name='tag_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), blank=True, default=list, editable=False, size=None),
+        ),
+        # Fill the arrays of existing games before indexing them, see backfill_videogame_arrays
+        migrations.RunSQL(
+            """
+            UPDATE core_videogame SET
+                tag_ids = ARRAY(
+                    SELECT tag_id FROM core_videogame_tags
+                    WHERE videogame_id = core_videogame.id ORDER BY tag_id
+                ),
+                console_ids = ARRAY(
+                    SELECT console_id FROM core_videogame_consoles
+                    WHERE videogame_id = core_videogame.id ORDER BY console_id
+                )
+            """,
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='videogame',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['tag_ids'], name='videogame_tag_ids_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='videogame',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['console_ids'], name='videogame_console_ids_gin'),
+        ),
+    ]
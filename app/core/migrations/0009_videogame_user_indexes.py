@@ -0,0 +1,37 @@
+# Generated by Django 4.0.10 on 2026-10-19 05:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_videogame_link_arrays'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='videogame',
+            index=models.Index(fields=['user', 'id'], name='videogame_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videogame',
+            index=models.Index(fields=['user', 'title', 'id'], name='videogame_user_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videogame',
+            index=models.Index(fields=['user', 'price', 'id'], name='videogame_user_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videogame',
+            index=models.Index(fields=['user', 'rating', 'id'], name='videogame_user_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videogame',
+            index=models.Index(fields=['user', 'players'], name='videogame_user_players_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videogame',
+            index=models.Index(fields=['user', 'genre'], name='videogame_user_genre_idx'),
+        ),
+    ]
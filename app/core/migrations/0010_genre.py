@@ -0,0 +1,77 @@
+# Generated by Django 4.0.10 on 2026-10-19 06:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_videogame_user_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Genre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='genre',
+            constraint=models.UniqueConstraint(models.F('user'), django.db.models.functions.text.Upper('name'), name='genre_user_name_unique'),
+        ),
+        migrations.AddField(
+            model_name='videogame',
+            name='genre_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.RESTRICT, to='core.genre'),
+        ),
+        # One genre per user and name ignoring case and surrounding spaces, named after the
+        # first spelling in sort order, then every game pointed at its genre
+        migrations.RunSQL(
+            [
+                """
+                INSERT INTO core_genre (user_id, name)
+                SELECT user_id, min(btrim(genre)) FROM core_videogame
+                GROUP BY user_id, upper(btrim(genre))
+                """,
+                """
+                UPDATE core_videogame SET genre_ref_id = core_genre.id FROM core_genre
+                WHERE core_genre.user_id = core_videogame.user_id
+                    AND upper(core_genre.name) = upper(btrim(core_videogame.genre))
+                """,
+            ],
+            [
+                """
+                UPDATE core_videogame SET genre = core_genre.name FROM core_genre
+                WHERE core_genre.id = core_videogame.genre_ref_id
+                """,
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='videogame',
+            name='videogame_user_genre_idx',
+        ),
+        migrations.RemoveField(
+            model_name='videogame',
+            name='genre',
+        ),
+        migrations.RenameField(
+            model_name='videogame',
+            old_name='genre_ref',
+            new_name='genre',
+        ),
+        migrations.AlterField(
+            model_name='videogame',
+            name='genre',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, to='core.genre'),
+        ),
+        migrations.AddIndex(
+            model_name='videogame',
+            index=models.Index(fields=['user', 'genre'], name='videogame_user_genre_idx'),
+        ),
+    ]
@@ -0,0 +1,161 @@
+# Generated by Django 4.0.10 on 2026-10-19 05:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatestChange',
+            fields=[
+                ('user', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('seq', models.BigIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('change_seq', models.BigIntegerField(default=0, editable=False)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='console',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='videogame',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        # Number the existing rows, then have triggers number every later change
+        migrations.RunSQL(
+            [
+                'CREATE SEQUENCE core_change_seq',
+                "UPDATE core_videogame SET change_seq = nextval('core_change_seq')",
+                "UPDATE core_tag SET change_seq = nextval('core_change_seq')",
+                "UPDATE core_console SET change_seq = nextval('core_change_seq')",
+                """
+                INSERT INTO core_latestchange (user_id, seq)
+                SELECT user_id, max(change_seq) FROM (
+                    SELECT user_id, change_seq FROM core_videogame
+                    UNION ALL SELECT user_id, change_seq FROM core_tag
+                    UNION ALL SELECT user_id, change_seq FROM core_console
+                ) AS changes
+                GROUP BY user_id
+                """,
+                # Rows are numbered only once the user's latest change is locked, so the user's
+                # changes commit in order. Updates leaving the row as it was are not changes
+                """
+                CREATE FUNCTION core_number_change() RETURNS trigger AS $$
+                BEGIN
+                    IF TG_OP = 'UPDATE' THEN
+                        NEW.change_seq := OLD.change_seq;
+                        IF NEW IS NOT DISTINCT FROM OLD THEN
+                            RETURN NEW;
+                        END IF;
+                    END IF;
+                    INSERT INTO core_latestchange (user_id, seq) VALUES (NEW.user_id, 0)
+                    ON CONFLICT (user_id) DO NOTHING;
+                    PERFORM 1 FROM core_latestchange WHERE user_id = NEW.user_id FOR UPDATE;
+                    UPDATE core_latestchange SET seq = nextval('core_change_seq')
+                    WHERE user_id = NEW.user_id
+                    RETURNING seq INTO NEW.change_seq;
+                    RETURN NEW;
+                END
+                $$ LANGUAGE plpgsql
+                """,
+                # Deletions of a user being purged are not recorded, nobody syncs them
+                """
+                CREATE FUNCTION core_record_tombstone() RETURNS trigger AS $$
+                BEGIN
+                    IF EXISTS (
+                        SELECT 1 FROM core_user
+                        WHERE id = OLD.user_id AND deletion_requested_at IS NULL
+                    ) THEN
+                        INSERT INTO core_tombstone (user_id, kind, object_id, change_seq)
+                        VALUES (OLD.user_id, TG_ARGV[0], OLD.id, 0);
+                    END IF;
+                    RETURN OLD;
+                END
+                $$ LANGUAGE plpgsql
+                """,
+                """
+                CREATE TRIGGER core_videogame_change BEFORE INSERT OR UPDATE ON core_videogame
+                FOR EACH ROW EXECUTE FUNCTION core_number_change()
+                """,
+                """
+                CREATE TRIGGER core_tag_change BEFORE INSERT OR UPDATE ON core_tag
+                FOR EACH ROW EXECUTE FUNCTION core_number_change()
+                """,
+                """
+                CREATE TRIGGER core_console_change BEFORE INSERT OR UPDATE ON core_console
+                FOR EACH ROW EXECUTE FUNCTION core_number_change()
+                """,
+                """
+                CREATE TRIGGER core_tombstone_change BEFORE INSERT ON core_tombstone
+                FOR EACH ROW EXECUTE FUNCTION core_number_change()
+                """,
+                """
+                CREATE TRIGGER core_videogame_delete AFTER DELETE ON core_videogame
+                FOR EACH ROW EXECUTE FUNCTION core_record_tombstone('videogame')
+                """,
+                """
+                CREATE TRIGGER core_tag_delete AFTER DELETE ON core_tag
+                FOR EACH ROW EXECUTE FUNCTION core_record_tombstone('tag')
+                """,
+                """
+                CREATE TRIGGER core_console_delete AFTER DELETE ON core_console
+                FOR EACH ROW EXECUTE FUNCTION core_record_tombstone('console')
+                """,
+            ],
+            [
+                'DROP TRIGGER core_videogame_change ON core_videogame',
+                'DROP TRIGGER core_tag_change ON core_tag',
+                'DROP TRIGGER core_console_change ON core_console',
+                'DROP TRIGGER core_tombstone_change ON core_tombstone',
+                'DROP TRIGGER core_videogame_delete ON core_videogame',
+                'DROP TRIGGER core_tag_delete ON core_tag',
+                'DROP TRIGGER core_console_delete ON core_console',
+                'DROP FUNCTION core_number_change()',
+                'DROP FUNCTION core_record_tombstone()',
+                'DROP SEQUENCE core_change_seq',
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='console',
+            index=models.Index(fields=['user', 'change_seq'], name='console_user_change_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'change_seq'], name='tag_user_change_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videogame',
+            index=models.Index(fields=['user', 'change_seq'], name='videogame_user_change_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['user', 'change_seq'], name='tombstone_user_change_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.0.10 on 2026-10-19 05:37
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+    # Built without blocking writes to the large tables
+    atomic = False
+
+    dependencies = [
+        ('core', '0013_change_sequence'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='console',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), name='console_name_search_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='tag',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), name='tag_name_search_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='user',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('email'), name='text_pattern_ops'), name='user_email_search_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='user',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), name='user_name_search_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='videogame',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('title'), name='text_pattern_ops'), name='videogame_title_search_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.0.10 on 2026-10-19 05:51
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Built without blocking writes to the large tables
+    atomic = False
+
+    dependencies = [
+        ('core', '0014_admin_search_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name='videogame',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='videogame_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
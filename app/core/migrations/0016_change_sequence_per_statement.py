@@ -0,0 +1,137 @@
+# Generated by Django 4.0.10 on 2026-10-19 07:12
+
+from django.db import migrations
+
+
+TABLES = ['videogame', 'tag', 'console']
+
+# The functions as created by 0013, restored when reversing
+OLD_NUMBER_CHANGE = """
+CREATE OR REPLACE FUNCTION core_number_change() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        NEW.change_seq := OLD.change_seq;
+        IF NEW IS NOT DISTINCT FROM OLD THEN
+            RETURN NEW;
+        END IF;
+    END IF;
+    INSERT INTO core_latestchange (user_id, seq) VALUES (NEW.user_id, 0)
+    ON CONFLICT (user_id) DO NOTHING;
+    PERFORM 1 FROM core_latestchange WHERE user_id = NEW.user_id FOR UPDATE;
+    UPDATE core_latestchange SET seq = nextval('core_change_seq')
+    WHERE user_id = NEW.user_id
+    RETURNING seq INTO NEW.change_seq;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+OLD_RECORD_TOMBSTONE = """
+CREATE FUNCTION core_record_tombstone() RETURNS trigger AS $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM core_user
+        WHERE id = OLD.user_id AND deletion_requested_at IS NULL
+    ) THEN
+        INSERT INTO core_tombstone (user_id, kind, object_id, change_seq)
+        VALUES (OLD.user_id, TG_ARGV[0], OLD.id, 0);
+    END IF;
+    RETURN OLD;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_title_trigram_index'),
+    ]
+
+    operations = [
+        # Each changed row takes a number after a transaction level advisory lock on its user,
+        # so the user's changes still commit in the order of their numbers. The user's latest
+        # change is then written once per statement from the changed rows, instead of once per
+        # row, which left a dead version of that row per changed row until commit
+        migrations.RunSQL(
+            [
+                """
+                CREATE OR REPLACE FUNCTION core_number_change() RETURNS trigger AS $$
+                BEGIN
+                    IF TG_OP = 'UPDATE' THEN
+                        NEW.change_seq := OLD.change_seq;
+                        IF NEW IS NOT DISTINCT FROM OLD THEN
+                            RETURN NEW;
+                        END IF;
+                    END IF;
+                    PERFORM pg_advisory_xact_lock(NEW.user_id);
+                    NEW.change_seq := nextval('core_change_seq');
+                    RETURN NEW;
+                END
+                $$ LANGUAGE plpgsql
+                """,
+                """
+                CREATE FUNCTION core_record_latest_change() RETURNS trigger AS $$
+                BEGIN
+                    INSERT INTO core_latestchange (user_id, seq)
+                    SELECT user_id, max(change_seq) FROM changed GROUP BY user_id
+                    ON CONFLICT (user_id) DO UPDATE
+                    SET seq = EXCLUDED.seq WHERE core_latestchange.seq < EXCLUDED.seq;
+                    RETURN NULL;
+                END
+                $$ LANGUAGE plpgsql
+                """,
+                # One insert of all the deleted rows' tombstones per statement, rather than one
+                # per row each writing the latest change again
+                """
+                CREATE FUNCTION core_record_tombstones() RETURNS trigger AS $$
+                BEGIN
+                    INSERT INTO core_tombstone (user_id, kind, object_id, change_seq)
+                    SELECT deleted.user_id, TG_ARGV[0], deleted.id, 0
+                    FROM deleted JOIN core_user ON core_user.id = deleted.user_id
+                    WHERE core_user.deletion_requested_at IS NULL;
+                    RETURN NULL;
+                END
+                $$ LANGUAGE plpgsql
+                """,
+            ] + [
+                f"""
+                CREATE TRIGGER core_{table}_{event.lower()}_latest AFTER {event} ON core_{table}
+                REFERENCING NEW TABLE AS changed
+                FOR EACH STATEMENT EXECUTE FUNCTION core_record_latest_change()
+                """
+                for table in TABLES + ['tombstone']
+                for event in (['INSERT'] if table == 'tombstone' else ['INSERT', 'UPDATE'])
+            ] + [
+                f'DROP TRIGGER core_{table}_delete ON core_{table}' for table in TABLES
+            ] + [
+                f"""
+                CREATE TRIGGER core_{table}_delete AFTER DELETE ON core_{table}
+                REFERENCING OLD TABLE AS deleted
+                FOR EACH STATEMENT EXECUTE FUNCTION core_record_tombstones('{table}')
+                """
+                for table in TABLES
+            ] + [
+                'DROP FUNCTION core_record_tombstone()',
+            ],
+            [
+                OLD_RECORD_TOMBSTONE,
+            ] + [
+                f'DROP TRIGGER core_{table}_delete ON core_{table}' for table in TABLES
+            ] + [
+                f"""
+                CREATE TRIGGER core_{table}_delete AFTER DELETE ON core_{table}
+                FOR EACH ROW EXECUTE FUNCTION core_record_tombstone('{table}')
+                """
+                for table in TABLES
+            ] + [
+                f'DROP TRIGGER core_{table}_{event.lower()}_latest ON core_{table}'
+                for table in TABLES + ['tombstone']
+                for event in (['INSERT'] if table == 'tombstone' else ['INSERT', 'UPDATE'])
+            ] + [
+                'DROP FUNCTION core_record_tombstones()',
+                'DROP FUNCTION core_record_latest_change()',
+                OLD_NUMBER_CHANGE,
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.0.10 on 2026-10-19 08:03
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import (
+    AddIndexConcurrently,
+    BtreeGinExtension,
+    RemoveIndexConcurrently,
+)
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Built without blocking writes to the large tables
+    atomic = False
+
+    dependencies = [
+        ('core', '0016_change_sequence_per_statement'),
+    ]
+
+    operations = [
+        BtreeGinExtension(),
+        AddIndexConcurrently(
+            model_name='videogame',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['user', 'title'], name='videogame_user_title_trgm_idx', opclasses=['int8_ops', 'gin_trgm_ops']),
+        ),
+        RemoveIndexConcurrently(
+            model_name='videogame',
+            name='videogame_title_trgm_idx',
+        ),
+    ]
@@ -3,9 +3,17 @@ Database models
 """
 import uuid
 import os
+from datetime import timedelta
+from decimal import Decimal
 
 from django.conf import settings
-from django.db import models
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection, models, transaction
+from django.db.models.functions import Cast, Upper
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -21,6 +29,15 @@ def videogame_image_file_path(instance, filename):
     return os.path.join('uploads', 'videogame', filename)
 
 
+def prefix_search_index(field, name):
+    """Return an index for case insensitive prefix searches of field, as the admin makes.
+
+    `field__istartswith` compares UPPER(field) with LIKE 'PREFIX%', which a b-tree only
+    serves with the pattern operator class whatever the database collation.
+    """
+    return models.Index(OpClass(Upper(field), name='text_pattern_ops'), name=name)
+
+
 class UserManager(BaseUserManager):
     """Manager for users"""
 
@@ -52,11 +69,157 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Set when the account was deleted, its data is then purged in the background
+    deletion_requested_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     objects = UserManager()   # Assigns UserManager to this class
 
     USERNAME_FIELD = 'email'  # Must be defined or else attribute error occurs
 
+    class Meta:
+        indexes = [
+            # Only the few accounts waiting to be purged are indexed
+            models.Index(
+                fields=['deletion_requested_at'], name='user_deletion_requested_idx',
+                condition=models.Q(deletion_requested_at__isnull=False),
+            ),
+            prefix_search_index('email', 'user_email_search_idx'),
+            prefix_search_index('name', 'user_name_search_idx'),
+        ]
+
+
+# Many to many fields of Videogame and the array column holding a copy of their ids
+LINK_ARRAYS = {'tags': 'tag_ids', 'consoles': 'console_ids'}
+
+
+def linked_ids(field):
+    """Return an expression for the sorted ids a video game links to through field."""
+    through = Videogame._meta.get_field(field).remote_field.through
+    column = f'{Videogame._meta.get_field(field).related_model._meta.model_name}_id'
+
+    return ArraySubquery(
+        through.objects.filter(videogame_id=models.OuterRef('pk')).order_by(column).values(column)
+    )
+
+
+class VideogameQuerySet(models.QuerySet):
+    """Queries for video games."""
+
+    def sync_link_arrays(self, fields=tuple(LINK_ARRAYS)):
+        """Rewrite the id arrays of fields from the through tables with one UPDATE."""
+        return self.update(**{LINK_ARRAYS[field]: linked_ids(field) for field in fields})
+
+    def out_of_sync(self, field):
+        """Return the video games whose id array for field differs from the through table."""
+        return self.annotate(expected_ids=linked_ids(field)).exclude(
+            **{LINK_ARRAYS[field]: models.F('expected_ids')}
+        )
+
+    def similar_titles(self, user, title):
+        """Return the user's video games titled like title, the most similar first.
+
+        Titles sharing enough trigrams with title to pass pg_trgm's similarity threshold
+        (0.3 by default) match, found through the (user, title) trigram index. The user is
+        compared as a bigint, btree_gin has no operator for the integer Django sends.
+        """
+        return self.filter(
+            user_id=Cast(models.Value(user.pk), models.BigIntegerField()),
+            title__trigram_similar=title,
+        ).annotate(
+            similarity=TrigramSimilarity('title', title),
+        ).order_by('-similarity', '-id')
+
+    def delete_with_links(self):
+        """Delete the video games and their tag and console links in one statement.
+
+        QuerySet.delete() loads the games to cascade to the through tables and deletes them 100
+        at a time, so here the games are deleted straight from this query and the links from
+        the deleted ids. Return the number of games deleted.
+        """
+        games, params = self.order_by().values('id').query.sql_with_params()
+        links = [
+            f"""
+            {field}_links AS (
+                DELETE FROM {through._meta.db_table}
+                WHERE {Videogame._meta.get_field(field).m2m_column_name()} IN (
+                    SELECT id FROM deleted
+                )
+            )
+            """
+            for field in LINK_ARRAYS
+            for through in [Videogame._meta.get_field(field).remote_field.through]
+        ]
+        sql = f"""
+            WITH deleted AS (
+                DELETE FROM {Videogame._meta.db_table} WHERE id IN ({games}) RETURNING id
+            ), {', '.join(links)}
+            SELECT count(*) FROM deleted
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchone()[0]
+
+    def facets(self, price_bucket=Decimal('10'), price_limit=Decimal('100'), rating_bucket=1):
+        """Count the video games per tag, console, genre, price and rating range in one query.
+
+        Prices are grouped in ranges of price_bucket, with every price from price_limit up in
+        the last range, and ratings in ranges of rating_bucket.
+        """
+        games, params = self.order_by().values(
+            'tag_ids', 'console_ids', 'genre_id', 'price', 'rating',
+        ).query.sql_with_params()
+        links = [
+            f"""
+            SELECT '{field}', item.id, item.name, NULL, count(*)
+            FROM games CROSS JOIN LATERAL unnest(games.{column}) AS link(id)
+            JOIN {Videogame._meta.get_field(field).related_model._meta.db_table} AS item
+                ON item.id = link.id
+            GROUP BY item.id
+            """
+            for field, column in LINK_ARRAYS.items()
+        ]
+        sql = f"""
+            WITH games AS ({games})
+            SELECT 'count', NULL::bigint, NULL::text, NULL::numeric, count(*) FROM games
+            UNION ALL {' UNION ALL '.join(links)}
+            UNION ALL
+            SELECT 'genres', genre.id, genre.name, NULL, count(*)
+            FROM games JOIN {Genre._meta.db_table} AS genre ON genre.id = games.genre_id
+            GROUP BY genre.id
+            UNION ALL
+            SELECT 'price', NULL, NULL, LEAST(floor(price / %s) * %s, %s), count(*)
+            FROM games GROUP BY 4
+            UNION ALL
+            SELECT 'rating', NULL, NULL, floor(rating / %s) * %s, count(*) FROM games GROUP BY 4
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [
+                *params, price_bucket, price_bucket, price_limit, rating_bucket, rating_bucket,
+            ])
+            rows = cursor.fetchall()
+
+        facets = {'count': 0, 'tags': [], 'consoles': [], 'genres': [], 'price': [], 'rating': []}
+        rows.sort(key=lambda row: (-row[4], row[2] or ''))  # most common first
+        for facet, item_id, name, bucket, count in rows:
+            if facet == 'count':
+                facets['count'] = count
+            elif facet == 'genres':
+                facets['genres'].append({'name': name, 'count': count})
+            elif bucket is None:
+                facets[facet].append({'id': item_id, 'name': name, 'count': count})
+            else:
+                width = price_bucket if facet == 'price' else rating_bucket
+                high = None if facet == 'price' and bucket >= price_limit else bucket + width
+                facets[facet].append({
+                    'min': f'{bucket:.2f}',
+                    'max': None if high is None else f'{high:.2f}',
+                    'count': count,
+                })
+
+        for facet in ['price', 'rating']:
+            facets[facet].sort(key=lambda bucket: Decimal(bucket['min']))
+        return facets
+
 
 class Videogame(models.Model):
     """Videogame object"""
@@ -70,15 +233,89 @@ class Videogame(models.Model):
     rating = models.DecimalField(max_digits=4, decimal_places=2)
     consoles = models.ManyToManyField('Console')
     players = models.IntegerField()
-    genre = models.CharField(max_length=255)
+    genre = models.ForeignKey('Genre', on_delete=models.RESTRICT)  # deleted only with its user
     description = models.TextField(blank=True)  # inserted into database as ''
     link = models.CharField(max_length=255, blank=True)
     tags = models.ManyToManyField('Tag')
     image = models.ImageField(null=True, upload_to=videogame_image_file_path)
 
+    # Copies of the tags and consoles ids so filters read one table, kept in sync by core.signals
+    tag_ids = ArrayField(models.BigIntegerField(), default=list, blank=True, editable=False)
+    console_ids = ArrayField(models.BigIntegerField(), default=list, blank=True, editable=False)
+    change_seq = models.BigIntegerField(default=0, editable=False)  # set by a trigger
+
+    objects = VideogameQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['tag_ids'], name='videogame_tag_ids_gin'),
+            GinIndex(fields=['console_ids'], name='videogame_console_ids_gin'),
+            # A user's games filtered on or sorted by a column, ties sorted by id. Read forwards
+            # or backwards so neither direction needs a sort
+            models.Index(fields=['user', 'id'], name='videogame_user_id_idx'),
+            models.Index(fields=['user', 'title', 'id'], name='videogame_user_title_idx'),
+            models.Index(fields=['user', 'price', 'id'], name='videogame_user_price_idx'),
+            models.Index(fields=['user', 'rating', 'id'], name='videogame_user_rating_idx'),
+            models.Index(fields=['user', 'players'], name='videogame_user_players_idx'),
+            models.Index(fields=['user', 'genre'], name='videogame_user_genre_idx'),
+            models.Index(fields=['user', 'change_seq'], name='videogame_user_change_idx'),
+            prefix_search_index('title', 'videogame_title_search_idx'),
+            # Trigrams of a user's titles, for titles similar to one typed differently. The user
+            # is indexed with btree_gin so only their own titles are matched
+            GinIndex(
+                fields=['user', 'title'], opclasses=['int8_ops', 'gin_trgm_ops'],
+                name='videogame_user_title_trgm_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        """Save the video game, leaving the id arrays to the database."""
+        if not self._state.adding and kwargs.get('update_fields') is None \
+                and not kwargs.get('force_insert'):
+            # A copy loaded before the tags or consoles changed must not overwrite the arrays
+            # and the database numbers changes itself
+            skipped = self.get_deferred_fields() | set(LINK_ARRAYS.values()) | {'change_seq'}
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+
+        super().save(*args, **kwargs)
+
+
+class GenreManager(models.Manager):
+    """Manager for genres"""
+
+    def get_or_create_by_name(self, user, name):
+        """Return the genre of user called name in any case, creating it if needed."""
+        genre, _ = self.get_or_create(user=user, name__iexact=name, defaults={'name': name})
+        return genre
+
+
+class Genre(models.Model):
+    """Genre of a user's video games, stored once however many games share it."""
+    name = models.CharField(max_length=255)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+
+    objects = GenreManager()
+
+    class Meta:
+        constraints = [
+            # One genre per name ignoring case, also the index `name__iexact` lookups use
+            models.UniqueConstraint(
+                models.F('user'), Upper('name'), name='genre_user_name_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
 
 class Tag(models.Model):
     """Tag for filtering video games."""
@@ -87,6 +324,13 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    change_seq = models.BigIntegerField(default=0, editable=False)  # set by a trigger
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'change_seq'], name='tag_user_change_idx'),
+            prefix_search_index('name', 'tag_name_search_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -106,6 +350,159 @@ class Console(models.Model):
     #    null=True required because if blank, will default to null
     price = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)
     rating = models.DecimalField(max_digits=4, decimal_places=2, blank=True, null=True)
+    change_seq = models.BigIntegerField(default=0, editable=False)  # set by a trigger
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'change_seq'], name='console_user_change_idx'),
+            prefix_search_index('name', 'console_name_search_idx'),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class Tombstone(models.Model):
+    """Deleted video game, tag or console, recorded by a trigger for clients syncing changes."""
+    KINDS = ['videogame', 'tag', 'console']
+
+    # Written by triggers that can run after Django has deleted the user's rows, so the user
+    # is not a constraint and core.purge deletes these rows itself
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='+',
+    )
+    kind = models.CharField(max_length=10)  # one of KINDS
+    object_id = models.BigIntegerField()
+    change_seq = models.BigIntegerField(default=0, editable=False)  # set by a trigger
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'change_seq'], name='tombstone_user_change_idx')]
+
+
+class LatestChange(models.Model):
+    """Sequence number of a user's latest change, maintained by triggers.
+
+    Every change of a user's games, tags and consoles holds an advisory lock on the user until
+    its transaction commits, so the user's changes commit in the order of their sequence
+    numbers and a client that has seen up to `seq` cannot miss an earlier change committing
+    later. The row is written once per statement, however many rows it changed.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False,
+        primary_key=True, related_name='+',
+    )
+    seq = models.BigIntegerField()
+
+
+WORKER_LOST = 'Worker lost: the job stopped reporting back after its last attempt.'
+
+
+class JobQuerySet(models.QuerySet):
+    """Queries for the job queue"""
+
+    def due(self):
+        """Return the jobs waiting to run, or whose worker stopped reporting back."""
+        return self.filter(
+            state__in=[Job.QUEUED, Job.RUNNING], run_at__lte=timezone.now(),
+        ).order_by('-priority', 'run_at', 'id')
+
+    def claim(self, limit, visibility_timeout):
+        """Take up to limit due jobs for this worker and return their ids.
+
+        SKIP LOCKED lets any number of workers claim at once without waiting on, or taking,
+        each other's jobs. A claimed job is hidden for visibility_timeout seconds, extended by
+        its worker's heartbeat while it runs, so a job whose worker stopped reporting back is
+        assumed lost with its worker and is run again, or failed after its last attempt.
+        """
+        with transaction.atomic():
+            # A job lost on its last attempt, its worker killed or restarted while running it,
+            # fails instead of being run again for ever
+            lost = self.filter(
+                state=Job.RUNNING, run_at__lte=timezone.now(),
+                attempts__gte=models.F('max_attempts'),
+            ).select_for_update(skip_locked=True).values('id')
+            self.filter(id__in=lost).update(state=Job.FAILED, last_error=WORKER_LOST)
+            ids = list(
+                self.due().select_for_update(skip_locked=True).values_list('id', flat=True)[:limit]
+            )
+            if ids:
+                self.filter(id__in=ids).update(
+                    state=Job.RUNNING,
+                    attempts=models.F('attempts') + 1,
+                    run_at=timezone.now() + timedelta(seconds=visibility_timeout),
+                )
+
+        return ids
+
+
+class Job(models.Model):
+    """Function queued to run on a worker, see core/jobs.py."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=255)  # dotted path of the function
+    kwargs = models.JSONField(default=dict)
+    priority = models.SmallIntegerField(default=0)  # higher runs first
+    state = models.CharField(max_length=10, choices=STATES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField()
+    # When a queued job may start, or when a running one is given up for lost
+    run_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_error = models.TextField(blank=True)
+
+    objects = JobQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # The order jobs are claimed in, failed jobs are left out
+            models.Index(
+                models.F('priority').desc(), 'run_at', 'id', name='job_due_idx',
+                condition=models.Q(state__in=['queued', 'running']),
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.id}'
+
+    def _claimed(self):
+        """Return this job while still running under the claim it was loaded with.
+
+        Every claim counts an attempt, so a job given up for lost and claimed again by another
+        worker no longer matches, and this run leaves it alone.
+        """
+        return Job.objects.filter(id=self.id, attempts=self.attempts, state=Job.RUNNING)
+
+    def heartbeat(self, visibility_timeout):
+        """Hide the job from other workers for visibility_timeout more seconds.
+
+        Return whether the job is still claimed by this run.
+        """
+        return self._claimed().update(
+            run_at=timezone.now() + timedelta(seconds=visibility_timeout),
+        ) == 1
+
+    def complete(self):
+        """Delete the finished job and return whether it was still claimed by this run."""
+        deleted, _ = self._claimed().delete()
+        return deleted == 1
+
+    def retry_or_fail(self, error, retry_delay):
+        """Queue the job again after a growing delay, or mark it failed after its last attempt.
+
+        Return whether the job was still claimed by this run, else it is left unchanged.
+        """
+        self.last_error = error
+        if self.attempts >= self.max_attempts:
+            self.state = Job.FAILED
+        else:
+            self.state = Job.QUEUED
+            delay = retry_delay * 2 ** (self.attempts - 1)
+            self.run_at = timezone.now() + timedelta(seconds=delay)
+
+        return self._claimed().update(
+            last_error=self.last_error, state=self.state, run_at=self.run_at,
+        ) == 1
@@ -0,0 +1,35 @@
+"""
+Parsers for API requests beyond those included in Django REST framework
+"""
+from decimal import Decimal
+
+import msgpack
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from core.renderers import DECIMAL_EXT_TYPE
+
+
+def _decode_ext(code, data):
+    """Return the decimal a decimal extension holds, other extensions are left as they are."""
+    if code != DECIMAL_EXT_TYPE:
+        return msgpack.ExtType(code, data)
+    if len(data) < 2:
+        raise ValueError('decimal extension needs a scale and digits')
+
+    return Decimal(int.from_bytes(data[1:], 'big', signed=True)).scaleb(-data[0])
+
+
+class MessagePackParser(BaseParser):
+    """Parser for request bodies sent as Content-Type: application/msgpack"""
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Unpack the body, marking the request so decimal fields take decimal extensions only."""
+        request = (parser_context or {}).get('request')
+        if request is not None:
+            request.decimals_as_extension = True
+        try:
+            return msgpack.unpackb(stream.read(), raw=False, ext_hook=_decode_ext)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
@@ -0,0 +1,92 @@
+"""
+Deleting users in the background, in bounded batches
+"""
+import logging
+import time
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+
+from core.jobs import enqueue, job
+from core.models import (
+    Genre,
+    LatestChange,
+    Tombstone,
+    Videogame,
+    Tag,
+    Console,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+@transaction.atomic
+def request_deletion(user):
+    """Disable the account now and queue the purge of its data."""
+    user.is_active = False
+    user.deletion_requested_at = timezone.now()
+    user.save(update_fields=['is_active', 'deletion_requested_at'])
+    Token.objects.filter(user=user).delete()
+
+    # Queued in this transaction, so the purge only runs if the account was disabled
+    enqueue(purge_user, user_id=user.pk)
+
+
+def _delete_files(storage, names):
+    """Delete image files, a missing file is not an error."""
+    for name in names:
+        storage.delete(name)
+
+
+def _delete_in_batches(queryset, batch_size, file_field=None):
+    """Delete the rows of queryset, batch_size rows per transaction, and return the count.
+
+    Short transactions keep locks brief and memory bounded however large the library. Files
+    stored in file_field are removed once the rows referencing them are.
+    """
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            batch = queryset.model.objects.filter(id__in=ids)
+            if file_field:
+                names = [name for name in batch.values_list(file_field, flat=True) if name]
+                storage = queryset.model._meta.get_field(file_field).storage
+                transaction.on_commit(partial(_delete_files, storage, names))
+            batch.delete()  # many to many links go with their rows
+        deleted += len(ids)
+
+
+@job
+def purge_user(user_id, batch_size=None):
+    """Delete everything a user owns, then the user, and return the rows deleted per model."""
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    start = time.monotonic()
+    # Games go first, tags, consoles and genres are then no longer linked to any
+    counts = {
+        'videogame': _delete_in_batches(
+            Videogame.objects.filter(user_id=user_id), batch_size, file_field='image',
+        ),
+    }
+    for model in [Tag, Console, Genre]:
+        counts[model._meta.model_name] = _delete_in_batches(
+            model.objects.filter(user_id=user_id), batch_size,
+        )
+    get_user_model().objects.filter(pk=user_id).delete()
+    # Sync records are not tied to the user by a constraint, so are not deleted with it
+    Tombstone.objects.filter(user_id=user_id).delete()
+    LatestChange.objects.filter(user_id=user_id).delete()
+
+    logger.info(
+        'Purged user %s in %.1fs: %s', user_id, time.monotonic() - start,
+        ', '.join(f'{count} {name}' for name, count in counts.items()),
+    )
+    return counts
@@ -0,0 +1,52 @@
+"""
+Renderers for API responses beyond those included in Django REST framework
+"""
+from decimal import Decimal
+
+import msgpack
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+# MessagePack extension type of decimals, read back by core.parsers
+DECIMAL_EXT_TYPE = 1
+
+
+def pack_decimal(value):
+    """Return a decimal, or its plain string, as a decimal extension.
+
+    The extension holds the scale as a byte, then the digits unscaled as a big-endian signed
+    integer, so 59.99 is scale 2 and 5999. Exact, unlike a float, and unambiguous, unlike a
+    plain integer of minor units.
+    """
+    text = value if isinstance(value, str) else format(value, 'f')
+    whole, _, fraction = text.partition('.')
+    digits = int(whole + fraction)
+    return msgpack.ExtType(DECIMAL_EXT_TYPE, bytes((len(fraction),)) + digits.to_bytes(
+        (digits.bit_length() + 8) // 8, 'big', signed=True,  # with room for the sign bit
+    ))
+
+
+def _encode(obj):
+    """Return a type MessagePack can pack in place of obj."""
+    if isinstance(obj, Decimal):
+        return pack_decimal(obj)
+    # Dates, UUIDs, lazy strings and so on as they are sent in JSON
+    return JSONEncoder().default(obj)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Renderer for compact binary responses, picked with Accept: application/msgpack"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    # Serializer decimal fields hand decimals over as decimal extensions instead of strings
+    decimals_as_extension = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Pack data, an empty body stays empty."""
+        if data is None:
+            return b''
+
+        return msgpack.packb(data, default=_encode, use_bin_type=True)
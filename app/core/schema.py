@@ -0,0 +1,97 @@
+"""
+Precomputed OpenAPI schema served from memory
+"""
+import hashlib
+import json
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import translation
+
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.views import SpectacularAPIView
+
+from core import metrics
+
+
+_schemas = {}  # language: schema
+_responses = {}  # (language, media type): (content, etag)
+_lock = threading.Lock()
+
+
+def generate_schema():
+    """Introspect every view and serializer to build the schema."""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    return generator.get_schema(request=None, public=True)
+
+
+def schema_language():
+    """Return the language of settings.LANGUAGES the schema is served in.
+
+    drf-spectacular activates whatever ?lang= a client sends, so keying the caches by the
+    active language would build and keep a schema for every made up language.
+    """
+    try:
+        return translation.get_supported_language_variant(translation.get_language())
+    except LookupError:
+        return default_language()
+
+
+def default_language():
+    """Return the language of settings.LANGUAGES that LANGUAGE_CODE stands for."""
+    return translation.get_supported_language_variant(settings.LANGUAGE_CODE)
+
+
+def get_schema():
+    """Return the schema for the active language, built at most once per process.
+
+    The default language is read from SCHEMA_FILE when it was generated at build time
+    with the build_schema command.
+    """
+    language = schema_language()
+    schema = _schemas.get(language)
+    if schema is None:
+        with _lock:
+            schema = _schemas.get(language)
+            if schema is None:
+                if settings.SCHEMA_FILE and language == default_language():
+                    with open(settings.SCHEMA_FILE) as schema_file:
+                        schema = json.load(schema_file)
+                else:
+                    with translation.override(language):
+                        schema = generate_schema()
+                _schemas[language] = schema
+
+    return schema
+
+
+def clear_cache():
+    """Forget generated schemas, they are rebuilt on the next request."""
+    with _lock:
+        _schemas.clear()
+        _responses.clear()
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """Serve the schema from memory with ETag support instead of generating it per request."""
+
+    def _get_schema_response(self, request):
+        key = (schema_language(), request.accepted_media_type)
+        cached = _responses.get(key)
+        metrics.record_cache('schema', cached is not None)
+        if cached is None:
+            content = request.accepted_renderer.render(get_schema(), renderer_context={})
+            etag = f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+            cached = _responses[key] = (content, etag)
+
+        content, etag = cached
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type=request.accepted_media_type)
+            response['Content-Disposition'] = \
+                f'inline; filename="{self._get_filename(request, None)}"'
+        response['ETag'] = etag
+
+        return response
@@ -0,0 +1,69 @@
+"""
+Keep the tag and console id arrays of video games in sync with their links
+"""
+from django.contrib.postgres.fields import ArrayField
+from django.db import models
+from django.db.models.signals import m2m_changed, post_delete
+from django.dispatch import receiver
+
+from core.models import (
+    LINK_ARRAYS,
+    Videogame,
+    Tag,
+    Console,
+)
+
+
+THROUGH_FIELDS = {
+    Videogame.tags.through: 'tags',
+    Videogame.consoles.through: 'consoles',
+}
+
+
+@receiver(m2m_changed, sender=Videogame.tags.through)
+@receiver(m2m_changed, sender=Videogame.consoles.through)
+def sync_link_arrays(sender, instance, action, reverse, pk_set, **kwargs):
+    """Rewrite the id array of the video games whose tags or consoles changed."""
+    field = THROUGH_FIELDS[sender]
+
+    if reverse:  # instance is a tag or console, the video games are on the other side
+        if action == 'pre_clear':
+            instance._cleared_videogame_ids = list(
+                sender.objects.filter(**{f'{instance._meta.model_name}_id': instance.pk})
+                .values_list('videogame_id', flat=True)
+            )
+            return
+        if action == 'post_clear':
+            pk_set = instance.__dict__.pop('_cleared_videogame_ids', [])
+        elif action not in ('post_add', 'post_remove'):
+            return
+        Videogame.objects.filter(pk__in=pk_set).sync_link_arrays([field])
+        return
+
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        Videogame.objects.filter(pk=instance.pk).sync_link_arrays([field])
+        # Defer the copy in memory, it is reloaded from the database if it is read
+        instance.__dict__.pop(LINK_ARRAYS[field], None)
+
+
+def _remove_from_arrays(field, pk):
+    """Remove a deleted tag or console id from the arrays holding it."""
+    column = LINK_ARRAYS[field]
+    Videogame.objects.filter(**{f'{column}__contains': [pk]}).update(**{
+        column: models.Func(
+            models.F(column), models.Value(pk), function='array_remove',
+            output_field=ArrayField(models.BigIntegerField()),
+        ),
+    })
+
+
+@receiver(post_delete, sender=Tag)
+def remove_deleted_tag(sender, instance, **kwargs):
+    """Drop a deleted tag from video game arrays, its links are deleted without signals."""
+    _remove_from_arrays('tags', instance.pk)
+
+
+@receiver(post_delete, sender=Console)
+def remove_deleted_console(sender, instance, **kwargs):
+    """Drop a deleted console from video game arrays, its links are deleted without signals."""
+    _remove_from_arrays('consoles', instance.pk)
@@ -0,0 +1,19 @@
+"""
+Storage of collected static files
+"""
+from django.contrib.staticfiles import storage
+
+
+class ManifestStaticFilesStorage(storage.ManifestStaticFilesStorage):
+    """Static files named after a hash of their content, listed in staticfiles.json.
+
+    A file's URL changes whenever its content does, so the proxy lets browsers cache static
+    files for good. Until `collectstatic` has written the manifest, e.g. when running the
+    tests, files are served under their own names.
+    """
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+
+        return super().stored_name(name)
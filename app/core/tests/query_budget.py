@@ -0,0 +1,97 @@
+"""
+Query-count and latency budgets for API tests
+"""
+import re
+import time
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+Budget = namedtuple('Budget', ['queries', 'ms'])
+
+# Maximum number of SQL statements (and wall clock milliseconds) allowed per endpoint and action.
+# Read budgets must hold regardless of how many rows are returned, so they are asserted
+# against lists with several related objects per row. Latency budgets are deliberately loose,
+# they catch order-of-magnitude regressions and not noise.
+QUERY_BUDGETS = {
+    'videogame-list': Budget(queries=3, ms=1000),  # games, prefetched tags, prefetched consoles
+    'videogame-retrieve': Budget(queries=3, ms=1000),
+    # look up the genre (and insert it in a savepoint when new), insert, tags and consoles
+    'videogame-create': Budget(queries=7, ms=1000),
+    # as above, then per tags and consoles: look up every name at once, insert the missing ones,
+    # link and sync the id array (3), and read them back for the response
+    'videogame-create-with-names': Budget(queries=17, ms=1000),
+    'videogame-partial-update': Budget(queries=6, ms=1000),  # prefetch is refreshed after save
+    'videogame-destroy': Budget(queries=6, ms=1000),  # fetch with prefetch, clear m2m, delete
+    'videogame-upload-image': Budget(queries=4, ms=1000),
+    'videogame-facets': Budget(queries=1, ms=1000),  # every facet grouped over one CTE
+    'videogame-changes-none': Budget(queries=1, ms=1000),  # the user's latest change only
+    # latest change, page end, games with genres, their tags and consoles, changed tags,
+    # changed consoles, deletions
+    'videogame-changes': Budget(queries=8, ms=1000),
+    # Bulk actions also count the savepoint their transaction becomes inside a test
+    # UPDATE ... WHERE id IN (SELECT ...), after getting or creating the genre when it is set
+    'videogame-bulk-update': Budget(queries=7, ms=1000),
+    # DELETE of the games with their links in CTEs, whose statement trigger writes the tombstones
+    'videogame-bulk-delete': Budget(queries=3, ms=1000),
+    'tag-list': Budget(queries=1, ms=1000),
+    'tag-partial-update': Budget(queries=2, ms=1000),
+    'tag-destroy': Budget(queries=4, ms=1000),
+    # lookup, relink (3), sync arrays, delete duplicates (3), one array cleanup per duplicate
+    'tag-merge': Budget(queries=13, ms=1000),
+    'console-list': Budget(queries=1, ms=1000),
+    'console-partial-update': Budget(queries=2, ms=1000),
+    'console-destroy': Budget(queries=4, ms=1000),
+    'console-merge': Budget(queries=13, ms=1000),
+}
+
+# Literals are stripped so repeated statements with different parameters group together
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def normalize_sql(sql):
+    """Return sql with literal values replaced by placeholders."""
+    return _LITERALS.sub('?', sql)
+
+
+def format_budget_failure(name, budget, queries):
+    """Describe which statements pushed a request over its query budget."""
+    lines = [
+        f'{name} executed {len(queries)} queries, budget is {budget.queries}.',
+        'Statements over budget:',
+    ]
+    for index, query in enumerate(queries[budget.queries:], start=budget.queries + 1):
+        lines.append(f'  {index}. {query["sql"]}')
+
+    repeated = [
+        (count, sql) for sql, count in
+        Counter(normalize_sql(query['sql']) for query in queries).most_common()
+        if count > 1
+    ]
+    if repeated:
+        lines.append('Repeated statements (likely N+1):')
+        lines.extend(f'  {count}x {sql}' for count, sql in repeated)
+
+    return '\n'.join(lines)
+
+
+class QueryBudgetMixin:
+    """Assert API calls stay within the declared QUERY_BUDGETS."""
+
+    @contextmanager
+    def assertWithinBudget(self, name):
+        """Fail if the wrapped block exceeds the query or latency budget for name."""
+        budget = QUERY_BUDGETS[name]
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            yield context
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+        queries = context.captured_queries
+        if len(queries) > budget.queries:
+            self.fail(format_budget_failure(name, budget, queries))
+        if budget.ms is not None and elapsed_ms > budget.ms:
+            self.fail(f'{name} took {elapsed_ms:.0f}ms, budget is {budget.ms}ms.')
@@ -1,12 +1,25 @@
 """
 Tests for the Django admin modifications
 """
+from decimal import Decimal
+from unittest.mock import patch
 
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.test import Client
 
+from core.admin import EstimatedCountPaginator
+from core.models import (
+    Genre,
+    Job,
+    Videogame,
+    Tag,
+)
+
 
 class AdminSiteTests(TestCase):
     """Tests for Django admin"""
@@ -46,3 +59,96 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+    def test_delete_user_purges_in_background(self):
+        """Test deleting a user from the admin disables them and queues the purge."""
+        url = reverse('admin:core_user_delete', args=[self.user.id])
+
+        res = self.client.post(url, {'post': 'yes'})
+
+        self.assertEqual(res.status_code, 302)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertEqual(Job.objects.get().kwargs, {'user_id': self.user.id})
+
+    def test_delete_user_needs_delete_permission_for_their_objects(self):
+        """Test staff without permission to delete a user's games cannot delete the user."""
+        staff = get_user_model().objects.create_user(
+            'staff@example.com', 'testpass123', is_staff=True,
+        )
+        staff.user_permissions.add(*Permission.objects.filter(
+            content_type__app_label='core', codename__in=['view_user', 'delete_user'],
+        ))
+        Videogame.objects.create(
+            user=self.user, title='Halo 3', price=Decimal('60.00'), rating=Decimal('10.00'),
+            players=4, genre=Genre.objects.get_or_create_by_name(self.user, 'FPS'),
+        )
+        self.client.force_login(staff)
+        url = reverse('admin:core_user_delete', args=[self.user.id])
+
+        res = self.client.get(url)
+        self.assertEqual(res.context['perms_lacking'], {'videogame', 'genre'})
+
+        res = self.client.post(url, {'post': 'yes'})
+        self.assertEqual(res.status_code, 403)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)
+        self.assertFalse(Job.objects.exists())
+
+
+class LargeTableAdminTests(TestCase):
+    """Tests for the admin pages of tables with many rows"""
+
+    def setUp(self):
+        self.client = Client()
+        self.admin_user = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+        )
+        self.client.force_login(self.admin_user)
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.videogame = Videogame.objects.create(
+            user=self.user, title='Halo 3', price=Decimal('60.00'), rating=Decimal('10.00'),
+            players=4, genre=Genre.objects.get_or_create_by_name(self.user, 'FPS'),
+        )
+        Videogame.objects.create(
+            user=self.user, title='Portal', price=Decimal('10.00'), rating=Decimal('9.00'),
+            players=1, genre=Genre.objects.get_or_create_by_name(self.user, 'Puzzle'),
+        )
+
+    def test_estimated_count_when_unfiltered(self):
+        """Test unfiltered lists are counted from statistics and filtered ones exactly."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_videogame')
+
+        with patch('core.admin.ESTIMATE_COUNT_ABOVE', 0), \
+                CaptureQueriesContext(connection) as queries:
+            estimated = EstimatedCountPaginator(Videogame.objects.all(), 100).count
+            exact = EstimatedCountPaginator(
+                Videogame.objects.filter(title__istartswith='hal'), 100,
+            ).count
+
+        self.assertEqual((estimated, exact), (2, 1))
+        self.assertNotIn('COUNT', queries[0]['sql'])
+        self.assertIn('COUNT', queries[1]['sql'])
+
+    def test_videogame_change_page_has_no_select_options(self):
+        """Test the change form does not list every user, tag and console."""
+        Tag.objects.create(user=self.user, name='Unrelated tag')
+        get_user_model().objects.create_user('bystander@example.com', 'testpass123')
+        url = reverse('admin:core_videogame_change', args=[self.videogame.id])
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertNotContains(res, 'Unrelated tag')
+        self.assertNotContains(res, 'bystander@example.com')
+
+    def test_changelist_prefix_search(self):
+        """Test video games are searched by the start of their title, in any case."""
+        url = reverse('admin:core_videogame_changelist')
+
+        res = self.client.get(url, {'q': 'hal'})
+
+        self.assertContains(res, 'Halo 3')
+        self.assertNotContains(res, 'Portal')
@@ -1,13 +1,23 @@
 """
 Test custom Django management commands.
 """
+from io import StringIO
 from unittest.mock import patch  # Simulate whether a database is returning a response or not
 
 from psycopg2 import OperationalError as Psycopg2Error  # error if connect before databse ready
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command  # simuilate a command call
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError  # another possible eroor if before datase is ready
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
+
+from core.models import (
+    Genre,
+    Videogame,
+    Tag,
+    Console,
+)
 
 
 # Provide path to command we are mocking, patches add new arguments to all methods
@@ -47,3 +57,99 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+class SeedDataCommandTests(TestCase):
+    """Test the seed_data command"""
+
+    def _snapshot(self):
+        """Return the seeded libraries without database ids."""
+        return sorted(
+            Videogame.objects.values_list(
+                'user__email', 'title', 'price', 'rating', 'players', 'genre__name', 'image',
+            )
+        )
+
+    def test_seed_data_creates_libraries(self):
+        """Test users are created with games, tags, consoles and a usable password."""
+        call_command('seed_data', users=3, seed=1, games_mean=5, stdout=StringIO())
+
+        users = get_user_model().objects.filter(email__startswith='seed1.')
+        self.assertEqual(users.count(), 3)
+        self.assertTrue(users[0].check_password('password123'))
+        self.assertTrue(Tag.objects.filter(user__in=users).exists())
+        self.assertTrue(Console.objects.filter(user__in=users).exists())
+        for videogame in Videogame.objects.filter(user__in=users):
+            self.assertTrue(videogame.consoles.exists())
+        # Games are copied in with their id arrays filled
+        self.assertFalse(Videogame.objects.out_of_sync('tags').exists())
+        self.assertFalse(Videogame.objects.out_of_sync('consoles').exists())
+
+    def test_seed_data_deterministic(self):
+        """Test the same seed generates the same data."""
+        call_command('seed_data', users=3, seed=2, games_mean=5, stdout=StringIO())
+        first = self._snapshot()
+        get_user_model().objects.filter(email__startswith='seed2.').delete()
+
+        call_command('seed_data', users=3, seed=2, games_mean=5, chunk_size=1, stdout=StringIO())
+
+        self.assertEqual(self._snapshot(), first)
+
+    def test_seed_data_existing_seed_error(self):
+        """Test seeding twice with the same seed fails."""
+        call_command('seed_data', users=1, seed=3, games_mean=1, stdout=StringIO())
+
+        with self.assertRaises(CommandError):
+            call_command('seed_data', users=1, seed=3, games_mean=1, stdout=StringIO())
+
+
+class VideogameArrayCommandTests(TestCase):
+    """Test backfilling and checking the video game id arrays."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        genre = Genre.objects.create(user=user, name='RPG')
+        self.tag = Tag.objects.create(user=user, name='Nintendo')
+        self.console = Console.objects.create(user=user, name='Gamecube')
+        self.videogames = [
+            Videogame.objects.create(
+                user=user, title=f'Game {i}', price=10, rating=5, players=1, genre=genre,
+            )
+            for i in range(3)
+        ]
+        # Linked without signals, as rows written outside the ORM would be
+        Videogame.tags.through.objects.bulk_create(
+            Videogame.tags.through(videogame=videogame, tag=self.tag)
+            for videogame in self.videogames
+        )
+        Videogame.consoles.through.objects.create(
+            videogame=self.videogames[0], console=self.console,
+        )
+
+    def test_backfill(self):
+        """Test the backfill copies every link into the arrays."""
+        call_command('backfill_videogame_arrays', batch_size=2, stdout=StringIO())
+
+        self.assertEqual(
+            list(Videogame.objects.order_by('id').values_list('tag_ids', 'console_ids')),
+            [([self.tag.id], [self.console.id]), ([self.tag.id], []), ([self.tag.id], [])],
+        )
+
+    def test_check_reports_mismatch(self):
+        """Test the checker fails listing out of sync arrays."""
+        out = StringIO()
+
+        with self.assertRaises(CommandError):
+            call_command('check_videogame_arrays', stdout=out)
+
+        self.assertIn('3 video games with stale tag_ids', out.getvalue())
+        self.assertIn('1 video games with stale console_ids', out.getvalue())
+
+    def test_check_fix(self):
+        """Test the checker repairs the arrays with --fix."""
+        call_command('check_videogame_arrays', fix=True, stdout=StringIO())
+        out = StringIO()
+
+        call_command('check_videogame_arrays', stdout=out)
+
+        self.assertIn('in sync', out.getvalue())
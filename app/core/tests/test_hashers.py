@@ -0,0 +1,190 @@
+"""
+Tests for the limited password hashers
+"""
+import multiprocessing
+import os
+from contextlib import contextmanager
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.hashers import HashingBusy, HashingLimiter, LimitedHasherMixin
+
+
+TOKEN_URL = reverse('user:token')
+
+
+def hold_slot(limiter, holding, release):
+    """Hash in a forked process until release is set."""
+    limiter.run(lambda: (holding.set(), release.wait(5)))
+
+
+def die_holding_slot(limiter):
+    """Exit a forked process mid-hash, without releasing its slot."""
+    limiter.run(lambda: os._exit(0))
+
+
+class HashingLimiterTests(SimpleTestCase):
+    """Test the hashing limit is shared by forked processes, as uWSGI workers are."""
+
+    def setUp(self):
+        self.context = multiprocessing.get_context('fork')
+
+    def test_busy_when_other_process_holds_slots(self):
+        """Test a hash fails at once while another process holds every slot."""
+        limiter = HashingLimiter(slots=1)
+        holding, release = self.context.Event(), self.context.Event()
+        worker = self.context.Process(target=hold_slot, args=(limiter, holding, release))
+        worker.start()
+        try:
+            self.assertTrue(holding.wait(5))
+            with self.assertRaises(HashingBusy):
+                limiter.run(lambda: None)
+        finally:
+            release.set()
+            worker.join()
+
+        self.assertEqual(limiter.run(lambda: 'hashed'), 'hashed')
+
+    def test_slots_shared_by_processes(self):
+        """Test each process takes its own slot until none is left."""
+        limiter = HashingLimiter(slots=2)
+        release = self.context.Event()
+        workers = []
+        try:
+            for _ in range(2):
+                holding = self.context.Event()
+                worker = self.context.Process(target=hold_slot, args=(limiter, holding, release))
+                worker.start()
+                workers.append(worker)
+                self.assertTrue(holding.wait(5))
+
+            with self.assertRaises(HashingBusy):
+                limiter.run(lambda: None)
+        finally:
+            release.set()
+            for worker in workers:
+                worker.join()
+
+    def test_slot_of_dead_process_reclaimed(self):
+        """Test a slot held by a process that died is taken back."""
+        limiter = HashingLimiter(slots=1)
+        worker = self.context.Process(target=die_holding_slot, args=(limiter,))
+        worker.start()
+        worker.join()
+
+        self.assertEqual(limiter.run(lambda: 'hashed'), 'hashed')
+
+    def test_nested_calls_do_not_deadlock(self):
+        """Test a hash run while holding a slot runs in place instead of taking another."""
+        limiter = HashingLimiter(slots=1)
+
+        self.assertEqual(limiter.run(lambda: limiter.run(lambda: 'hashed')), 'hashed')
+
+
+class LimitedHasherTests(TestCase):
+    """Test passwords are hashed with scrypt and upgraded on login."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_new_password_scrypt(self):
+        """Test new users get scrypt hashes."""
+        user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+
+        self.assertTrue(user.password.startswith('scrypt$'))
+        self.assertTrue(user.check_password('testpass123'))
+
+    def test_pbkdf2_upgraded_on_login(self):
+        """Test a PBKDF2 hash is replaced by scrypt when the user logs in."""
+        user = get_user_model().objects.create_user('user@example.com')
+        user.password = make_password('testpass123', hasher='pbkdf2_sha256')
+        user.save()
+
+        res = self.client.post(
+            TOKEN_URL, {'email': 'user@example.com', 'password': 'testpass123'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('scrypt$'))
+
+    def test_busy_pool_returns_429(self):
+        """Test logins are throttled when every hashing slot is taken."""
+        get_user_model().objects.create_user('user@example.com', 'testpass123')
+
+        with patch.object(HashingLimiter, 'run', side_effect=HashingBusy):
+            res = self.client.post(
+                TOKEN_URL, {'email': 'user@example.com', 'password': 'testpass123'},
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+
+
+class HashingBusyResponseTests(TestCase):
+    """Test every view that hashes answers 429 while another process holds every slot."""
+
+    def setUp(self):
+        self.context = multiprocessing.get_context('fork')
+        get_user_model().objects.create_superuser('admin@example.com', 'testpass123')
+
+    @contextmanager
+    def slots_taken(self):
+        """Hold the only hashing slot in a forked process, as another uWSGI worker would."""
+        limiter = HashingLimiter(slots=1)
+        holding, release = self.context.Event(), self.context.Event()
+        worker = self.context.Process(target=hold_slot, args=(limiter, holding, release))
+        worker.start()
+        try:
+            self.assertTrue(holding.wait(5))
+            with patch.object(LimitedHasherMixin, 'limiter', limiter):
+                yield
+        finally:
+            release.set()
+            worker.join()
+
+    def test_admin_login(self):
+        """Test the admin login form, outside DRF, is answered 429 rather than failing."""
+        with self.slots_taken():
+            res = self.client.post(
+                reverse('admin:login'),
+                {'username': 'admin@example.com', 'password': 'testpass123'},
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '1')
+
+    def test_api_login(self):
+        """Test the token endpoint is throttled through DRF's exception handler."""
+        with self.slots_taken():
+            res = APIClient().post(
+                TOKEN_URL, {'email': 'admin@example.com', 'password': 'testpass123'},
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Too many logins', res.data['detail'])
+
+
+class BenchmarkTokenCommandTests(TransactionTestCase):
+    """Test the token benchmark, which logs in from several threads and so commits."""
+
+    def test_benchmark_reports_throughput(self):
+        """Test each hasher is reported and the benchmark user removed."""
+        out = StringIO()
+
+        call_command('benchmark_token', requests=4, concurrency=2, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('LimitedScryptPasswordHasher', lines[1])
+        self.assertIn('4 ok', lines[1])
+        self.assertFalse(get_user_model().objects.exists())
@@ -1,12 +1,21 @@
 """
 Tests for the health check API
 """
+import time
+from unittest.mock import patch
+
+from django.db.utils import OperationalError
 from django.test import TestCase
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from core import health
+
+
+READY_URL = reverse('readiness-check')
+
 
 class HealthCheckTests(TestCase):
     """Test the health check API."""
@@ -18,3 +27,63 @@ class HealthCheckTests(TestCase):
         res = client.get(url)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class ReadinessCheckTests(TestCase):
+    """Test the readiness check API."""
+
+    def setUp(self):
+        health.reset_probe()
+        self.client = APIClient()
+
+    def tearDown(self):
+        health.reset_probe()
+
+    def test_ready(self):
+        """Test the app reports ready when the database is reachable."""
+        res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.data['ready'])
+
+    @patch('core.health.connection.cursor', side_effect=OperationalError)
+    def test_not_ready_without_database(self, patched_cursor):
+        """Test the app reports unavailable when the database cannot be reached."""
+        res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(res.data['database'])
+
+    @patch('core.health._check_database', return_value=True)
+    def test_probe_cached(self, patched_check):
+        """Test repeated readiness checks reuse a recent probe."""
+        for _ in range(3):
+            self.client.get(READY_URL)
+
+        self.assertEqual(patched_check.call_count, 1)
+
+    @patch('core.health._check_database', return_value=True)
+    def test_probe_expires(self, patched_check):
+        """Test the database is probed again once the cached result is stale."""
+        self.client.get(READY_URL)
+
+        with self.settings(READINESS_CACHE_SECONDS=0):
+            self.client.get(READY_URL)
+
+        self.assertEqual(patched_check.call_count, 2)
+
+
+class WarmUpTests(TestCase):
+    """Test loading the app before workers fork."""
+
+    @patch('core.health.gc.freeze')
+    @patch('core.health.connections.close_all')
+    def test_warm_up(self, patched_close_all, patched_freeze):
+        """Test warm up loads the schema, closes connections and records startup time."""
+        with patch('core.health.get_schema') as patched_schema:
+            health.warm_up(time.monotonic())
+
+        patched_schema.assert_called_once()
+        patched_close_all.assert_called_once()
+        patched_freeze.assert_called_once()
+        self.assertIsNotNone(health.startup_seconds)
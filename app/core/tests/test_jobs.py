@@ -0,0 +1,187 @@
+"""
+Tests for the background job queue
+"""
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import models, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+
+calls = []  # arguments of record() calls
+
+
+@jobs.job
+def record(value):
+    """Test job remembering its argument."""
+    calls.append(value)
+
+
+@jobs.job
+def explode():
+    """Test job that always fails."""
+    raise RuntimeError('boom')
+
+
+@jobs.job
+def reclaimed(fail=False):
+    """Test job whose claim is taken over by another worker while it runs."""
+    Job.objects.update(attempts=models.F('attempts') + 1)
+    if fail:
+        raise RuntimeError('boom')
+
+
+@jobs.job
+def outlive_timeout(seconds):
+    """Test job running past its visibility timeout, recording what others could claim."""
+    time.sleep(seconds)
+    calls.append(Job.objects.claim(1, 60))
+
+
+def not_a_job():
+    """Function that must not be queued."""
+
+
+class JobQueueTests(TestCase):
+    """Test enqueueing, claiming and running jobs."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_requires_job(self):
+        """Test only functions marked with @job can be queued."""
+        with self.assertRaises(ValueError):
+            jobs.enqueue(not_a_job)
+
+    def test_claim_by_priority(self):
+        """Test due jobs are claimed highest priority first, delayed jobs are not."""
+        low = jobs.enqueue(record, value='low')
+        high = jobs.enqueue(record, value='high', priority=5)
+        jobs.enqueue(record, value='later', delay=60)
+
+        self.assertEqual(Job.objects.claim(10, 60), [high.id, low.id])
+
+    def test_claimed_job_hidden_until_timeout(self):
+        """Test a claimed job is not claimed again until its visibility timeout passes."""
+        job = jobs.enqueue(record, value=1)
+
+        self.assertEqual(Job.objects.claim(1, 60), [job.id])
+        self.assertEqual(Job.objects.claim(1, 60), [])
+
+        Job.objects.filter(id=job.id).update(run_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(Job.objects.claim(1, 60), [job.id])
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+
+    def test_lost_job_fails_after_max_attempts(self):
+        """Test a job whose worker is lost on every attempt fails instead of running again."""
+        job = jobs.enqueue(record, value=1, max_attempts=3)
+
+        for _ in range(3):
+            self.assertEqual(Job.objects.claim(1, 60), [job.id])
+            Job.objects.filter(id=job.id).update(run_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(Job.objects.claim(1, 60), [])
+        job.refresh_from_db()
+        self.assertEqual((job.state, job.attempts), (Job.FAILED, 3))
+        self.assertIn('Worker lost', job.last_error)
+
+    def test_execute_success(self):
+        """Test a job runs with its arguments and is then deleted."""
+        job = jobs.enqueue(record, value={'user_id': 1})
+        Job.objects.claim(1, 60)
+
+        with self.assertLogs('core.jobs', 'INFO'):
+            self.assertTrue(jobs.execute(job.id))
+
+        self.assertEqual(calls, [{'user_id': 1}])
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(JOB_RETRY_DELAY=10)
+    def test_execute_failure_retries(self):
+        """Test a failed job is queued again later, and marked failed after its last attempt."""
+        job = jobs.enqueue(explode, max_attempts=2)
+        Job.objects.claim(1, 60)
+
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertFalse(jobs.execute(job.id))
+        job.refresh_from_db()
+        self.assertEqual(job.state, Job.QUEUED)
+        self.assertIn('RuntimeError: boom', job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=5))
+
+        Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        Job.objects.claim(1, 60)
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertFalse(jobs.execute(job.id))
+        job.refresh_from_db()
+        self.assertEqual(job.state, Job.FAILED)
+        self.assertEqual(Job.objects.claim(1, 60), [])
+
+    def test_reclaimed_job_left_to_new_claim(self):
+        """Test a run whose job was claimed again neither deletes nor requeues it."""
+        for fail in [False, True]:
+            job = jobs.enqueue(reclaimed, fail=fail)
+            Job.objects.claim(1, 60)
+
+            with self.assertLogs('core.jobs', 'INFO') as logs:
+                self.assertEqual(jobs.execute(job.id), not fail)
+
+            job.refresh_from_db()
+            self.assertEqual((job.state, job.attempts, job.last_error), (Job.RUNNING, 2, ''))
+            self.assertIn('claimed again', '\n'.join(logs.output))
+            job.delete()
+
+
+class RunWorkerTests(TransactionTestCase):
+    """Test the worker, whose pool threads use connections of their own and so see commits."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_run_worker_once(self):
+        """Test the worker runs every due job and exits."""
+        for value in range(5):
+            jobs.enqueue(record, value=value)
+        jobs.enqueue(explode, max_attempts=1)
+        out = StringIO()
+
+        with self.assertLogs('core.jobs', 'INFO'):
+            call_command('run_worker', once=True, concurrency=2, stdout=out)
+
+        self.assertEqual(sorted(calls), list(range(5)))
+        self.assertIn('Ran 6 jobs, 1 failed', out.getvalue())
+        self.assertEqual(list(Job.objects.values_list('state', flat=True)), [Job.FAILED])
+
+    @override_settings(JOB_VISIBILITY_TIMEOUT=0.3)
+    def test_heartbeat_keeps_long_job_claimed(self):
+        """Test a job running past its visibility timeout is not claimed by another worker."""
+        job = jobs.enqueue(outlive_timeout, seconds=0.8)
+        Job.objects.claim(1, 0.3)
+
+        with self.assertLogs('core.jobs', 'INFO'):
+            self.assertTrue(jobs.execute(job.id))
+
+        self.assertEqual(calls, [[]])
+        self.assertFalse(Job.objects.exists())
+
+    def test_claim_skips_locked_jobs(self):
+        """Test a job locked by one worker is skipped by another instead of waited for."""
+        locked = jobs.enqueue(record, value='locked')
+        free = jobs.enqueue(record, value='free')
+        claimed = []
+
+        with transaction.atomic():
+            Job.objects.select_for_update().get(id=locked.id)
+            thread = threading.Thread(target=lambda: claimed.extend(Job.objects.claim(2, 60)))
+            thread.start()
+            thread.join(timeout=5)
+
+        self.assertEqual(claimed, [free.id])
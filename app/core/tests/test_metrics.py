@@ -0,0 +1,120 @@
+"""
+Tests for the metrics endpoint
+"""
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from prometheus_client import REGISTRY
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import metrics
+
+
+METRICS_URL = reverse('metrics')
+SCHEMA_URL = reverse('api-schema')
+VIDEOGAMES_URL = reverse('videogame:videogame-list')
+
+
+def cache_lookups(cache, result):
+    """Return the lookups counted against cache with result."""
+    return REGISTRY.get_sample_value(
+        'cache_requests_total', {'cache': cache, 'result': result},
+    ) or 0
+
+
+@override_settings(METRICS_TOKEN='scraper-token')
+class MetricsTests(TestCase):
+    """Test request metrics and their exposition."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer scraper-token')
+
+    def test_request_counted_per_route(self):
+        """Test requests are counted under their route name."""
+        user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(user)
+        labels = {'route': 'videogame:tag-list', 'method': 'GET', 'status': '200'}
+        before = REGISTRY.get_sample_value('http_requests_total', labels) or 0
+
+        self.client.get(reverse('videogame:tag-list'))
+
+        self.assertEqual(REGISTRY.get_sample_value('http_requests_total', labels), before + 1)
+        queries = REGISTRY.get_sample_value(
+            'db_queries_per_request_count', {'route': 'videogame:tag-list'},
+        )
+        self.assertGreater(queries, 0)
+
+    def test_metrics_endpoint(self):
+        """Test the metrics endpoint exposes the request metrics."""
+        self.client.get(reverse('health-check'))
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(b'http_requests_total{method="GET",route="health-check"', res.content)
+        self.assertIn(b'http_request_duration_seconds_bucket', res.content)
+
+    def test_metrics_require_token(self):
+        """Test metrics are refused without the scraper token, and when none is set."""
+        for authorization in ['', 'Bearer wrong', 'Token scraper-token']:
+            res = APIClient().get(METRICS_URL, HTTP_AUTHORIZATION=authorization)
+
+            self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        with override_settings(METRICS_TOKEN=''):
+            res = APIClient().get(METRICS_URL, HTTP_AUTHORIZATION='Bearer ')
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_schema_cache_counted(self):
+        """Test the first schema request misses the response cache and later ones hit."""
+        misses = cache_lookups('schema', 'miss')
+        hits = cache_lookups('schema', 'hit')
+
+        self.client.get(SCHEMA_URL)
+        self.client.get(SCHEMA_URL)
+
+        self.assertEqual(cache_lookups('schema', 'miss') + cache_lookups('schema', 'hit'),
+                         misses + hits + 2)
+        self.assertGreater(cache_lookups('schema', 'hit'), hits)
+
+    def test_name_map_counted(self):
+        """Test repeated tag names in a request hit the name map, new ones miss it."""
+        user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(user)
+        misses = cache_lookups('tag_names', 'miss')
+        hits = cache_lookups('tag_names', 'hit')
+
+        self.client.post(VIDEOGAMES_URL, {
+            'title': 'Halo', 'price': '59.99', 'rating': '9.00', 'players': 4, 'genre': 'FPS',
+            'tags': [{'name': 'Shooter'}, {'name': 'Shooter'}],
+        }, format='json')
+
+        self.assertEqual(cache_lookups('tag_names', 'miss'), misses + 1)
+        self.assertEqual(cache_lookups('tag_names', 'hit'), hits + 1)
+
+    def test_record_cache(self):
+        """Test cache lookups are counted by result."""
+        labels = {'cache': 'test', 'result': 'hit'}
+        before = REGISTRY.get_sample_value('cache_requests_total', labels) or 0
+
+        metrics.record_cache('test', hit=True)
+
+        self.assertEqual(REGISTRY.get_sample_value('cache_requests_total', labels), before + 1)
+
+    def test_multiprocess_collector_used(self):
+        """Test samples are collected from worker files when running under uWSGI."""
+        with tempfile.TemporaryDirectory() as path:
+            with patch.dict('os.environ', {'PROMETHEUS_MULTIPROC_DIR': path}):
+                with patch('core.metrics.multiprocess.MultiProcessCollector') as collector:
+                    res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        collector.assert_called_once()
@@ -0,0 +1,86 @@
+"""
+Tests for the app middleware
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.instrumentation import phase, track_request
+
+
+def parse_server_timing(header):
+    """Return a dict of metric name to its parameters."""
+    metrics = {}
+    for metric in header.split(', '):
+        name, *params = metric.split(';')
+        metrics[name] = dict(param.split('=', 1) for param in params)
+
+    return metrics
+
+
+class ServerTimingMiddlewareTests(TestCase):
+    """Test per-request timing instrumentation."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_health_check_server_timing(self):
+        """Test the health check reports its timings."""
+        res = self.client.get(reverse('health-check'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        metrics = parse_server_timing(res['Server-Timing'])
+        for name in ['view', 'render', 'db', 'total']:
+            self.assertIn(name, metrics)
+        self.assertEqual(metrics['db']['desc'], '"0 queries"')
+
+    def test_viewset_server_timing_includes_auth_and_sql(self):
+        """Test token authenticated requests report auth time and queries."""
+        user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        token = Token.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        res = self.client.get(reverse('videogame:videogame-list'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        metrics = parse_server_timing(res['Server-Timing'])
+        self.assertIn('auth', metrics)
+        self.assertNotEqual(metrics['db']['desc'], '"0 queries"')
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_slow_request_logged_with_statements(self):
+        """Test requests over the threshold are logged with their SQL."""
+        user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(user)
+
+        with self.assertLogs('core.middleware', level='WARNING') as logs:
+            self.client.get(reverse('videogame:tag-list'))
+
+        self.assertIn('Slow request GET /api/videogame/tags/', logs.output[0])
+        self.assertIn('core_tag', logs.output[0])
+
+
+class RequestTimerTests(SimpleTestCase):
+    """Test splitting a request's duration into phases."""
+
+    def test_sql_in_phase_counted_once(self):
+        """Test SQL run during auth is counted in db and not in auth or subtracted twice."""
+        clock = iter([0.0, 1.0, 1.5, 3.0])  # request start, auth start and end, request end
+
+        with patch('core.instrumentation.perf_counter', lambda: next(clock)):
+            with track_request() as timer:
+                timer.view_start = 0.0
+                with phase('auth'):
+                    timer.record_query('SELECT token', 0.4)
+            timer.finish()
+
+        self.assertAlmostEqual(timer.phases['auth'], 0.1)
+        self.assertAlmostEqual(timer.query_time, 0.4)
+        self.assertAlmostEqual(timer.phases['view'], 2.5)
+        self.assertAlmostEqual(sum(timer.phases.values()) + timer.query_time, 3.0)
@@ -4,6 +4,7 @@ Tests for models
 from unittest.mock import patch
 from decimal import Decimal
 
+from django.db import IntegrityError
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
@@ -73,7 +74,7 @@ class ModelTests(TestCase):
             price=Decimal('60.00'),
             rating=Decimal('4.5'),
             players=4,
-            genre='FPS',
+            genre=models.Genre.objects.create(user=user, name='FPS'),
             description='Sample video game description',
             link='Sample link'
         )
@@ -87,6 +88,15 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(tag), tag.name)
 
+    def test_genre_unique_ignoring_case(self):
+        """Test a user's genres are looked up and deduplicated ignoring case."""
+        user = create_user()
+        genre = models.Genre.objects.get_or_create_by_name(user, 'RPG')
+
+        self.assertEqual(models.Genre.objects.get_or_create_by_name(user, 'rpg'), genre)
+        with self.assertRaises(IntegrityError):
+            models.Genre.objects.create(user=user, name='Rpg')
+
     def test_create_console(self):
         """Test creating a console is successful"""
         user = create_user()
@@ -107,3 +117,62 @@ class ModelTests(TestCase):
         file_path = models.videogame_image_file_path(None, 'example.jpg')
 
         self.assertEqual(file_path, f'uploads/videogame/{uuid}.jpg')
+
+
+class VideogameLinkArrayTests(TestCase):
+    """Test the tag and console id arrays follow the video game's links."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.videogame = models.Videogame.objects.create(
+            user=self.user,
+            title='Metroid Prime',
+            price=Decimal('60.00'),
+            rating=Decimal('10.00'),
+            players=1,
+            genre=models.Genre.objects.create(user=self.user, name='Adventure'),
+        )
+        self.tags = [models.Tag.objects.create(user=self.user, name=f'Tag {i}') for i in range(3)]
+
+    def _tag_ids(self):
+        return models.Videogame.objects.get(id=self.videogame.id).tag_ids
+
+    def test_add_remove_clear(self):
+        """Test adding, removing and clearing tags rewrites the array."""
+        self.videogame.tags.add(self.tags[2], self.tags[0])
+        self.assertEqual(self.videogame.tag_ids, [self.tags[0].id, self.tags[2].id])
+
+        self.videogame.tags.remove(self.tags[0])
+        self.assertEqual(self._tag_ids(), [self.tags[2].id])
+
+        self.videogame.tags.clear()
+        self.assertEqual(self._tag_ids(), [])
+
+    def test_reverse_add_and_clear(self):
+        """Test changing links from the tag side rewrites the games' arrays."""
+        self.tags[1].videogame_set.add(self.videogame)
+        self.assertEqual(self._tag_ids(), [self.tags[1].id])
+
+        self.tags[1].videogame_set.clear()
+        self.assertEqual(self._tag_ids(), [])
+
+    def test_delete_tag(self):
+        """Test deleting a tag removes it from the arrays."""
+        self.videogame.tags.add(*self.tags)
+
+        self.tags[1].delete()
+
+        self.assertEqual(self._tag_ids(), [self.tags[0].id, self.tags[2].id])
+
+    def test_save_keeps_arrays(self):
+        """Test saving a copy loaded before its consoles changed keeps the new array."""
+        console = models.Console.objects.create(user=self.user, name='Gamecube')
+        stale = models.Videogame.objects.get(id=self.videogame.id)
+        self.videogame.consoles.add(console)
+
+        stale.title = 'Metroid Prime 2'
+        stale.save()
+
+        self.videogame.refresh_from_db()
+        self.assertEqual(self.videogame.title, 'Metroid Prime 2')
+        self.assertEqual(self.videogame.console_ids, [console.id])
@@ -0,0 +1,183 @@
+"""
+Tests for MessagePack requests and responses
+"""
+import io
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+import msgpack
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.test import APIClient
+
+from core.models import Genre, Videogame
+from core.parsers import MessagePackParser
+from core.renderers import MessagePackRenderer, pack_decimal
+
+
+MSGPACK = 'application/msgpack'
+VIDEOGAMES_URL = reverse('videogame:videogame-list')
+BULK_URL = reverse('videogame:videogame-bulk-update')
+CREATE_USER_URL = reverse('user:create')
+TOKEN_URL = reverse('user:token')
+
+
+class MessagePackFormatTests(SimpleTestCase):
+    """Test packing and unpacking without the API."""
+
+    def test_decimals_packed_as_extension(self):
+        """Test decimals are packed as their scale and unscaled digits, and read back exactly."""
+        values = {'price': Decimal('59.99'), 'refund': Decimal('-0.01'), 'whole': Decimal('1E+2')}
+
+        body = MessagePackRenderer().render(values)
+
+        self.assertEqual(msgpack.unpackb(body)['price'], msgpack.ExtType(1, b'\x02\x17\x6f'))
+        self.assertEqual(MessagePackParser().parse(io.BytesIO(body)), values)
+
+    def test_parse_invalid_decimal(self):
+        """Test a decimal extension without digits is a parse error."""
+        with self.assertRaises(ParseError):
+            MessagePackParser().parse(io.BytesIO(msgpack.packb(msgpack.ExtType(1, b'\x02'))))
+
+    def test_other_types_as_in_json(self):
+        """Test types MessagePack lacks are sent as JSON sends them."""
+        body = MessagePackRenderer().render({'day': date(2026, 10, 19)})
+
+        self.assertEqual(msgpack.unpackb(body), {'day': '2026-10-19'})
+
+    def test_empty_response(self):
+        """Test a response without data has an empty body."""
+        self.assertEqual(MessagePackRenderer().render(None), b'')
+
+    def test_parse_invalid_body(self):
+        """Test a malformed body is a parse error rather than a server error."""
+        with self.assertRaises(ParseError):
+            MessagePackParser().parse(io.BytesIO(b'\x82\xa5price'))
+
+    def test_benchmark_command(self):
+        """Test the benchmark reports size and timings for both formats."""
+        out = StringIO()
+
+        call_command('benchmark_msgpack', games=10, repeat=1, stdout=out)
+
+        self.assertRegex(out.getvalue(), r'json: \d+ KiB, render .*\nmsgpack: \d+ KiB, render ')
+        self.assertRegex(out.getvalue(), r'price: json [\d.]+ B, msgpack [\d.]+ B')
+
+
+class MessagePackAPITests(TestCase):
+    """Test the API with MessagePack bodies."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+
+    def test_list_videogames(self):
+        """Test video games are listed in MessagePack when asked for, decimals as extensions."""
+        Videogame.objects.create(
+            user=self.user, title='Halo', price=Decimal('59.99'), rating=Decimal('9.00'),
+            players=4, genre=Genre.objects.get_or_create_by_name(self.user, 'FPS'),
+        )
+
+        res = self.client.get(VIDEOGAMES_URL, HTTP_ACCEPT=MSGPACK)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], MSGPACK)
+        game, = MessagePackParser().parse(io.BytesIO(res.content))
+        self.assertEqual(game['title'], 'Halo')
+        self.assertEqual((game['price'], game['rating']), (Decimal('59.99'), Decimal('9.00')))
+
+    def test_json_decimals_unchanged(self):
+        """Test JSON clients still receive decimals as strings."""
+        Videogame.objects.create(
+            user=self.user, title='Halo', price=Decimal('59.99'), rating=Decimal('9.00'),
+            players=4, genre=Genre.objects.get_or_create_by_name(self.user, 'FPS'),
+        )
+
+        res = self.client.get(VIDEOGAMES_URL)
+
+        self.assertEqual(res.json()[0]['price'], '59.99')
+
+    def test_create_videogame(self):
+        """Test creating a video game from a MessagePack body with decimal extensions."""
+        payload = {
+            'title': 'Halo', 'price': pack_decimal(Decimal('59.99')), 'rating': pack_decimal('9'),
+            'players': 4, 'genre': 'FPS',
+            'tags': [{'name': 'Shooter'}],
+        }
+
+        res = self.client.post(VIDEOGAMES_URL, msgpack.packb(payload), content_type=MSGPACK)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        game = Videogame.objects.get(user=self.user)
+        self.assertEqual((game.price, game.rating), (Decimal('59.99'), Decimal('9.00')))
+        self.assertEqual(list(game.tags.values_list('name', flat=True)), ['Shooter'])
+
+    def test_bulk_update_and_delete(self):
+        """Test the bulk endpoints accept MessagePack bodies."""
+        game = Videogame.objects.create(
+            user=self.user, title='Halo', price=Decimal('59.99'), rating=Decimal('9.00'),
+            players=4, genre=Genre.objects.get_or_create_by_name(self.user, 'FPS'),
+        )
+
+        res = self.client.patch(
+            BULK_URL, msgpack.packb({'ids': [game.id], 'price': pack_decimal('19.5')}),
+            content_type=MSGPACK, HTTP_ACCEPT=MSGPACK,
+        )
+        self.assertEqual(msgpack.unpackb(res.content), {'updated': 1})
+        game.refresh_from_db()
+        self.assertEqual(game.price, Decimal('19.50'))
+
+        res = self.client.delete(
+            BULK_URL, msgpack.packb({'ids': [game.id]}), content_type=MSGPACK,
+        )
+        self.assertEqual(res.data, {'deleted': 1})
+
+    def test_plain_numbers_rejected_for_decimals(self):
+        """Test a number or string sent for a decimal is rejected, not read as other units."""
+        for value in [60, 60.0, '60.00']:
+            payload = {'title': 'Halo', 'price': value, 'rating': pack_decimal('9'),
+                       'players': 4, 'genre': 'FPS'}
+
+            res = self.client.post(VIDEOGAMES_URL, msgpack.packb(payload), content_type=MSGPACK)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('decimal extension', str(res.data['price'][0]))
+        self.assertFalse(Videogame.objects.exists())
+
+    def test_schema_documents_decimal_extension(self):
+        """Test the schema describes how decimals are sent in MessagePack."""
+        res = self.client.get(reverse('api-schema'), {'format': 'json'})
+
+        price = res.json()['components']['schemas']['Videogame']['properties']['price']
+        self.assertIn('application/msgpack', price['description'])
+        self.assertIn('pattern', price)
+
+    def test_user_endpoints(self):
+        """Test signing up and logging in with MessagePack bodies."""
+        client = APIClient()
+        payload = {'email': 'new@example.com', 'password': 'testpass123', 'name': 'New'}
+
+        res = client.post(
+            CREATE_USER_URL, msgpack.packb(payload), content_type=MSGPACK, HTTP_ACCEPT=MSGPACK,
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(msgpack.unpackb(res.content)['email'], 'new@example.com')
+
+        res = client.post(
+            TOKEN_URL, msgpack.packb({'email': 'new@example.com', 'password': 'testpass123'}),
+            content_type=MSGPACK, HTTP_ACCEPT=MSGPACK,
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('token', msgpack.unpackb(res.content))
+
+    def test_malformed_body(self):
+        """Test a malformed MessagePack body is rejected with 400."""
+        res = self.client.post(VIDEOGAMES_URL, b'\xc1', content_type=MSGPACK)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,122 @@
+"""
+Tests for purging the data of deleted users
+"""
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.authtoken.models import Token
+
+from core import jobs, purge
+from core.models import (
+    Genre,
+    Job,
+    LatestChange,
+    Videogame,
+    Tag,
+    Console,
+)
+
+
+def create_library(user, games=3):
+    """Create games linked to a tag and a console for user."""
+    genre = Genre.objects.get_or_create_by_name(user, 'Platformer')
+    tag = Tag.objects.create(user=user, name='Retro')
+    console = Console.objects.create(user=user, name='SNES')
+    for i in range(games):
+        game = Videogame.objects.create(
+            user=user, title=f'Game {i}', price=Decimal('10.00'), rating=Decimal('5.00'),
+            players=1, genre=genre,
+        )
+        game.tags.add(tag)
+        game.consoles.add(console)
+
+
+class PurgeUserTests(TestCase):
+    """Test deleting a user's data in batches."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        self.other = get_user_model().objects.create_user('other@example.com', 'testpass123')
+        create_library(self.user, games=5)
+        create_library(self.other, games=1)
+
+    def test_purge_user_in_batches(self):
+        """Test every row the user owns is deleted, in batches, and nobody else's."""
+        with CaptureQueriesContext(connection) as queries:
+            counts = purge.purge_user(self.user.id, batch_size=2)
+
+        self.assertEqual(
+            counts, {'videogame': 5, 'tag': 1, 'console': 1, 'genre': 1},
+        )
+        game_deletes = [
+            query for query in queries
+            if query['sql'].startswith('DELETE FROM "core_videogame" ')
+        ]
+        self.assertEqual(len(game_deletes), 3)  # 5 games in batches of 2
+        self.assertFalse(get_user_model().objects.filter(id=self.user.id).exists())
+        self.assertFalse(LatestChange.objects.filter(user_id=self.user.id).exists())
+        self.assertEqual(Videogame.objects.filter(user=self.other).count(), 1)
+        self.assertEqual(Tag.objects.filter(user=self.other).count(), 1)
+
+    def test_images_deleted_after_commit(self):
+        """Test image files are removed only once their games are deleted."""
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root):
+            game = Videogame.objects.filter(user=self.user).first()
+            game.image.save('cover.jpg', ContentFile(b'image'))
+            storage = game.image.storage
+
+            with self.captureOnCommitCallbacks() as callbacks:
+                purge.purge_user(self.user.id)
+            self.assertTrue(storage.exists(game.image.name))
+
+            for callback in callbacks:
+                callback()
+            self.assertFalse(storage.exists(game.image.name))
+
+    def test_request_deletion(self):
+        """Test requesting deletion disables the user and queues the purge."""
+        purge.request_deletion(self.user)
+
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertIsNotNone(self.user.deletion_requested_at)
+        job = Job.objects.get()
+        self.assertEqual(job.name, 'core.purge.purge_user')
+
+        Job.objects.claim(1, 60)
+        self.assertTrue(jobs.execute(job.id))
+        self.assertFalse(get_user_model().objects.filter(id=self.user.id).exists())
+        self.assertFalse(Job.objects.exists())
+
+    def test_request_deletion_all_or_nothing(self):
+        """Test an account is left as it was when the purge cannot be queued."""
+        Token.objects.create(user=self.user)
+
+        with patch('core.purge.enqueue', side_effect=RuntimeError('queue down')):
+            with self.assertRaises(RuntimeError):
+                purge.request_deletion(self.user)
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)
+        self.assertIsNone(self.user.deletion_requested_at)
+        self.assertTrue(Token.objects.filter(user=self.user).exists())
+
+    def test_purge_deleted_users_command(self):
+        """Test the command purges users whose deletion was requested only."""
+        purge.request_deletion(self.user)
+
+        call_command('purge_deleted_users', batch_size=2, stdout=StringIO())
+
+        self.assertFalse(get_user_model().objects.filter(id=self.user.id).exists())
+        self.assertTrue(get_user_model().objects.filter(id=self.other.id).exists())
+        self.assertEqual(Videogame.objects.count(), 1)
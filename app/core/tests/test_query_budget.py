@@ -0,0 +1,37 @@
+"""
+Tests for the query budget helpers
+"""
+from django.test import SimpleTestCase
+
+from core.tests.query_budget import (
+    Budget,
+    normalize_sql,
+    format_budget_failure,
+)
+
+
+class QueryBudgetTests(SimpleTestCase):
+    """Test query budget reporting."""
+
+    def test_normalize_sql_strips_literals(self):
+        """Test literals are replaced so repeated statements group together."""
+        sql = 'SELECT * FROM "core_tag" WHERE "id" = 12 AND "name" = \'RPG\''
+
+        self.assertEqual(
+            normalize_sql(sql),
+            'SELECT * FROM "core_tag" WHERE "id" = ? AND "name" = ?',
+        )
+
+    def test_failure_lists_added_and_repeated_statements(self):
+        """Test the failure report names statements over budget and N+1 patterns."""
+        queries = [
+            {'sql': 'SELECT * FROM "core_videogame"'},
+            {'sql': 'SELECT * FROM "core_tag" WHERE "videogame_id" = 1'},
+            {'sql': 'SELECT * FROM "core_tag" WHERE "videogame_id" = 2'},
+        ]
+
+        msg = format_budget_failure('videogame-list', Budget(queries=1, ms=None), queries)
+
+        self.assertIn('executed 3 queries, budget is 1', msg)
+        self.assertIn('2. SELECT * FROM "core_tag" WHERE "videogame_id" = 1', msg)
+        self.assertIn('2x SELECT * FROM "core_tag" WHERE "videogame_id" = ?', msg)
@@ -0,0 +1,81 @@
+"""
+Tests for the cached OpenAPI schema
+"""
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import schema
+
+
+SCHEMA_URL = reverse('api-schema')
+
+
+class SchemaTests(SimpleTestCase):
+    """Test the schema is generated once and served from memory."""
+
+    def setUp(self):
+        schema.clear_cache()
+        self.client = APIClient()
+
+    def tearDown(self):
+        schema.clear_cache()
+
+    def test_schema_generated_once(self):
+        """Test repeated schema requests do not introspect the views again."""
+        with patch('core.schema.generate_schema', wraps=schema.generate_schema) as generate:
+            first = self.client.get(SCHEMA_URL)
+            second = self.client.get(SCHEMA_URL, {'format': 'json'})
+            self.client.get(SCHEMA_URL)
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(generate.call_count, 1)
+        # Parameters from @extend_schema_view are part of the cached schema
+        parameters = json.loads(second.content)['paths']['/api/videogame/tags/']['get'][
+            'parameters']
+        self.assertIn('assigned_only', [parameter['name'] for parameter in parameters])
+
+    def test_unsupported_languages_share_schema(self):
+        """Test made up ?lang= values are served the default language's cached schema."""
+        with patch('core.schema.generate_schema', wraps=schema.generate_schema) as generate:
+            for language in ['xx', 'yy-zz', 'en-us']:
+                res = self.client.get(SCHEMA_URL, {'lang': language})
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual(list(schema._schemas), [schema.default_language()])
+        self.assertEqual(len(schema._responses), 1)
+
+    def test_schema_etag(self):
+        """Test clients holding the current schema get 304 Not Modified."""
+        res = self.client.get(SCHEMA_URL)
+
+        cached = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(cached['ETag'], res['ETag'])
+        self.assertEqual(cached.content, b'')
+
+    def test_schema_loaded_from_file(self):
+        """Test a schema built ahead of time is served without generating one."""
+        with tempfile.TemporaryDirectory() as path:
+            schema_file = os.path.join(path, 'openapi.json')
+            call_command('build_schema', file=schema_file, stdout=StringIO())
+
+            with override_settings(SCHEMA_FILE=schema_file), \
+                    patch('core.schema.generate_schema') as generate:
+                res = self.client.get(SCHEMA_URL, {'format': 'json'})
+
+        generate.assert_not_called()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('/api/videogame/videogames/', json.loads(res.content)['paths'])
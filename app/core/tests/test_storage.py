@@ -0,0 +1,31 @@
+"""
+Tests for the static files storage
+"""
+import re
+import tempfile
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+
+class ManifestStaticFilesStorageTests(SimpleTestCase):
+    """Test static file URLs carry a hash of the file once collected."""
+
+    def test_unhashed_without_manifest(self):
+        """Test files are referenced by their own name before collectstatic runs."""
+        with tempfile.TemporaryDirectory() as static_root, \
+                override_settings(STATIC_ROOT=static_root):
+            url = staticfiles_storage.url('admin/css/base.css')
+
+        self.assertEqual(url, '/static/static/admin/css/base.css')
+
+    def test_hashed_after_collectstatic(self):
+        """Test collected files are referenced by a name with their content hash."""
+        with tempfile.TemporaryDirectory() as static_root, \
+                override_settings(STATIC_ROOT=static_root):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            url = staticfiles_storage.url('admin/css/base.css')
+
+        # The pattern the proxy caches as immutable
+        self.assertRegex(url, re.compile(r'^/static/static/admin/css/base\.[0-9a-f]{12}\.css$'))
@@ -0,0 +1,113 @@
+"""
+Tests for the shared token bucket throttles
+"""
+import multiprocessing
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.throttling import (
+    SharedBucketStore,
+    TokenBucketThrottle,
+    store,
+)
+
+
+class SharedBucketStoreTests(SimpleTestCase):
+    """Test the shared memory token buckets."""
+
+    def setUp(self):
+        self.store = SharedBucketStore(slots=64, ways=4, stripes=4)
+
+    def test_burst_then_throttled(self):
+        """Test a bucket allows its capacity then reports the wait for a token."""
+        results = [self.store.consume('client', 3, 1.0, now=100.0) for _ in range(4)]
+
+        self.assertEqual([allowed for allowed, _ in results], [True, True, True, False])
+        self.assertAlmostEqual(results[-1][1], 1.0)
+
+    def test_refill_over_time(self):
+        """Test tokens are refilled at the rate."""
+        for _ in range(3):
+            self.store.consume('client', 3, 1.0, now=100.0)
+
+        allowed, _ = self.store.consume('client', 3, 1.0, now=101.5)
+
+        self.assertTrue(allowed)
+
+    def test_keys_isolated(self):
+        """Test exhausting one bucket does not affect another."""
+        self.store.consume('client-a', 1, 1.0, now=100.0)
+
+        self.assertFalse(self.store.consume('client-a', 1, 1.0, now=100.0)[0])
+        self.assertTrue(self.store.consume('client-b', 1, 1.0, now=100.0)[0])
+
+    def test_shared_with_forked_workers(self):
+        """Test tokens taken in a forked worker are seen by the parent."""
+        worker = multiprocessing.get_context('fork').Process(
+            target=self.store.consume, args=('client', 1, 1.0, 100.0),
+        )
+        worker.start()
+        worker.join()
+
+        self.assertFalse(self.store.consume('client', 1, 1.0, now=100.0)[0])
+
+    def test_consume_under_a_millisecond(self):
+        """Test a throttle check is cheap."""
+        start = time.perf_counter()
+        for i in range(1000):
+            self.store.consume(f'client-{i % 50}', 100, 1.0)
+
+        self.assertLess((time.perf_counter() - start) / 1000, 0.001)
+
+
+class ThrottleApiTests(TestCase):
+    """Test throttling applied to the APIs."""
+
+    def setUp(self):
+        store.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+
+    def tearDown(self):
+        store.clear()
+
+    @patch.dict(TokenBucketThrottle.THROTTLE_RATES, {'user': '2/min'})
+    def test_user_throttled(self):
+        """Test a user exceeding their rate gets 429 with Retry-After."""
+        self.client.force_authenticate(self.user)
+        url = reverse('videogame:videogame-list')
+
+        statuses = [self.client.get(url).status_code for _ in range(3)]
+
+        self.assertEqual(statuses, [200, 200, status.HTTP_429_TOO_MANY_REQUESTS])
+        res = self.client.get(url)
+        self.assertIn('Retry-After', res)
+
+    @patch.dict(TokenBucketThrottle.THROTTLE_RATES, {'anon': '1/min'})
+    def test_anon_throttled_per_ip(self):
+        """Test unauthenticated requests are throttled per address."""
+        url = reverse('user:token')
+        payload = {'email': 'user@example.com', 'password': 'wrong'}
+
+        self.client.post(url, payload, REMOTE_ADDR='10.0.0.1')
+        blocked = self.client.post(url, payload, REMOTE_ADDR='10.0.0.1')
+        other = self.client.post(url, payload, REMOTE_ADDR='10.0.0.2')
+
+        self.assertEqual(blocked.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(other.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch.dict(TokenBucketThrottle.THROTTLE_RATES, {'anon': '1/min'})
+    def test_health_check_not_throttled(self):
+        """Test health probes are never throttled."""
+        url = reverse('health-check')
+
+        statuses = {self.client.get(url).status_code for _ in range(3)}
+
+        self.assertEqual(statuses, {status.HTTP_200_OK})
@@ -0,0 +1,105 @@
+"""
+Token bucket throttles with state shared across uWSGI workers
+"""
+import hashlib
+import mmap
+import multiprocessing
+import struct
+import time
+
+from rest_framework import throttling
+
+
+# key hash, tokens left, time of last refill
+SLOT = struct.Struct('Qdd')
+
+
+class SharedBucketStore:
+    """Token buckets in anonymous shared memory.
+
+    The memory is mapped when this module is imported, which happens in the uWSGI master
+    before it forks (see CoreConfig.ready), so all workers read and write the same buckets.
+    A key hashes to a set of `ways` slots. When every slot in the set belongs to another
+    key the least recently used bucket is replaced, which can only let a client through.
+    """
+
+    def __init__(self, slots=16384, ways=4, stripes=64):
+        self.sets = slots // ways
+        self.ways = ways
+        self._memory = mmap.mmap(-1, slots * SLOT.size)  # MAP_SHARED, inherited by fork
+        self._locks = [multiprocessing.Lock() for _ in range(stripes)]
+
+    def _slot_for(self, digest, set_index):
+        """Return the offset of the slot for digest, claiming one if needed."""
+        oldest_offset, oldest_time = None, None
+        for way in range(self.ways):
+            offset = (set_index * self.ways + way) * SLOT.size
+            slot_digest, _, updated = SLOT.unpack_from(self._memory, offset)
+            if slot_digest in (digest, 0):
+                return offset, slot_digest == digest
+            if oldest_time is None or updated < oldest_time:
+                oldest_offset, oldest_time = offset, updated
+
+        return oldest_offset, False
+
+    def consume(self, key, capacity, rate, now=None):
+        """Take a token from the bucket of key.
+
+        Return (allowed, wait) where wait is the seconds until a token is available.
+        """
+        now = time.monotonic() if now is None else now
+        digest = int.from_bytes(
+            hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little',
+        ) or 1  # 0 marks an empty slot
+        set_index = digest % self.sets
+
+        with self._locks[set_index % len(self._locks)]:
+            offset, found = self._slot_for(digest, set_index)
+            if found:
+                _, tokens, updated = SLOT.unpack_from(self._memory, offset)
+                tokens = min(capacity, tokens + (now - updated) * rate)
+            else:
+                tokens = capacity
+
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            SLOT.pack_into(self._memory, offset, digest, tokens, now)
+
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+    def clear(self):
+        """Empty every bucket."""
+        self._memory[:] = bytes(len(self._memory))
+
+
+store = SharedBucketStore()
+
+
+class TokenBucketThrottle(throttling.SimpleRateThrottle):
+    """Throttle allowing bursts of the rate's request count, refilled evenly over its period."""
+    store = store
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        allowed, self._wait = self.store.consume(
+            self.key, self.num_requests, self.num_requests / self.duration,
+        )
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class AnonTokenBucketThrottle(TokenBucketThrottle, throttling.AnonRateThrottle):
+    """Throttle unauthenticated requests per IP address."""
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle, throttling.UserRateThrottle):
+    """Throttle authenticated requests per user."""
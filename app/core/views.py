@@ -1,11 +1,54 @@
 """
 Core views for app.
 """
-from rest_framework.decorators import api_view
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+
+from drf_spectacular.utils import extend_schema, OpenApiTypes
+
+from rest_framework import status
+from rest_framework.decorators import api_view, throttle_classes
 from rest_framework.response import Response
 
+from core import health
+from core import metrics as core_metrics
 
+
+@extend_schema(responses={200: OpenApiTypes.OBJECT})
 @api_view(['GET'])
+@throttle_classes([])  # Probes come from the same few addresses
 def health_check(request):
-    """Returns successful response."""
+    """Liveness probe, returns successful response while the process can serve."""
     return Response({'healthy': True})
+
+
+@extend_schema(responses={200: OpenApiTypes.OBJECT, 503: OpenApiTypes.OBJECT})
+@api_view(['GET'])
+@throttle_classes([])
+def readiness_check(request):
+    """Readiness probe, returns 503 until the database can be reached."""
+    ready = health.database_ready()
+    return Response(
+        {
+            'ready': ready,
+            'database': ready,
+            'startup_seconds': health.startup_seconds,
+        },
+        status=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+
+
+@require_GET
+def metrics(request):
+    """Expose Prometheus metrics aggregated across workers to scrapers sending METRICS_TOKEN."""
+    # Nginx passes this path on from the internet, so without a token nobody is let in
+    expected = f'Bearer {settings.METRICS_TOKEN}'.encode()
+    supplied = request.headers.get('Authorization', '').encode()
+    if not settings.METRICS_TOKEN or not hmac.compare_digest(supplied, expected):
+        return HttpResponseForbidden()
+
+    data, content_type = core_metrics.render_latest()
+    return HttpResponse(data, content_type=content_type)
@@ -28,13 +28,10 @@ class UserSerializer(serializers.ModelSerializer):  # Convert objects to and fro
 
         # Default to 'None' because password is optional
         password = validated_data.pop('password', None)  # retrieve from valid dictionary then pop
-        user = super().update(instance, validated_data)
-
         if password:
-            user.set_password(password)
-            user.save()
+            instance.set_password(password)
 
-        return user
+        return super().update(instance, validated_data)  # saves the new password too
 
 
 class AuthTokenSerializer(serializers.Serializer):
@@ -1,10 +1,14 @@
 """
 Views for the user API.
 """
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
+from core.authentication import TokenAuthentication
+from core.purge import request_deletion
+
 from user.serializers import (
     UserSerializer,
     AuthTokenSerializer,
@@ -20,14 +24,21 @@ class CreateTokenView(ObtainAuthToken):  # Default uses username and password
     """Create a new auth token for user"""
     serializer_class = AuthTokenSerializer  # Overrides to use email and password
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES  # Use default class for token view
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES  # ObtainAuthToken lists its own
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES  # ObtainAuthToken disables them
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(generics.RetrieveUpdateDestroyAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [TokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
         """Retrive and return the authenticated user"""
         return self.request.user  # Retrieves the user that was authenticated and no other
+
+    def destroy(self, request, *args, **kwargs):
+        """Disable the account at once and delete its data in the background"""
+        request_deletion(request.user)
+        return Response(status=status.HTTP_202_ACCEPTED)
@@ -1,15 +1,109 @@
 """
 Serializers for the Videogame API view
 """
+from decimal import Decimal
+
+from django.db import models
+from drf_spectacular.extensions import OpenApiSerializerFieldExtension
 from rest_framework import serializers
 
+from core import metrics
+from core.renderers import DECIMAL_EXT_TYPE, pack_decimal
 from core.models import (
+    Genre,
     Videogame,
     Tag,
     Console,
 )
 
 
+MAX_DUPLICATES = 5  # similar titles listed when warning about duplicates
+
+
+class NameIdentityMap:
+    """The user's tags and consoles loaded during one request, by model and name.
+
+    Each name is looked up at most once per request however often it is repeated, and the
+    names of one write are looked up together. Nothing outlives the request, so renamed or
+    deleted tags and consoles are never served from here.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._objects = {}
+
+    def get_or_create(self, model, names):
+        """Return the user's model instances called names, in order without repeats."""
+        requested, names = len(names), list(dict.fromkeys(names))
+        missing = [name for name in names if (model, name) not in self._objects]
+        # Repeated and already loaded names are hits, the names looked up in the database misses
+        cache = f'{model._meta.model_name}_names'
+        metrics.record_cache(cache, True, requested - len(missing))
+        metrics.record_cache(cache, False, len(missing))
+        if missing:
+            for obj in model.objects.filter(user=self.user, name__in=missing).order_by('id'):
+                self._objects.setdefault((model, obj.name), obj)
+            created = model.objects.bulk_create([
+                model(user=self.user, name=name)
+                for name in missing if (model, name) not in self._objects
+            ])
+            self._objects.update({(model, obj.name): obj for obj in created})
+
+        return [self._objects[(model, name)] for name in names]
+
+
+def name_identity_map(request):
+    """Return the identity map of request, created on first use."""
+    if not hasattr(request, 'name_identity_map'):
+        request.name_identity_map = NameIdentityMap(request.user)
+
+    return request.name_identity_map
+
+
+class DecimalField(serializers.DecimalField):
+    """Decimal sent as a string, or as an extension to renderers with decimals_as_extension set.
+
+    MessagePack sends decimals as an extension type, see core.renderers.pack_decimal, and
+    requests parsed from MessagePack must send them the same way. A plain number would be
+    ambiguous, 60 could be 60.00 or 60 cents, so it is rejected rather than guessed at.
+    """
+    default_error_messages = {
+        'extension': (
+            f'Send decimals as the MessagePack decimal extension (type {DECIMAL_EXT_TYPE}).'
+        ),
+    }
+
+    def to_representation(self, value):
+        representation = super().to_representation(value)
+        renderer = getattr(self.context.get('request'), 'accepted_renderer', None)
+        if isinstance(representation, str) and getattr(renderer, 'decimals_as_extension', False):
+            return pack_decimal(representation)  # already quantized to the field's places
+
+        return representation
+
+    def to_internal_value(self, data):
+        request = self.context.get('request')
+        if getattr(request, 'decimals_as_extension', False) and not isinstance(data, Decimal):
+            self.fail('extension')
+
+        return super().to_internal_value(data)
+
+
+class DecimalFieldExtension(OpenApiSerializerFieldExtension):
+    """Document how DecimalField is sent in MessagePack next to its JSON schema."""
+    target_class = DecimalField
+
+    def map_serializer_field(self, auto_schema, direction):
+        schema = auto_schema._map_serializer_field(self.target, direction, bypass_extensions=True)
+        schema['description'] = (
+            'A string in application/json. In application/msgpack, the MessagePack extension '
+            f'type {DECIMAL_EXT_TYPE} whose data is the number of decimal places as one byte, '
+            'then the digits without the decimal point as a big-endian signed integer: 59.99 is '
+            'c7 03 01 02 17 6f. Numbers and strings are rejected in MessagePack requests.'
+        )
+        return schema
+
+
 class ConsoleSerializer(serializers.ModelSerializer):
     """Serializer for consoles."""
 
@@ -28,10 +122,41 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
+class ConsoleCountSerializer(ConsoleSerializer):
+    """Serializer for consoles with the number of videogames using them."""
+    videogame_count = serializers.IntegerField(read_only=True)
+
+    class Meta(ConsoleSerializer.Meta):
+        fields = ConsoleSerializer.Meta.fields + ['videogame_count']
+
+
+class TagCountSerializer(TagSerializer):
+    """Serializer for tags with the number of videogames using them."""
+    videogame_count = serializers.IntegerField(read_only=True)
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ['videogame_count']
+
+
+class MergeSerializer(serializers.Serializer):
+    """Serializer for the tags or consoles merged into another."""
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+
+class RenameSerializer(serializers.Serializer):
+    """Serializer for the new name of a tag or console."""
+    name = serializers.CharField(max_length=255)
+
+
 class VideogameSerializer(serializers.ModelSerializer):
     """Serializer for Videogame object"""
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.DecimalField: DecimalField,
+    }
     tags = TagSerializer(many=True, required=False)
     consoles = ConsoleSerializer(many=True, required=False)
+    genre = serializers.CharField(source='genre.name', max_length=255)  # sent as a name
 
     class Meta:
         model = Videogame
@@ -41,33 +166,36 @@ class VideogameSerializer(serializers.ModelSerializer):
 
         read_only_fields = ['id']
 
-    def _get_or_create_tags(self, tags, videogame):
-        """Handle getting or creating tags as needed."""
-        auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
-            )
-            videogame.tags.add(tag_obj)
-
-    def _get_or_create_consoles(self, consoles, videogame):  # internal, user won't call directly
-        """Handle getting or creating consoles as needed."""
-        auth_user = self.context['request'].user
-        for console in consoles:
-            console_obj, create = Console.objects.get_or_create(
-                user=auth_user,
-                **console,
+    duplicates = None  # games titled like a created one, when asked to warn about them
+
+    def _get_or_create_named(self, model, items):  # internal, user won't call directly
+        """Return the user's tags or consoles named in items, creating missing ones."""
+        return name_identity_map(self.context['request']).get_or_create(
+            model, [item['name'] for item in items],
+        )
+
+    def _get_or_create_genre(self, validated_data):
+        """Replace the genre name in validated_data with the user's genre of that name."""
+        if 'genre' in validated_data:
+            validated_data['genre'] = Genre.objects.get_or_create_by_name(
+                self.context['request'].user, validated_data['genre']['name'],
             )
-            videogame.consoles.add(console_obj)
 
     def create(self, validated_data):
         """Create a video game."""
         tags = validated_data.pop('tags', [])
         consoles = validated_data.pop('consoles', [])
+        self._get_or_create_genre(validated_data)
+        if self.context.get('warn_duplicates'):
+            # Looked up before the game exists, so it is not its own duplicate
+            self.duplicates = list(Videogame.objects.similar_titles(
+                validated_data['user'], validated_data['title'],
+            ).values('id', 'title')[:MAX_DUPLICATES])
         videogame = Videogame.objects.create(**validated_data)
-        self._get_or_create_tags(tags, videogame)
-        self._get_or_create_consoles(consoles, videogame)
+        if tags:
+            videogame.tags.add(*self._get_or_create_named(Tag, tags))
+        if consoles:
+            videogame.consoles.add(*self._get_or_create_named(Console, consoles))
 
         return videogame
 
@@ -75,12 +203,11 @@ class VideogameSerializer(serializers.ModelSerializer):
         """Update video game."""
         tags = validated_data.pop('tags', None)
         consoles = validated_data.pop('consoles', None)
+        self._get_or_create_genre(validated_data)
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            instance.tags.set(self._get_or_create_named(Tag, tags))
         if consoles is not None:
-            instance.consoles.clear()
-            self._get_or_create_consoles(consoles, instance)
+            instance.consoles.set(self._get_or_create_named(Console, consoles))
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
@@ -88,6 +215,14 @@ class VideogameSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
+    def to_representation(self, instance):
+        """Add the possible duplicates of a created game, if looked for."""
+        data = super().to_representation(instance)
+        if self.duplicates is not None:
+            data['duplicates'] = self.duplicates
+
+        return data
+
 
 class VideogameDetailSerializer(VideogameSerializer):
     """Serializer for videogame detail view."""
@@ -96,6 +231,64 @@ class VideogameDetailSerializer(VideogameSerializer):
         fields = VideogameSerializer.Meta.fields + ['description', 'image']
 
 
+class VideogameSideloadSerializer(VideogameSerializer):
+    """Serializer for videogames referencing their tags and consoles by id."""
+    tags = serializers.ListField(source='tag_ids', child=serializers.IntegerField(), read_only=True)
+    consoles = serializers.ListField(
+        source='console_ids', child=serializers.IntegerField(), read_only=True,
+    )
+
+
+class VideogameDetailSideloadSerializer(VideogameSideloadSerializer):
+    """Serializer for videogame details referencing their tags and consoles by id."""
+
+    class Meta(VideogameDetailSerializer.Meta):
+        pass
+
+
+class VideogameFilterSerializer(serializers.Serializer):
+    """Serializer validating the filters and ordering of video game lists."""
+    ORDERINGS = ['title', '-title', 'price', '-price', 'rating', '-rating']
+
+    price_min = serializers.DecimalField(max_digits=5, decimal_places=2, required=False)
+    price_max = serializers.DecimalField(max_digits=5, decimal_places=2, required=False)
+    rating_min = serializers.DecimalField(max_digits=4, decimal_places=2, required=False)
+    players = serializers.IntegerField(min_value=1, required=False)
+    genre = serializers.CharField(max_length=255, required=False)
+    similar = serializers.CharField(max_length=255, required=False)
+    ordering = serializers.ChoiceField(choices=ORDERINGS, required=False)
+
+
+class ChangesQuerySerializer(serializers.Serializer):
+    """Serializer validating the cursor of a delta sync."""
+    cursor = serializers.IntegerField(min_value=0, default=0)
+    limit = serializers.IntegerField(min_value=1, max_value=1000, default=500)
+
+
+class VideogameBulkSerializer(serializers.Serializer):
+    """Serializer selecting video games for a bulk action."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False, max_length=1000,
+    )
+
+
+class VideogameBulkUpdateSerializer(VideogameBulkSerializer, serializers.ModelSerializer):
+    """Serializer for the values set on every selected video game."""
+    serializer_field_mapping = VideogameSerializer.serializer_field_mapping
+    genre = serializers.CharField(max_length=255)
+
+    class Meta:
+        model = Videogame
+        fields = ['ids', 'price', 'rating', 'players', 'genre', 'description', 'link']
+
+    def validate(self, attrs):
+        """Require at least one value to set."""
+        if not set(attrs) - {'ids'}:
+            raise serializers.ValidationError('Provide at least one field to update.')
+
+        return attrs
+
+
 class VideogameImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to videogames."""
 
@@ -11,9 +11,11 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import (
+    Genre,
     Console,
     Videogame,
 )
+from core.tests.query_budget import QueryBudgetMixin
 
 from videogame.serializers import ConsoleSerializer
 
@@ -26,6 +28,16 @@ def detail_url(console_id):
     return reverse('videogame:console-detail', args=[console_id])
 
 
+def merge_url(console_id):
+    """Create and return a console merge url."""
+    return reverse('videogame:console-merge', args=[console_id])
+
+
+def rename_url(console_id):
+    """Create and return a console rename url."""
+    return reverse('videogame:console-rename', args=[console_id])
+
+
 def create_user(email='user@email.com', password='testpass123'):
     """Create and return user."""
     return get_user_model().objects.create_user(email=email, password=password)
@@ -111,7 +123,7 @@ class PrivateConsoleApiTests(TestCase):
             price=Decimal('60.00'),
             rating=Decimal('10.00'),
             players=2,
-            genre='Platformer',
+            genre=Genre.objects.get_or_create_by_name(self.user, 'Platformer'),
             user=self.user,
         )
         videogame.consoles.add(console1)
@@ -138,7 +150,7 @@ class PrivateConsoleApiTests(TestCase):
             price=Decimal('60.00'),
             rating=Decimal('10.00'),
             players=2,
-            genre='Platformer',
+            genre=Genre.objects.get_or_create_by_name(self.user, 'Platformer'),
             user=self.user,
         )
         videogame2 = Videogame.objects.create(
@@ -146,7 +158,7 @@ class PrivateConsoleApiTests(TestCase):
             price=Decimal('60.00'),
             rating=Decimal('10.00'),
             players=2,
-            genre='Platformer',
+            genre=Genre.objects.get_or_create_by_name(self.user, 'Platformer'),
             user=self.user,
         )
         videogame1.consoles.add(console)
@@ -156,3 +168,144 @@ class PrivateConsoleApiTests(TestCase):
         res = self.client.get(CONSOLES_URL, {'assigned_only': 1})
 
         self.assertEqual(len(res.data), 1)
+
+    def _create_videogame(self, title, *consoles):
+        """Create a videogame linked to consoles."""
+        videogame = Videogame.objects.create(
+            title=title,
+            price=Decimal('60.00'),
+            rating=Decimal('10.00'),
+            players=2,
+            genre=Genre.objects.get_or_create_by_name(self.user, 'Platformer'),
+            user=self.user,
+        )
+        videogame.consoles.add(*consoles)
+        return videogame
+
+    def test_merge_consoles(self):
+        """Test merging moves the videogames of duplicates to the survivor once each."""
+        survivor = Console.objects.create(user=self.user, name='RPG')
+        lower = Console.objects.create(user=self.user, name='rpg')
+        long = Console.objects.create(user=self.user, name='Role-playing')
+        both = self._create_videogame('Both', survivor, lower)
+        duplicates = self._create_videogame('Duplicates', lower, long)
+        single = self._create_videogame('Single', long)
+
+        res = self.client.post(merge_url(survivor.id), {'ids': [lower.id, long.id]})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'id': survivor.id, 'name': 'RPG'})
+        self.assertEqual(list(Console.objects.all()), [survivor])
+        for videogame in [both, duplicates, single]:
+            self.assertEqual(list(videogame.consoles.all()), [survivor])
+
+    def test_merge_limited_to_user(self):
+        """Test other users' consoles are not merged."""
+        survivor = Console.objects.create(user=self.user, name='RPG')
+        other_user = create_user(email='other@example.com')
+        other = Console.objects.create(user=other_user, name='rpg')
+
+        res = self.client.post(merge_url(survivor.id), {'ids': [other.id]})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(Console.objects.filter(id=other.id).exists())
+
+    def test_list_with_counts(self):
+        """Test listing consoles with the number of videogames using each."""
+        used = Console.objects.create(user=self.user, name='Used')
+        unused = Console.objects.create(user=self.user, name='Unused')
+        for i in range(2):
+            videogame = Videogame.objects.create(
+                title=f'Game {i}',
+                price=Decimal('60.00'),
+                rating=Decimal('10.00'),
+                players=2,
+                genre=Genre.objects.get_or_create_by_name(self.user, 'Platformer'),
+                user=self.user,
+            )
+            videogame.consoles.add(used)
+
+        res = self.client.get(CONSOLES_URL, {'with_counts': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {'id': used.id, 'name': 'Used', 'videogame_count': 2},
+            {'id': unused.id, 'name': 'Unused', 'videogame_count': 0},
+        ])
+
+        res = self.client.get(CONSOLES_URL, {'with_counts': 1, 'assigned_only': 1})
+
+        self.assertEqual([item['id'] for item in res.data], [used.id])
+
+
+class ConsoleQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Test console endpoints stay within their query budgets."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_budget_independent_of_size(self):
+        """Test listing consoles does not add queries per result."""
+        consoles = [Console.objects.create(user=self.user, name=f'Console {i}') for i in range(10)]
+        for i in range(5):
+            videogame = Videogame.objects.create(
+                title=f'Game {i}',
+                price=Decimal('60.00'),
+                rating=Decimal('10.00'),
+                players=2,
+                genre=Genre.objects.get_or_create_by_name(self.user, 'Platformer'),
+                user=self.user,
+            )
+            videogame.consoles.add(*consoles)
+
+        for params in [{}, {'assigned_only': 1}, {'assigned_only': 1, 'with_counts': 1}]:
+            with self.assertWithinBudget('console-list'):
+                res = self.client.get(CONSOLES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(res.data), 10)
+
+    def test_partial_update_budget(self):
+        """Test updating a console stays within budget."""
+        console = Console.objects.create(user=self.user, name='Old name')
+
+        with self.assertWithinBudget('console-partial-update'):
+            res = self.client.patch(detail_url(console.id), {'name': 'New name'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_destroy_budget(self):
+        """Test deleting a console stays within budget."""
+        console = Console.objects.create(user=self.user, name='Old name')
+
+        with self.assertWithinBudget('console-destroy'):
+            res = self.client.delete(detail_url(console.id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_merge_budget_independent_of_size(self):
+        """Test merging runs the same statements however many videogames are linked."""
+        for count in [2, 20]:
+            consoles = [
+                Console.objects.create(user=self.user, name=f'{count} {i}') for i in range(3)
+            ]
+            for i in range(count):
+                videogame = Videogame.objects.create(
+                    title=f'Game {i}',
+                    price=Decimal('60.00'),
+                    rating=Decimal('10.00'),
+                    players=2,
+                    genre=Genre.objects.get_or_create_by_name(self.user, 'Platformer'),
+                    user=self.user,
+                )
+                videogame.consoles.add(*consoles[i % 2:])
+
+            with self.assertWithinBudget('console-merge'):
+                res = self.client.post(
+                    merge_url(consoles[0].id), {'ids': [consoles[1].id, consoles[2].id]},
+                )
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(consoles[0].videogame_set.count(), count)
@@ -11,9 +11,11 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import (
+    Genre,
     Tag,
     Videogame,
 )
+from core.tests.query_budget import QueryBudgetMixin
 
 from videogame.serializers import TagSerializer
 
@@ -25,6 +27,16 @@ def detail_url(tag_id):
     return reverse('videogame:tag-detail', args=[tag_id])
 
 
+def merge_url(tag_id):
+    """Create and return a tag merge url."""
+    return reverse('videogame:tag-merge', args=[tag_id])
+
+
+def rename_url(tag_id):
+    """Create and return a tag rename url."""
+    return reverse('videogame:tag-rename', args=[tag_id])
+
+
 def create_user(email='user@example.com', password='testpass123'):
     return get_user_model().objects.create_user(email=email, password=password)
 
@@ -110,7 +122,7 @@ class PrivateTagsapiTests(TestCase):
             price=Decimal('60.00'),
             rating=Decimal('10.00'),
             players=2,
-            genre='Platformer',
+            genre=Genre.objects.get_or_create_by_name(self.user, 'Platformer'),
             user=self.user,
         )
         videogame.tags.add(tag1)
@@ -137,7 +149,7 @@ class PrivateTagsapiTests(TestCase):
             price=Decimal('60.00'),
             rating=Decimal('10.00'),
             players=2,
-            genre='Platformer',
+            genre=Genre.objects.get_or_create_by_name(self.user, 'Platformer'),
             user=self.user,
         )
         videogame2 = Videogame.objects.create(
@@ -145,7 +157,7 @@ class PrivateTagsapiTests(TestCase):
             price=Decimal('60.00'),
             rating=Decimal('10.00'),
             players=2,
-            genre='Platformer',
+            genre=Genre.objects.get_or_create_by_name(self.user, 'Platformer'),
             user=self.user,
         )
         videogame1.tags.add(tag)
@@ -155,3 +167,162 @@ class PrivateTagsapiTests(TestCase):
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
         self.assertEqual(len(res.data), 1)
+
+    def _create_videogame(self, title, *tags):
+        """Create a videogame linked to tags."""
+        videogame = Videogame.objects.create(
+            title=title,
+            price=Decimal('60.00'),
+            rating=Decimal('10.00'),
+            players=2,
+            genre=Genre.objects.get_or_create_by_name(self.user, 'Platformer'),
+            user=self.user,
+        )
+        videogame.tags.add(*tags)
+        return videogame
+
+    def test_merge_tags(self):
+        """Test merging moves the videogames of duplicates to the survivor once each."""
+        survivor = Tag.objects.create(user=self.user, name='RPG')
+        lower = Tag.objects.create(user=self.user, name='rpg')
+        long = Tag.objects.create(user=self.user, name='Role-playing')
+        both = self._create_videogame('Both', survivor, lower)
+        duplicates = self._create_videogame('Duplicates', lower, long)
+        single = self._create_videogame('Single', long)
+
+        res = self.client.post(merge_url(survivor.id), {'ids': [lower.id, long.id]})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'id': survivor.id, 'name': 'RPG'})
+        self.assertEqual(list(Tag.objects.all()), [survivor])
+        for videogame in [both, duplicates, single]:
+            self.assertEqual(list(videogame.tags.all()), [survivor])
+
+    def test_merge_limited_to_user(self):
+        """Test other users' tags are not merged."""
+        survivor = Tag.objects.create(user=self.user, name='RPG')
+        other_user = create_user(email='other@example.com')
+        other = Tag.objects.create(user=other_user, name='rpg')
+
+        res = self.client.post(merge_url(survivor.id), {'ids': [other.id]})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(Tag.objects.filter(id=other.id).exists())
+
+    def test_rename_merges_case_insensitive_match(self):
+        """Test renaming to an existing name merges the existing tag in."""
+        tag = Tag.objects.create(user=self.user, name='Role-playing')
+        existing = Tag.objects.create(user=self.user, name='rpg')
+        videogame = self._create_videogame('Game', existing)
+
+        res = self.client.post(rename_url(tag.id), {'name': 'RPG'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(Tag.objects.values_list('id', 'name')), [(tag.id, 'RPG')])
+        self.assertEqual(list(videogame.tags.all()), [tag])
+
+    def test_rename_without_match(self):
+        """Test renaming to a new name only changes the name."""
+        tag = Tag.objects.create(user=self.user, name='Role-playing')
+
+        res = self.client.post(rename_url(tag.id), {'name': 'RPG'})
+
+        self.assertEqual(res.data, {'id': tag.id, 'name': 'RPG'})
+
+    def test_list_with_counts(self):
+        """Test listing tags with the number of videogames using each."""
+        used = Tag.objects.create(user=self.user, name='Used')
+        unused = Tag.objects.create(user=self.user, name='Unused')
+        for i in range(2):
+            videogame = Videogame.objects.create(
+                title=f'Game {i}',
+                price=Decimal('60.00'),
+                rating=Decimal('10.00'),
+                players=2,
+                genre=Genre.objects.get_or_create_by_name(self.user, 'Platformer'),
+                user=self.user,
+            )
+            videogame.tags.add(used)
+
+        res = self.client.get(TAGS_URL, {'with_counts': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {'id': used.id, 'name': 'Used', 'videogame_count': 2},
+            {'id': unused.id, 'name': 'Unused', 'videogame_count': 0},
+        ])
+
+        res = self.client.get(TAGS_URL, {'with_counts': 1, 'assigned_only': 1})
+
+        self.assertEqual([item['id'] for item in res.data], [used.id])
+
+
+class TagQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Test tag endpoints stay within their query budgets."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_budget_independent_of_size(self):
+        """Test listing tags does not add queries per result."""
+        tags = [Tag.objects.create(user=self.user, name=f'Tag {i}') for i in range(10)]
+        for i in range(5):
+            videogame = Videogame.objects.create(
+                title=f'Game {i}',
+                price=Decimal('60.00'),
+                rating=Decimal('10.00'),
+                players=2,
+                genre=Genre.objects.get_or_create_by_name(self.user, 'Platformer'),
+                user=self.user,
+            )
+            videogame.tags.add(*tags)
+
+        for params in [{}, {'assigned_only': 1}, {'assigned_only': 1, 'with_counts': 1}]:
+            with self.assertWithinBudget('tag-list'):
+                res = self.client.get(TAGS_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(res.data), 10)
+
+    def test_partial_update_budget(self):
+        """Test updating a tag stays within budget."""
+        tag = Tag.objects.create(user=self.user, name='Old name')
+
+        with self.assertWithinBudget('tag-partial-update'):
+            res = self.client.patch(detail_url(tag.id), {'name': 'New name'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_destroy_budget(self):
+        """Test deleting a tag stays within budget."""
+        tag = Tag.objects.create(user=self.user, name='Old name')
+
+        with self.assertWithinBudget('tag-destroy'):
+            res = self.client.delete(detail_url(tag.id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_merge_budget_independent_of_size(self):
+        """Test merging runs the same statements however many videogames are linked."""
+        for count in [2, 20]:
+            tags = [Tag.objects.create(user=self.user, name=f'{count} {i}') for i in range(3)]
+            for i in range(count):
+                videogame = Videogame.objects.create(
+                    title=f'Game {i}',
+                    price=Decimal('60.00'),
+                    rating=Decimal('10.00'),
+                    players=2,
+                    genre=Genre.objects.get_or_create_by_name(self.user, 'Platformer'),
+                    user=self.user,
+                )
+                videogame.tags.add(*tags[i % 2:])
+
+            with self.assertWithinBudget('tag-merge'):
+                res = self.client.post(
+                    merge_url(tags[0].id), {'ids': [tags[1].id, tags[2].id]},
+                )
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(tags[0].videogame_set.count(), count)
@@ -7,7 +7,9 @@ import tempfile
 from decimal import Decimal
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from PIL import Image
@@ -16,10 +18,14 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import (
+    Genre,
+    LatestChange,
     Videogame,
     Tag,
     Console,
+    Tombstone,
 )
+from core.tests.query_budget import QueryBudgetMixin
 
 from videogame.serializers import (
     VideogameSerializer,
@@ -28,6 +34,9 @@ from videogame.serializers import (
 
 
 VIDEOGAMES_URL = reverse('videogame:videogame-list')
+BULK_URL = reverse('videogame:videogame-bulk-update')
+FACETS_URL = reverse('videogame:videogame-facets')
+CHANGES_URL = reverse('videogame:videogame-changes')
 
 
 def detail_url(videogame_id):
@@ -53,6 +62,7 @@ def create_videogame(user, **params):
         'link'       : 'http://example.com/videogame.pdf',
     }
     defaults.update(params)
+    defaults['genre'] = Genre.objects.get_or_create_by_name(user, defaults['genre'])
 
     videogame = Videogame.objects.create(user=user, **defaults)
     return videogame
@@ -133,6 +143,7 @@ class PrivateVideogameAPITests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_201_CREATED)
         videogame = Videogame.objects.get(id=res.data['id'])
+        self.assertEqual(videogame.genre.name, payload.pop('genre'))  # stored as a Genre
         for k, v in payload.items():  # k=key v=value
             self.assertEqual(getattr(videogame, k), v)  # get attribute without dot notation
         self.assertEqual(videogame.user, self.user)
@@ -179,6 +190,7 @@ class PrivateVideogameAPITests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         videogame.refresh_from_db()
+        self.assertEqual(videogame.genre.name, payload.pop('genre'))
         for k, v in payload.items():
             self.assertEqual(getattr(videogame, k), v)
         self.assertEqual(videogame.user, self.user)
@@ -449,8 +461,671 @@ class PrivateVideogameAPITests(TestCase):
         self.assertIn(s2.data, res.data)
         self.assertNotIn(s3.data, res.data)
 
+    def test_filter_by_all_tags(self):
+        """Test match=all returns only games with every listed tag"""
+        tag1 = Tag.objects.create(user=self.user, name='Nintendo')
+        tag2 = Tag.objects.create(user=self.user, name='Co-op')
+        v1 = create_videogame(user=self.user, title='Mario Kart')
+        v2 = create_videogame(user=self.user, title='Metroid Prime')
+        v1.tags.add(tag1, tag2)
+        v2.tags.add(tag1)
+
+        params = {'tags': f'{tag1.id},{tag2.id}', 'match': 'all'}
+        res = self.client.get(VIDEOGAMES_URL, params)
+
+        self.assertEqual([videogame['id'] for videogame in res.data], [v1.id])
+
+
+class FilterOrderingAPITests(TestCase):
+    """Test the range and genre filters and the ordering of video games."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+        self.cheap = create_videogame(
+            self.user, title='B', price=Decimal('9.99'), rating=6, players=1, genre='RPG',
+        )
+        self.mid = create_videogame(
+            self.user, title='C', price=Decimal('29.99'), rating=9, players=4, genre='Racing',
+        )
+        self.pricey = create_videogame(
+            self.user, title='A', price=Decimal('69.99'), rating=8, players=2, genre='RPG',
+        )
+
+    def _ids(self, params):
+        res = self.client.get(VIDEOGAMES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [videogame['id'] for videogame in res.data]
+
+    def test_range_filters(self):
+        """Test price, rating and players ranges select matching games."""
+        self.assertEqual(
+            self._ids({'price_min': '10', 'price_max': '70'}), [self.pricey.id, self.mid.id],
+        )
+        self.assertEqual(self._ids({'rating_min': '8.5'}), [self.mid.id])
+        self.assertEqual(self._ids({'players': 2}), [self.pricey.id, self.mid.id])
+
+    def test_genre_filter(self):
+        """Test filtering by genre name, in any case."""
+        self.assertEqual(self._ids({'genre': 'RPG'}), [self.pricey.id, self.cheap.id])
+        self.assertEqual(self._ids({'genre': 'rpg'}), [self.pricey.id, self.cheap.id])
+
+    def test_ordering(self):
+        """Test sorting by title, price and rating in either direction."""
+        self.assertEqual(self._ids({'ordering': 'title'}), [
+            self.pricey.id, self.cheap.id, self.mid.id,
+        ])
+        self.assertEqual(self._ids({'ordering': '-price'}), [
+            self.pricey.id, self.mid.id, self.cheap.id,
+        ])
+        self.assertEqual(self._ids({'ordering': 'rating', 'price_min': '10'}), [
+            self.pricey.id, self.mid.id,
+        ])
+
+    def test_invalid_parameters(self):
+        """Test malformed filters and unknown orderings are rejected."""
+        for params in [{'price_min': 'cheap'}, {'players': 0}, {'ordering': 'description'}]:
+            res = self.client.get(VIDEOGAMES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sorted_pages_use_index(self):
+        """Test filtered and sorted lists read a (user, column, id) index without sorting."""
+        for params, index in [
+            ({'ordering': '-price', 'price_max': '50'}, 'videogame_user_price_idx'),
+            ({'ordering': 'title'}, 'videogame_user_title_idx'),
+            ({}, 'videogame_user_id_idx'),
+        ]:
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(VIDEOGAMES_URL, params)
+
+            with connection.cursor() as cursor:
+                # Tiny test tables are cheaper to scan and sort, so penalise both. A sort
+                # then remains in the plan only if no index returns the rows in order
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('SET LOCAL enable_sort = off')
+                cursor.execute(f'EXPLAIN {queries[0]["sql"]}')
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+                cursor.execute('RESET enable_seqscan')
+                cursor.execute('RESET enable_sort')
+
+            self.assertIn(index, plan)
+            self.assertNotIn('Sort', plan)
+
+
+class SimilarTitleAPITests(TestCase):
+    """Test finding video games by similar title and warning about duplicates."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+        self.exact = create_videogame(self.user, title='The Legend of Zelda: Breath of the Wild')
+        self.close = create_videogame(self.user, title='Zelda Breath of Wild')
+        create_videogame(self.user, title='Halo Infinite')
+        other = create_user(email='other@example.com', password='test123')
+        create_videogame(other, title='The Legend of Zelda: Breath of the Wild')
+
+    def test_similar_titles(self):
+        """Test games titled like the search are listed, the most similar first."""
+        res = self.client.get(VIDEOGAMES_URL, {'similar': 'legend of zelda breath of the wild'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([game['id'] for game in res.data], [self.exact.id, self.close.id])
+
+    def test_similar_uses_user_trigram_index(self):
+        """Test similar titles are matched within the user's titles in the trigram index."""
+        # Enough of the user's games that filtering them all by title costs more than the index
+        genre = Genre.objects.get_or_create_by_name(self.user, 'FPS')
+        Videogame.objects.bulk_create(
+            Videogame(
+                user=self.user, title=f'Game {i}', price=Decimal('60.00'), rating=Decimal('10.00'),
+                players=4, genre=genre,
+            )
+            for i in range(3000)
+        )
+        with connection.cursor() as cursor:
+            # Moves the new titles out of the GIN pending list, which is costed as a full read
+            cursor.execute("SELECT gin_clean_pending_list('videogame_user_title_trgm_idx')")
+            cursor.execute(f'ANALYZE {Videogame._meta.db_table}')
+            cursor.execute('SET LOCAL enable_seqscan = off')  # small tables are cheaper to scan
+            plan = Videogame.objects.similar_titles(self.user, 'Zelda').explain()
+            cursor.execute('RESET enable_seqscan')
+
+        self.assertIn('videogame_user_title_trgm_idx', plan)
+        self.assertIn(f"Index Cond: ((user_id = '{self.user.id}'::bigint) AND ", plan)
+
+    def test_create_warns_about_duplicates(self):
+        """Test a created game lists similar titles when asked, and is created anyway."""
+        payload = {
+            'title': 'Legend of Zelda Breath of the Wild',
+            'price': Decimal('60.00'),
+            'rating': Decimal('9.00'),
+            'players': 1,
+            'genre': 'Adventure',
+        }
+
+        res = self.client.post(f'{VIDEOGAMES_URL}?warn_duplicates=1', payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['duplicates'], [
+            {'id': self.exact.id, 'title': self.exact.title},
+            {'id': self.close.id, 'title': self.close.title},
+        ])
+        self.assertTrue(Videogame.objects.filter(id=res.data['id']).exists())
+
+        res = self.client.post(VIDEOGAMES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('duplicates', res.data)
+
+
+class FacetsAPITests(QueryBudgetMixin, TestCase):
+    """Test the facet counts API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def test_facets(self):
+        """Test counts per tag, console, genre and price and rating range."""
+        switch = Console.objects.create(user=self.user, name='Switch')
+        ps5 = Console.objects.create(user=self.user, name='PS5')
+        coop = Tag.objects.create(user=self.user, name='Co-op')
+        v1 = create_videogame(self.user, genre='Racing', price=Decimal('59.99'), rating=9.5)
+        v2 = create_videogame(self.user, genre='Racing', price=Decimal('55.00'), rating=7)
+        v3 = create_videogame(self.user, genre='RPG', price=Decimal('120.00'), rating=7.2)
+        v1.consoles.add(switch, ps5)
+        v2.consoles.add(switch)
+        v3.consoles.add(ps5)
+        v1.tags.add(coop)
+        other_user = create_user(email='other@example.com', password='test123')
+        create_videogame(other_user, genre='Racing')
+
+        res = self.client.get(FACETS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'count': 3,
+            'tags': [{'id': coop.id, 'name': 'Co-op', 'count': 1}],
+            'consoles': [
+                {'id': ps5.id, 'name': 'PS5', 'count': 2},
+                {'id': switch.id, 'name': 'Switch', 'count': 2},
+            ],
+            'genres': [{'name': 'Racing', 'count': 2}, {'name': 'RPG', 'count': 1}],
+            'price': [
+                {'min': '50.00', 'max': '60.00', 'count': 2},
+                {'min': '100.00', 'max': None, 'count': 1},
+            ],
+            'rating': [
+                {'min': '7.00', 'max': '8.00', 'count': 2},
+                {'min': '9.00', 'max': '10.00', 'count': 1},
+            ],
+        })
+
+    def test_facets_filtered(self):
+        """Test facets count only the games matching the filters."""
+        switch = Console.objects.create(user=self.user, name='Switch')
+        v1 = create_videogame(self.user, genre='Racing')
+        create_videogame(self.user, genre='RPG')
+        v1.consoles.add(switch)
+
+        res = self.client.get(FACETS_URL, {'consoles': switch.id})
+
+        self.assertEqual(res.data['count'], 1)
+        self.assertEqual(res.data['genres'], [{'name': 'Racing', 'count': 1}])
+
+    def test_facets_budget_independent_of_size(self):
+        """Test facets are a single query however many games match."""
+        tags = [Tag.objects.create(user=self.user, name=f'Tag {i}') for i in range(3)]
+        for i in range(20):
+            videogame = create_videogame(self.user, title=f'Game {i}', price=Decimal(i))
+            videogame.tags.add(*tags[:i % 3 + 1])
+
+        with self.assertWithinBudget('videogame-facets'):
+            res = self.client.get(FACETS_URL)
+
+        self.assertEqual(res.data['count'], 20)
+        self.assertEqual(sum(bucket['count'] for bucket in res.data['price']), 20)
+
+
+class BatchFetchAPITests(QueryBudgetMixin, TestCase):
+    """Test fetching several video games by id in one request."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def test_fetch_in_requested_order(self):
+        """Test the requested games are returned in full, in the order asked for."""
+        games = [create_videogame(self.user, title=f'Game {i}') for i in range(3)]
+        other = create_videogame(create_user(email='other@example.com', password='test123'))
+        ids = [games[2].id, other.id, games[0].id, games[1].id]
+
+        res = self.client.get(VIDEOGAMES_URL, {'ids': ','.join(map(str, ids))})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [game['id'] for game in res.data], [games[2].id, games[0].id, games[1].id],
+        )
+        self.assertIn('description', res.data[0])
+
+    def test_invalid_ids(self):
+        """Test malformed and too long id lists are rejected."""
+        too_many = ','.join(str(i) for i in range(1, 502))
+        for ids in ['1,two', too_many]:
+            res = self.client.get(VIDEOGAMES_URL, {'ids': ids})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_fetch_budget_independent_of_size(self):
+        """Test fetching many games costs the same queries as fetching one."""
+        tag = Tag.objects.create(user=self.user, name='Co-op')
+        console = Console.objects.create(user=self.user, name='PC')
+        ids = []
+        for i in range(20):
+            videogame = create_videogame(self.user, title=f'Game {i}')
+            videogame.tags.add(tag)
+            videogame.consoles.add(console)
+            ids.append(str(videogame.id))
+
+        with self.assertWithinBudget('videogame-list'):
+            res = self.client.get(VIDEOGAMES_URL, {'ids': ','.join(ids)})
+
+        self.assertEqual(len(res.data), 20)
+
+
+class SideloadAPITests(QueryBudgetMixin, TestCase):
+    """Test listing video games with their tags and consoles side-loaded."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def test_sideloaded_list(self):
+        """Test games reference tags and consoles by id, each included once."""
+        switch = Console.objects.create(user=self.user, name='Switch')
+        coop = Tag.objects.create(user=self.user, name='Co-op')
+        Tag.objects.create(user=self.user, name='Unused')
+        v1 = create_videogame(self.user, title='Mario Kart')
+        v2 = create_videogame(self.user, title='Zelda')
+        v1.tags.add(coop)
+        v1.consoles.add(switch)
+        v2.consoles.add(switch)
+
+        res = self.client.get(VIDEOGAMES_URL, {'sideload': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(game['id'], game['tags'], game['consoles']) for game in res.data['videogames']],
+            [(v2.id, [], [switch.id]), (v1.id, [coop.id], [switch.id])],
+        )
+        self.assertEqual(res.data['included'], {
+            'tags': [{'id': coop.id, 'name': 'Co-op'}],
+            'consoles': [{'id': switch.id, 'name': 'Switch'}],
+        })
+
+    def test_sideloaded_batch_fetch(self):
+        """Test games fetched by id can be side-loaded too, with their details."""
+        videogame = create_videogame(self.user)
+
+        res = self.client.get(VIDEOGAMES_URL, {'sideload': 1, 'ids': videogame.id})
+
+        self.assertEqual(res.data['videogames'][0]['description'], videogame.description)
+        self.assertEqual(res.data['included'], {'tags': [], 'consoles': []})
+
+    def test_sideload_budget_independent_of_size(self):
+        """Test side-loading many games costs the same queries as listing them."""
+        tags = [Tag.objects.create(user=self.user, name=f'Tag {i}') for i in range(3)]
+        console = Console.objects.create(user=self.user, name='PC')
+        for i in range(10):
+            videogame = create_videogame(self.user, title=f'Game {i}')
+            videogame.tags.add(*tags)
+            videogame.consoles.add(console)
+
+        with self.assertWithinBudget('videogame-list'):
+            res = self.client.get(VIDEOGAMES_URL, {'sideload': 1})
+
+        self.assertEqual(len(res.data['videogames']), 10)
+        self.assertEqual(len(res.data['included']['tags']), 3)
+
+
+class ChangesAPITests(QueryBudgetMixin, TestCase):
+    """Test the delta sync API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def sync(self, cursor, **params):
+        """Return the changes after cursor."""
+        res = self.client.get(CHANGES_URL, {'cursor': cursor, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def latest_change_writes(self):
+        """Return the rows this transaction inserted or updated in the latest changes."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT n_tup_ins + n_tup_upd FROM pg_stat_xact_user_tables "
+                "WHERE relname = 'core_latestchange'"
+            )
+            return cursor.fetchone()[0]
+
+    def test_bulk_statements_write_latest_change_once(self):
+        """Test set based writes number every row but write the user's latest change once."""
+        genre = Genre.objects.get_or_create_by_name(self.user, 'FPS')
+        writes = self.latest_change_writes()
+
+        Videogame.objects.bulk_create([
+            Videogame(
+                user=self.user, title=f'Game {i}', price=Decimal('10.00'),
+                rating=Decimal('5.00'), players=1, genre=genre,
+            )
+            for i in range(3000)
+        ])
+        Videogame.objects.filter(user=self.user).update(players=2)
+
+        self.assertEqual(self.latest_change_writes() - writes, 2)  # one per statement
+        seqs = Videogame.objects.filter(user=self.user).values_list('change_seq', flat=True)
+        self.assertEqual(len(set(seqs)), 3000)
+        self.assertEqual(LatestChange.objects.get(user=self.user).seq, max(seqs))
+
+    def test_initial_sync(self):
+        """Test a sync from 0 returns the user's games, tags and consoles."""
+        tag = Tag.objects.create(user=self.user, name='Co-op')
+        videogame = create_videogame(self.user)
+        videogame.tags.add(tag)
+        create_videogame(create_user(email='other@example.com', password='test123'))
+
+        changes = self.sync(0)
+
+        self.assertEqual([game['id'] for game in changes['videogames']], [videogame.id])
+        self.assertEqual(changes['videogames'][0]['tags'], [{'id': tag.id, 'name': 'Co-op'}])
+        self.assertEqual(changes['tags'], [{'id': tag.id, 'name': 'Co-op'}])
+        self.assertFalse(changes['has_more'])
+
+    def test_changes_since_cursor(self):
+        """Test only what changed after the cursor is returned, deletions as ids."""
+        kept = create_videogame(self.user, title='Kept')
+        edited = create_videogame(self.user, title='Edited')
+        deleted = create_videogame(self.user, title='Deleted')
+        console = Console.objects.create(user=self.user, name='Switch')
+        cursor = self.sync(0)['cursor']
+        deleted_ids = {'videogames': [deleted.id], 'tags': [], 'consoles': [console.id]}
+
+        edited.title = 'Edited again'
+        edited.save()
+        kept.save()  # saved unchanged, not a change
+        deleted.delete()
+        console.delete()
+        changes = self.sync(cursor)
+
+        self.assertEqual([game['title'] for game in changes['videogames']], ['Edited again'])
+        self.assertEqual(changes['deleted'], deleted_ids)
+        self.assertGreater(changes['cursor'], cursor)
+
+    def test_tag_added_changes_game(self):
+        """Test tagging a game returns the game as changed."""
+        videogame = create_videogame(self.user)
+        tag = Tag.objects.create(user=self.user, name='Co-op')
+        cursor = self.sync(0)['cursor']
+
+        videogame.tags.add(tag)
+        changes = self.sync(cursor)
+
+        self.assertEqual([game['id'] for game in changes['videogames']], [videogame.id])
+
+    def test_paged_by_limit(self):
+        """Test a sync returns at most limit changes and a cursor to continue from."""
+        videogames = [create_videogame(self.user, title=f'Game {i}') for i in range(5)]
 
-class ImageUploadTests(TestCase):
+        first = self.sync(0, limit=3)
+        second = self.sync(first['cursor'], limit=3)
+
+        self.assertTrue(first['has_more'])
+        self.assertFalse(second['has_more'])
+        synced = [game['id'] for game in first['videogames'] + second['videogames']]
+        self.assertEqual(synced, [videogame.id for videogame in videogames])
+
+    def test_no_changes_one_query(self):
+        """Test a sync that finds nothing new costs a single query."""
+        create_videogame(self.user)
+        cursor = self.sync(0)['cursor']
+
+        with self.assertWithinBudget('videogame-changes-none'):
+            changes = self.sync(cursor)
+
+        self.assertEqual(changes['cursor'], cursor)
+        self.assertEqual(changes['videogames'], [])
+
+    def test_changes_budget(self):
+        """Test a sync with changes stays within its query budget."""
+        tag = Tag.objects.create(user=self.user, name='Co-op')
+        for i in range(3):
+            create_videogame(self.user, title=f'Game {i}').tags.add(tag)
+
+        with self.assertWithinBudget('videogame-changes'):
+            self.sync(0)
+
+
+class BulkVideogameAPITests(TestCase):
+    """Test the bulk update and delete APIs."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_update_by_ids(self):
+        """Test setting fields on the selected games only."""
+        v1 = create_videogame(user=self.user, title='Metroid Prime')
+        v2 = create_videogame(user=self.user, title='Halo Infinite')
+        other_user = create_user(email='other@example.com', password='test123')
+        other = create_videogame(user=other_user, title='Doom')
+
+        payload = {'ids': [v1.id, other.id], 'genre': 'Adventure', 'price': '19.99'}
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'updated': 1})
+        for videogame in [v1, v2, other]:
+            videogame.refresh_from_db()
+        self.assertEqual((v1.genre.name, v1.price), ('Adventure', Decimal('19.99')))
+        self.assertEqual(v2.genre.name, 'FPS')
+        self.assertEqual(other.genre.name, 'FPS')
+
+    def test_bulk_update_by_tags(self):
+        """Test selecting the games to update with the tags filter."""
+        tag = Tag.objects.create(user=self.user, name='Nintendo')
+        tagged = [create_videogame(user=self.user, title=f'Game {i}') for i in range(3)]
+        for videogame in tagged:
+            videogame.tags.add(tag)
+        untagged = create_videogame(user=self.user, title='Untagged')
+
+        res = self.client.patch(
+            f'{BULK_URL}?tags={tag.id}', {'players': 1}, format='json',
+        )
+
+        self.assertEqual(res.data, {'updated': 3})
+        self.assertEqual(
+            set(Videogame.objects.filter(players=1).values_list('id', flat=True)),
+            {videogame.id for videogame in tagged},
+        )
+        untagged.refresh_from_db()
+        self.assertEqual(untagged.players, 4)
+
+    def test_bulk_update_requires_selection(self):
+        """Test a bulk update without ids or filters is rejected."""
+        create_videogame(user=self.user)
+
+        res = self.client.patch(BULK_URL, {'genre': 'Adventure'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Videogame.objects.filter(genre__name='Adventure').exists())
+
+    def test_bulk_update_requires_values(self):
+        """Test a bulk update with nothing to set is rejected."""
+        videogame = create_videogame(user=self.user)
+
+        res = self.client.patch(BULK_URL, {'ids': [videogame.id]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_delete_by_consoles(self):
+        """Test deleting the games on a console along with their links."""
+        console = Console.objects.create(user=self.user, name='Gamecube')
+        tag = Tag.objects.create(user=self.user, name='Nintendo')
+        doomed = [create_videogame(user=self.user, title=f'Game {i}') for i in range(3)]
+        for videogame in doomed:
+            videogame.consoles.add(console)
+            videogame.tags.add(tag)
+        kept = create_videogame(user=self.user, title='Halo Infinite')
+
+        res = self.client.delete(f'{BULK_URL}?consoles={console.id}')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'deleted': 3})
+        self.assertEqual(list(Videogame.objects.all()), [kept])
+        self.assertFalse(Videogame.tags.through.objects.exists())
+        self.assertFalse(Videogame.consoles.through.objects.exists())
+
+    def test_bulk_delete_limited_to_user(self):
+        """Test other users' games are never deleted."""
+        other_user = create_user(email='other@example.com', password='test123')
+        other = create_videogame(user=other_user)
+
+        res = self.client.delete(BULK_URL, {'ids': [other.id]}, format='json')
+
+        self.assertEqual(res.data, {'deleted': 0})
+        self.assertTrue(Videogame.objects.filter(id=other.id).exists())
+
+
+class VideogameQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Test video game endpoints stay within their query budgets."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def _create_videogames_with_attrs(self, count):
+        """Create video games that each have several tags and consoles."""
+        tags = [Tag.objects.create(user=self.user, name=f'Tag {i}') for i in range(3)]
+        consoles = [Console.objects.create(user=self.user, name=f'Console {i}') for i in range(3)]
+        for i in range(count):
+            videogame = create_videogame(user=self.user, title=f'Game {i}')
+            videogame.tags.add(*tags)
+            videogame.consoles.add(*consoles)
+
+        return videogame
+
+    def test_list_budget_independent_of_size(self):
+        """Test listing video games does not add queries per result."""
+        self._create_videogames_with_attrs(10)
+
+        with self.assertWithinBudget('videogame-list'):
+            res = self.client.get(VIDEOGAMES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 10)
+
+    def test_retrieve_budget(self):
+        """Test retrieving a video game stays within budget."""
+        videogame = self._create_videogames_with_attrs(1)
+
+        with self.assertWithinBudget('videogame-retrieve'):
+            res = self.client.get(detail_url(videogame.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_create_budget(self):
+        """Test creating a video game stays within budget."""
+        payload = {
+            'title': 'Halo 3',
+            'price': Decimal('60.00'),
+            'rating': Decimal('10.00'),
+            'players': 4,
+            'genre': 'FPS',
+        }
+
+        with self.assertWithinBudget('videogame-create'):
+            res = self.client.post(VIDEOGAMES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_create_with_names_budget_independent_of_count(self):
+        """Test tags and consoles are looked up together, a repeated name only once."""
+        Tag.objects.create(user=self.user, name='Tag 0')
+        payload = {
+            'title': 'Halo 3',
+            'price': Decimal('60.00'),
+            'rating': Decimal('10.00'),
+            'players': 4,
+            'genre': 'FPS',
+            'tags': [{'name': f'Tag {i % 4}'} for i in range(12)],
+            'consoles': [{'name': name} for name in ['Xbox', 'PC', 'Xbox', 'PC']],
+        }
+
+        with self.assertWithinBudget('videogame-create-with-names'):
+            res = self.client.post(VIDEOGAMES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        videogame = Videogame.objects.get(id=res.data['id'])
+        self.assertEqual(videogame.tags.count(), 4)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 4)
+        self.assertEqual(Console.objects.filter(user=self.user).count(), 2)
+
+    def test_partial_update_budget(self):
+        """Test partially updating a video game stays within budget."""
+        videogame = self._create_videogames_with_attrs(1)
+
+        with self.assertWithinBudget('videogame-partial-update'):
+            res = self.client.patch(detail_url(videogame.id), {'title': 'New title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_destroy_budget(self):
+        """Test deleting a video game stays within budget."""
+        videogame = self._create_videogames_with_attrs(1)
+
+        with self.assertWithinBudget('videogame-destroy'):
+            res = self.client.delete(detail_url(videogame.id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_bulk_update_budget_independent_of_size(self):
+        """Test a bulk update is one statement however many games it changes."""
+        self._create_videogames_with_attrs(20)
+        tag = Tag.objects.filter(user=self.user).first()
+
+        with self.assertWithinBudget('videogame-bulk-update'):
+            res = self.client.patch(f'{BULK_URL}?tags={tag.id}', {'genre': 'RPG'}, format='json')
+
+        self.assertEqual(res.data, {'updated': 20})
+
+    def test_bulk_delete_budget_independent_of_size(self):
+        """Test a bulk delete is one statement however many games it removes."""
+        # More games than the 100 per DELETE that QuerySet.delete() batches by
+        self._create_videogames_with_attrs(150)
+        ids = list(Videogame.objects.values_list('id', flat=True))
+
+        with self.assertWithinBudget('videogame-bulk-delete'):
+            res = self.client.delete(BULK_URL, {'ids': ids}, format='json')
+
+        self.assertEqual(res.data, {'deleted': 150})
+        self.assertFalse(Videogame.objects.exists())
+        self.assertFalse(Videogame.tags.through.objects.exists())
+        self.assertFalse(Videogame.consoles.through.objects.exists())
+        self.assertEqual(Tombstone.objects.filter(kind='videogame').count(), 150)
+
+
+class ImageUploadTests(QueryBudgetMixin, TestCase):
     """Tests for the image upload API."""
 
     def setUp(self):
@@ -480,6 +1155,18 @@ class ImageUploadTests(TestCase):
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.videogame.image.path))
 
+    def test_upload_image_budget(self):
+        """Test uploading an image stays within budget."""
+        url = image_upload_url(self.videogame.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            img = Image.new('RGB', (10, 10))
+            img.save(image_file, format='JPEG')
+            image_file.seek(0)
+            with self.assertWithinBudget('videogame-upload-image'):
+                res = self.client.post(url, {'image': image_file}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
     def test_upload_image_bad_request(self):
         """Test uploading invalid image."""
         url = image_upload_url(self.videogame.id)
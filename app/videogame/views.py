@@ -1,6 +1,20 @@
 """
 Views for the videogame APIs.
 """
+from django.contrib.postgres.fields import ArrayField
+from django.db import transaction
+from django.db.models import (
+    BigIntegerField,
+    Count,
+    Exists,
+    F,
+    Func,
+    Min,
+    OuterRef,
+    Subquery,
+    Value,
+)
+from django.db.models.functions import Coalesce
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
@@ -13,12 +27,18 @@ from rest_framework import (
     status,
 )
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
 
+from core import metrics
+from core.authentication import TokenAuthentication
 from core.models import (
+    LINK_ARRAYS,
+    Genre,
+    LatestChange,
+    Tombstone,
     Videogame,
     Tag,
     Console,
@@ -27,24 +47,89 @@ from core.models import (
 from videogame import serializers
 
 
+FILTER_PARAMETERS = [
+    OpenApiParameter(
+        'tags',
+        OpenApiTypes.STR,
+        description='Comma separated list of tag IDs to filter'
+    ),
+    OpenApiParameter(
+        'consoles',
+        OpenApiTypes.STR,
+        description='Comma separated list of console IDs to filter'
+    ),
+    OpenApiParameter(
+        'match',
+        OpenApiTypes.STR, enum=['any', 'all'],
+        description='Match games with any (default) or all of the listed tags and consoles'
+    ),
+    OpenApiParameter('price_min', OpenApiTypes.DECIMAL, description='Lowest price'),
+    OpenApiParameter('price_max', OpenApiTypes.DECIMAL, description='Highest price'),
+    OpenApiParameter('rating_min', OpenApiTypes.DECIMAL, description='Lowest rating'),
+    OpenApiParameter(
+        'players', OpenApiTypes.INT, description='Games playable by at least this many players'
+    ),
+    OpenApiParameter('genre', OpenApiTypes.STR, description='Genre name'),
+    OpenApiParameter(
+        'similar',
+        OpenApiTypes.STR,
+        description='Games titled like this, allowing for typos, extra words and reordering'
+    ),
+    OpenApiParameter(
+        'ordering',
+        OpenApiTypes.STR, enum=serializers.VideogameFilterSerializer.ORDERINGS,
+        description='Sort by title, price or rating, prefix with - to reverse. Most similar '
+                    'first with similar, else newest first by default'
+    ),
+]
+
+MAX_BATCH_IDS = 500  # games fetched at once with ?ids=
+
+SIDELOAD_PARAMETER = OpenApiParameter(
+    'sideload',
+    OpenApiTypes.INT, enum=[0, 1],
+    description='1 to list tag and console ids on each game and the tags and consoles once, '
+                'as {"videogames": [...], "included": {"tags": [...], "consoles": [...]}}'
+)
+
+IDS_PARAMETER = OpenApiParameter(
+    'ids',
+    OpenApiTypes.STR,
+    description=f'Comma separated list of up to {MAX_BATCH_IDS} video game IDs, returned in '
+                'full and in this order unless an ordering is given'
+)
+
+WARN_DUPLICATES_PARAMETER = OpenApiParameter(
+    'warn_duplicates',
+    OpenApiTypes.INT, enum=[0, 1],
+    description=f'1 to list up to {serializers.MAX_DUPLICATES} games with similar titles as '
+                '"duplicates" in the response. The game is created either way'
+)
+
+# Query parameters validated by VideogameFilterSerializer and the lookup each filters with
+FILTER_LOOKUPS = {
+    'price_min': 'price__gte',
+    'price_max': 'price__lte',
+    'rating_min': 'rating__gte',
+    'players': 'players__gte',
+    'genre': 'genre__name__iexact',  # matches the genre's unique index on upper(name)
+}
+
+
+class QueryFlagMixin:
+    """Read 0/1 switches from the query string."""
+
+    def _flag(self, name):
+        """Return whether the 0/1 query parameter name is set."""
+        return bool(int(self.request.query_params.get(name, 0)))
+
+
 # extend autogenerated schema created by Django rest spectacular for VideogameViewSet
 @extend_schema_view(
-    list=extend_schema(
-        parameters=[
-            OpenApiParameter(
-                'tags',
-                OpenApiTypes.STR,
-                description='Comma separated list of tag IDs to filter'
-            ),
-            OpenApiParameter(
-                'consoles',
-                OpenApiTypes.STR,
-                description='Comma separated list of console IDs to filter'
-            )
-        ]
-    )
+    list=extend_schema(parameters=[IDS_PARAMETER, SIDELOAD_PARAMETER] + FILTER_PARAMETERS),
+    create=extend_schema(parameters=[WARN_DUPLICATES_PARAMETER]),
 )
-class VideogameViewSet(viewsets.ModelViewSet):
+class VideogameViewSet(QueryFlagMixin, viewsets.ModelViewSet):
     """View for manage Videogame APIs"""
     serializer_class = serializers.VideogameDetailSerializer
     queryset = Videogame.objects.all()
@@ -53,36 +138,113 @@ class VideogameViewSet(viewsets.ModelViewSet):
 
     def _params_to_ints(self, qs):
         """Convert a list of strings to integers."""
-        return [int(str_id) for str_id in qs.split(',')]
+        try:
+            return [int(str_id) for str_id in qs.split(',')]
+        except ValueError:
+            raise ValidationError('Expected a comma separated list of IDs.')
 
     def get_queryset(self):
         """Retrieve video games for authenticated user"""
         tags = self.request.query_params.get('tags')
         consoles = self.request.query_params.get('consoles')
+        # Arrays overlapping the ids have any of them, arrays containing the ids have all
+        lookup = 'contains' if self.request.query_params.get('match') == 'all' else 'overlap'
+        ids = self.request.query_params.get('ids')
         queryset = self.queryset
 
-        # If below filter provided, convert string ids to int ids
+        if ids:
+            ids = self._params_to_ints(ids)
+            if len(ids) > MAX_BATCH_IDS:
+                raise ValidationError(f'Request at most {MAX_BATCH_IDS} IDs at once.')
+            queryset = queryset.filter(id__in=ids)
+
+        # If below filter provided, convert string ids to int ids. The games' own id arrays are
+        # filtered through their GIN indexes, without joining the through tables
         if tags:
             tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = queryset.filter(**{f'tag_ids__{lookup}': tag_ids})
         if consoles:
             console_ids = self._params_to_ints(consoles)
-            queryset = queryset.filter(consoles__id__in=console_ids)
+            queryset = queryset.filter(**{f'console_ids__{lookup}': console_ids})
+
+        filters = serializers.VideogameFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        queryset = queryset.filter(**{
+            FILTER_LOOKUPS[name]: value
+            for name, value in filters.validated_data.items() if name in FILTER_LOOKUPS
+        })
+        similar = filters.validated_data.get('similar')
+        if similar:
+            queryset = queryset.similar_titles(self.request.user, similar)
+
+        # Ties are broken by id in the same direction, so a (user, column, id) index is read
+        # in order instead of sorting
+        ordering = filters.validated_data.get('ordering')
+        if ordering:
+            order = [ordering, '-id' if ordering.startswith('-') else 'id']
+        elif similar:
+            order = ['-similarity', '-id']
+        elif ids:
+            # In the order the ids were requested
+            order = [Func(
+                Value(ids, output_field=ArrayField(BigIntegerField())), F('id'),
+                function='array_position',
+            )]
+        else:
+            order = ['-id']
 
-        # Filterd result
+        # Filterd result, tags and consoles prefetched so serializing is not one query per game
         return queryset.filter(
             user=self.request.user
-        ).order_by('-id').distinct()
+        ).order_by(*order).select_related('genre').prefetch_related('tags', 'consoles')
 
     def get_serializer_class(self):
         """Return the serializer class for request"""
         if self.action == 'list':
-            return serializers.VideogameSerializer  # Expects reference to class not object
+            detail = bool(self.request.query_params.get('ids'))
+            if self._flag('sideload'):
+                return serializers.VideogameDetailSideloadSerializer if detail \
+                    else serializers.VideogameSideloadSerializer
+            if not detail:
+                return serializers.VideogameSerializer  # Expects reference to class not object
         elif self.action == 'upload_image':
             return serializers.VideogameImageSerializer
+        elif self.action == 'bulk_update':
+            return serializers.VideogameBulkUpdateSerializer
+        elif self.action == 'bulk_delete':
+            return serializers.VideogameBulkSerializer
 
         return self.serializer_class
 
+    def list(self, request, *args, **kwargs):
+        """List video games, optionally with their tags and consoles side-loaded once."""
+        if not self._flag('sideload'):
+            return super().list(request, *args, **kwargs)
+
+        # Games list their tags' and consoles' ids from their own arrays, so nothing is
+        # prefetched, and each tag and console is serialized once however many games share it
+        videogames = list(self.get_queryset().prefetch_related(None))
+        included = {}
+        for name, model, serializer in [
+            ('tags', Tag, serializers.TagSerializer),
+            ('consoles', Console, serializers.ConsoleSerializer),
+        ]:
+            ids = set().union(*(getattr(game, LINK_ARRAYS[name]) for game in videogames))
+            items = model.objects.filter(user=request.user, id__in=ids).order_by('id') \
+                if ids else []
+            included[name] = serializer(items, many=True).data
+
+        return Response({
+            'videogames': self.get_serializer(videogames, many=True).data,
+            'included': included,
+        }, status=status.HTTP_200_OK)
+
+    def get_serializer_context(self):
+        """Ask the serializer to look for duplicates of a created game, if requested."""
+        context = super().get_serializer_context()
+        context['warn_duplicates'] = self.action == 'create' and self._flag('warn_duplicates')
+        return context
+
     def perform_create(self, serializer):
         """Create a new video game with correct user assigned"""
         serializer.save(user=self.request.user)
@@ -95,11 +257,136 @@ class VideogameViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(videogame, data=request.data)
 
         if serializer.is_valid():
+            metrics.IMAGE_UPLOAD_BYTES.observe(serializer.validated_data['image'].size)
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def _bulk_selection(self, serializer):
+        """Return the user's games picked by ids and/or the filters, as a plain queryset.
+
+        The filtered ids are a subquery, so the bulk statement selects and changes the games
+        in one go without loading them.
+        """
+        ids = serializer.validated_data.pop('ids', None)
+        params = self.request.query_params
+        if ids is None and not (params.get('tags') or params.get('consoles')):
+            raise ValidationError('Select videogames with ids, tags or consoles.')
+
+        queryset = self.get_queryset()
+        if ids is not None:
+            queryset = queryset.filter(id__in=ids)
+
+        return Videogame.objects.filter(id__in=queryset.values('id'))
+
+    @extend_schema(parameters=FILTER_PARAMETERS, responses={200: OpenApiTypes.OBJECT})
+    @action(methods=['GET'], detail=False)
+    def facets(self, request):
+        """Count the filtered video games per tag, console, genre and price and rating range."""
+        return Response(self.get_queryset().facets(), status=status.HTTP_200_OK)
+
+    def _changes_cutoff(self, cursor, latest, limit):
+        """Return the sequence number a sync page ends at and whether more changes follow.
+
+        Only the numbers are read, from the (user, change_seq) indexes, to find where the
+        first `limit` changes after cursor end across games, tags, consoles and deletions.
+        """
+        numbers = [
+            model.objects.filter(
+                user=self.request.user, change_seq__gt=cursor, change_seq__lte=latest,
+            ).order_by('change_seq').values_list('change_seq', flat=True)[:limit + 1]
+            for model in [Videogame, Tag, Console, Tombstone]
+        ]
+        page_end = list(
+            numbers[0].union(*numbers[1:], all=True).order_by('change_seq')[limit - 1:limit + 1]
+        )
+        if len(page_end) == 2:
+            return page_end[0], True
+
+        return latest, False
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'cursor', OpenApiTypes.INT,
+                description='Cursor returned by the previous sync, 0 or omitted for everything',
+            ),
+            OpenApiParameter('limit', OpenApiTypes.INT, description='Most changes returned'),
+        ],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(methods=['GET'], detail=False)
+    def changes(self, request):
+        """Return the games, tags and consoles changed or deleted after a cursor."""
+        query = serializers.ChangesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        cursor, limit = query.validated_data['cursor'], query.validated_data['limit']
+        changes = {
+            'cursor': cursor,
+            'has_more': False,
+            'videogames': [],
+            'tags': [],
+            'consoles': [],
+            'deleted': {'videogames': [], 'tags': [], 'consoles': []},
+        }
+
+        # Changes up to the latest one are all committed, later ones are left for next time.
+        # Nothing changed costs this one primary key lookup
+        latest = LatestChange.objects.filter(user=request.user).values_list('seq', flat=True)
+        latest = latest.first() or 0
+        if latest <= cursor:
+            return Response(changes, status=status.HTTP_200_OK)
+
+        cutoff, changes['has_more'] = self._changes_cutoff(cursor, latest, limit)
+        changed = {'user': request.user, 'change_seq__gt': cursor, 'change_seq__lte': cutoff}
+        changes['cursor'] = cutoff
+        changes['videogames'] = serializers.VideogameDetailSerializer(
+            Videogame.objects.filter(**changed).order_by('change_seq')
+            .select_related('genre').prefetch_related('tags', 'consoles'),
+            many=True, context=self.get_serializer_context(),
+        ).data
+        changes['tags'] = serializers.TagSerializer(
+            Tag.objects.filter(**changed).order_by('change_seq'), many=True,
+        ).data
+        changes['consoles'] = serializers.ConsoleSerializer(
+            Console.objects.filter(**changed).order_by('change_seq'), many=True,
+        ).data
+        for kind, object_id in Tombstone.objects.filter(**changed).values_list('kind', 'object_id'):
+            changes['deleted'][f'{kind}s'].append(object_id)
+
+        return Response(changes, status=status.HTTP_200_OK)
+
+    @extend_schema(parameters=FILTER_PARAMETERS, responses={200: OpenApiTypes.OBJECT})
+    @action(methods=['PATCH'], detail=False, url_path='bulk')
+    def bulk_update(self, request):
+        """Set the same values on many video games with a single UPDATE."""
+        serializer = self.get_serializer(data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+
+        values = serializer.validated_data
+        with transaction.atomic():
+            selection = self._bulk_selection(serializer)
+            if 'genre' in values:
+                values['genre'] = Genre.objects.get_or_create_by_name(request.user, values['genre'])
+            updated = selection.update(**values)
+
+        return Response({'updated': updated}, status=status.HTTP_200_OK)
+
+    @extend_schema(parameters=FILTER_PARAMETERS, responses={200: OpenApiTypes.OBJECT})
+    @bulk_update.mapping.delete
+    def bulk_delete(self, request):
+        """Delete many video games and their tag and console links in one transaction."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            selection = self._bulk_selection(serializer)
+            # One statement however many games: the games and their links together
+            deleted = selection.delete_with_links()
+
+        return Response({'deleted': deleted}, status=status.HTTP_200_OK)
+
 
 # extend autogenerated schema created by Django rest spectacular for BaseVideogameAttrViewSet
 @extend_schema_view(
@@ -109,41 +396,135 @@ class VideogameViewSet(viewsets.ModelViewSet):
                 'assigned_only',
                 OpenApiTypes.INT, enum=[0, 1],
                 description='Filter by items assigned to videogames'
-            )
+            ),
+            OpenApiParameter(
+                'with_counts',
+                OpenApiTypes.INT, enum=[0, 1],
+                description='Include videogame_count, the number of videogames using each item'
+            ),
         ]
     )
 )
-class BaseVideogameAttrViewSet(mixins.DestroyModelMixin,
+class BaseVideogameAttrViewSet(QueryFlagMixin,
+                               mixins.DestroyModelMixin,
                                mixins.UpdateModelMixin,
                                mixins.ListModelMixin,
                                viewsets.GenericViewSet):
     """Base viewset for videogame attributes."""
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    videogame_field = None  # Videogame many to many field holding this attribute
+    count_serializer_class = None  # serializer for lists requested with_counts
+
+    def _assignments(self):
+        """Return the through table rows linking videogames to the outer query's item."""
+        through = getattr(Videogame, self.videogame_field).through
+        return through.objects.filter(**{self.queryset.model._meta.model_name: OuterRef('pk')})
 
     def get_queryset(self):
         """Filter queryset to authenticated user."""
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only', 0))
-        )
         queryset = self.queryset
 
-        # Check to see if a videogame is assoicated with the value
-        if assigned_only:
-            queryset = queryset.filter(videogame__isnull=False)
+        # Check to see if a videogame is assoicated with the value. EXISTS stops at the first
+        # game instead of joining every game then removing the duplicates
+        if self._flag('assigned_only'):
+            queryset = queryset.filter(Exists(self._assignments()))
+
+        # Counted per item in the same query, using the through table's index on the item
+        if self.action == 'list' and self._flag('with_counts'):
+            counts = self._assignments().order_by().values(
+                self.queryset.model._meta.model_name,
+            ).annotate(count=Count('*')).values('count')
+            queryset = queryset.annotate(videogame_count=Coalesce(Subquery(counts), 0))
 
         return queryset.filter(
             user=self.request.user
-        ).order_by('-name').distinct()
+        ).order_by('-name')
+
+    def get_serializer_class(self):
+        """Return the serializer class for request"""
+        if self.action == 'list' and self._flag('with_counts'):
+            return self.count_serializer_class
+        elif self.action == 'merge':
+            return serializers.MergeSerializer
+        elif self.action == 'rename':
+            return serializers.RenameSerializer
+
+        return self.serializer_class
+
+    def _merge(self, survivor, duplicate_ids):
+        """Move the videogames of the duplicates to survivor, then delete the duplicates.
+
+        Runs the same few statements however many videogames are linked.
+        """
+        through = getattr(Videogame, self.videogame_field).through
+        column = f'{self.queryset.model._meta.model_name}_id'
+        links = through.objects.filter(**{f'{column}__in': duplicate_ids})
+
+        # A videogame is linked at most once, so drop links that would repeat after the move:
+        # those of games already linked to survivor, and all but one per game of the rest
+        links.filter(videogame_id__in=through.objects.filter(
+            **{column: survivor.id}).values('videogame_id')).delete()
+        links.exclude(id__in=links.order_by().values('videogame_id').annotate(
+            first=Min('id')).values('first')).delete()
+        links.update(**{column: survivor.id})
+
+        # The through table was changed without signals, rewrite the moved games' id arrays
+        Videogame.objects.filter(**{
+            f'{LINK_ARRAYS[self.videogame_field]}__overlap': duplicate_ids,
+        }).sync_link_arrays([self.videogame_field])
+
+        self.queryset.model.objects.filter(id__in=duplicate_ids).delete()
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT})
+    @action(methods=['POST'], detail=True)
+    def merge(self, request, pk=None):
+        """Merge the items listed in ids into this one."""
+        survivor = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            duplicate_ids = list(self.queryset.filter(
+                user=request.user, id__in=serializer.validated_data['ids'],
+            ).exclude(id=survivor.id).values_list('id', flat=True))
+            if duplicate_ids:
+                self._merge(survivor, duplicate_ids)
+
+        return Response(self.serializer_class(survivor).data, status=status.HTTP_200_OK)
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT})
+    @action(methods=['POST'], detail=True)
+    def rename(self, request, pk=None):
+        """Rename this item, merging in any other already using the name in another case."""
+        item = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        name = serializer.validated_data['name']
+
+        with transaction.atomic():
+            duplicate_ids = list(self.queryset.filter(
+                user=request.user, name__iexact=name,
+            ).exclude(id=item.id).values_list('id', flat=True))
+            if duplicate_ids:
+                self._merge(item, duplicate_ids)
+            item.name = name
+            item.save(update_fields=['name'])
+
+        return Response(self.serializer_class(item).data, status=status.HTTP_200_OK)
 
 
 class TagViewSet(BaseVideogameAttrViewSet):
     """Manage tags in the database."""
     serializer_class = serializers.TagSerializer
+    count_serializer_class = serializers.TagCountSerializer
     queryset = Tag.objects.all()
+    videogame_field = 'tags'
 
 
 class ConsoleViewSet(BaseVideogameAttrViewSet):
     """Manage consoles in the database."""
     serializer_class = serializers.ConsoleSerializer
+    count_serializer_class = serializers.ConsoleCountSerializer
     queryset = Console.objects.all()
+    videogame_field = 'consoles'
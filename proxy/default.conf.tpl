@@ -2,9 +2,19 @@ server {
     # This will be set by our configuration
     listen ${LISTEN_PORT};
 
-    # Serve files from /vol/static for requests matching /static path
+    # Serve files from /vol/static for requests matching /static path. Uploaded media and
+    # static files requested without their hash may change under the same name, so browsers
+    # only cache them briefly
     location /static {
         alias /vol/static;
+        add_header Cache-Control "public, max-age=600";
+    }
+
+    # Collected static files named after a hash of their content, e.g. base.1f418065fc2c.css,
+    # never change, so browsers keep them for a year without revalidating
+    location ~ "^/static/static/.+\.[0-9a-f]{12}\.[A-Za-z0-9]+$" {
+        root /vol;
+        add_header Cache-Control "public, max-age=31536000, immutable";
     }
 
     # Catch-all location for other requests
@@ -18,4 +28,4 @@ server {
         # Limit request body size to 10MB
         client_max_body_size 10M;
     }
-}
\ No newline at end of file
+}
@@ -3,10 +3,26 @@
 # If any command fails, stop the script
 set -e
 
-# Django setup
+START=$(date +%s)
+
+# Django setup, static files do not need the database so collect them while it starts
+python manage.py collectstatic --noinput &  # collect static files
+COLLECTSTATIC_PID=$!
 python manage.py wait_for_db
-python manage.py collectstatic --noinput  # collect static files
 python manage.py migrate
+wait $COLLECTSTATIC_PID
+
+echo "Startup tasks finished in $(( $(date +%s) - START ))s"
+
+# Workers share metrics through files in this directory, stale files from a previous run are
+# removed. /tmp is deleted from the image, /vol/prometheus is created for django-user instead
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/vol/prometheus}
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+rm -f "$PROMETHEUS_MULTIPROC_DIR"/*.db
 
 # Run on TCP socket port 9000, set uwsgi daemon as master thread, module runs /app/app/wsgi.py
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
+# The app is loaded once in the master and forked (no --lazy-apps), --need-app exits if it fails
+# The master also runs the job worker, restarting it if it dies and stopping it with SIGTERM so
+# running jobs can finish
+uwsgi --socket :9000 --workers 4 --master --enable-threads --need-app --module app.wsgi \
+    --attach-daemon2 "cmd=python manage.py run_worker,stopsignal=15"